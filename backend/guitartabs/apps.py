@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GuitartabsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'guitartabs'
+
+    def ready(self):
+        import guitartabs.signals
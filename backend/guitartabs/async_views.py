@@ -0,0 +1,53 @@
+"""ASGI-native twin of ``list_guitartabs`` on the async ORM."""
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from rest_framework import status
+
+from worship_sys import conditional, pagination
+from worship_sys.async_api import async_api_view, json_response
+from .serializers import GuitarTabSerializer
+from .views import _tab_list_queryset, cached_tab_list
+
+
+@async_api_view(['GET'])
+@cached_tab_list
+async def list_guitartabs(request):
+    page, page_size = pagination.page_params(request)
+    # the trigram index may have to be read in first: that part runs in a thread
+    if request.query_params.get('search', '').strip():
+        tabs_qs = await sync_to_async(_tab_list_queryset)(request)
+    else:
+        tabs_qs = _tab_list_queryset(request)
+    params = request.query_params.urlencode()
+
+    if pagination.wants_cursor(request):
+        try:
+            window = pagination.cursor_queryset(tabs_qs, request, page_size)
+        except pagination.InvalidCursor as e:
+            return json_response({"error": str(e)}, status.HTTP_400_BAD_REQUEST)
+        etag = conditional.make_etag('guitartabs', params, *[row async for row in window.values_list('id', 'updated_at')])
+        not_modified = conditional.conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        tabs, next_cursor, total = await pagination.apaginate_by_cursor(tabs_qs, request, page_size)
+        data = {
+            "guitartabs": GuitarTabSerializer(tabs, many=True).data,
+            "next_cursor": next_cursor,
+        }
+        if total is not None:
+            data["total"] = total
+        return conditional.set_validators(json_response(data), etag)
+
+    stamps = await tabs_qs.aaggregate(total=Count('id'), modified=Max('updated_at'))
+    total = stamps['total']
+    etag = conditional.make_etag('guitartabs', params, total, stamps['modified'])
+    not_modified = conditional.conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    start = (page - 1) * page_size
+    tabs = [tab async for tab in tabs_qs[start:start + page_size]]
+    return conditional.set_validators(
+        json_response({"guitartabs": GuitarTabSerializer(tabs, many=True).data, "total": total}), etag
+    )
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-16 10:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guitartabs', '0003_guitartab_key_guitartab_tempo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guitartab',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
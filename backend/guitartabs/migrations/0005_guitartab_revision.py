@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guitartabs', '0004_guitartab_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guitartab',
+            name='revision',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations, transaction
+
+# The indexes as they stood at this migration; guitartabs.search queries them.
+INDEXES = {
+    "guitartabs_title_trgm": "title",
+    "guitartabs_artist_trgm": "artist",
+}
+
+
+def create_trigram_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except Exception:  # no permission to install extensions
+        return
+    with connection.cursor() as cursor:
+        for name, column in INDEXES.items():
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON guitartabs_guitartab "
+                f"USING GIN ({column} gin_trgm_ops)"
+            )
+
+
+def drop_trigram_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            for name in INDEXES:
+                cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guitartabs', '0005_guitartab_revision'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
+from worship_sys.concurrency import RevisionedMixin
 
-class GuitarTab(models.Model):
+class GuitarTab(RevisionedMixin, models.Model):
     title = models.CharField(max_length=200)
     artist = models.CharField(max_length=200)
     imageUrl = models.URLField(blank=True, null=True)
@@ -13,6 +14,9 @@ class GuitarTab(models.Model):
     tab_data = models.JSONField(default=dict, blank=True, null=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # bumped on every save; the version token behind If-Match (worship_sys.concurrency)
+    revision = models.PositiveIntegerField(default=1, editable=False)
     
     # Versioning approach, similar to your Song model
     version = models.IntegerField(default=1)
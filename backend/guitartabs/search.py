@@ -0,0 +1,203 @@
+"""
+Typo-tolerant guitar tab search over title and artist.
+
+Postgres uses pg_trgm: GIN trigram indexes on both columns and the
+``<%`` word-similarity operator, ranked by ``word_similarity``. Everywhere
+else (SQLite) a process-local trigram inverted index does the same job in
+Python: a tab can only reach the threshold if it holds at least one of the
+query's rarest trigrams, so candidates come from those short posting lists
+alone and common trigrams ("  a", "the") are never scanned.
+
+Queries shorter than ``MIN_QUERY_LENGTH`` characters have too few trigrams
+to reach the threshold against anything, so they fall back to a plain
+case-insensitive substring match on both backends.
+
+Trigrams follow pg_trgm: each lower-cased word is padded with two spaces in
+front and one behind, so both backends agree closely on what matches. The
+Python index is kept current by ``guitartabs.signals``; like the song
+typeahead, a worker that misses another process's write catches up on
+``reset()`` or restart.
+"""
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from django.db import connections
+from django.db.models import Case, FloatField, Q, Value, When
+
+# pg_trgm's default word_similarity_threshold
+THRESHOLD = 0.6
+# shorter queries are matched with icontains instead
+MIN_QUERY_LENGTH = 3
+
+_WORD = re.compile(r"\w+")
+_available = {}
+
+
+def trigrams(text: str) -> frozenset:
+    grams = set()
+    for word in _WORD.findall(unicodedata.normalize("NFKC", text or "").casefold()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+# ---------------------------------------------------------------------------
+# Postgres
+# ---------------------------------------------------------------------------
+def pg_available(using: str = "default") -> bool:
+    if using not in _available:
+        connection = connections[using]
+        ok = False
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                ok = cursor.fetchone() is not None
+        _available[using] = ok
+    return _available[using]
+
+
+# ---------------------------------------------------------------------------
+# Python fallback
+# ---------------------------------------------------------------------------
+class TrigramIndex:
+    def __init__(self):
+        self._postings = defaultdict(set)   # trigram -> {tab id}
+        self._docs = {}                     # tab id -> (title trigrams, artist trigrams, title)
+        self._lock = threading.RLock()
+        self.built = False
+
+    def _insert(self, pk, title, artist):
+        doc = (trigrams(title), trigrams(artist), title or "")
+        self._docs[pk] = doc
+        for gram in doc[0] | doc[1]:
+            self._postings[gram].add(pk)
+
+    def load(self, rows):
+        """Replace the index with ``(id, title, artist)`` rows."""
+        with self._lock:
+            self._postings, self._docs = defaultdict(set), {}
+            for pk, title, artist in rows:
+                self._insert(pk, title, artist)
+            self.built = True
+
+    def add(self, pk, title, artist):
+        with self._lock:
+            self.remove(pk)
+            self._insert(pk, title, artist)
+
+    def remove(self, pk):
+        with self._lock:
+            doc = self._docs.pop(pk, None)
+            if doc is None:
+                return
+            for gram in doc[0] | doc[1]:
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(pk)
+                    if not postings:
+                        del self._postings[gram]
+
+    def search(self, text: str, limit: int = None, threshold: float = THRESHOLD):
+        """
+        ``[(id, score)]`` best first, every match unless *limit* is given;
+        score is the share of query trigrams matched.
+        """
+        query = trigrams(text)
+        if not query:
+            return []
+        with self._lock:
+            # a match shares >= ceil(threshold * |query|) trigrams with a field,
+            # so it must hold one of the |query| - that + 1 rarest ones
+            rarest = sorted(query, key=lambda g: len(self._postings.get(g, ())))
+            rarest = rarest[:len(query) - math.ceil(threshold * len(query)) + 1]
+            candidates = set().union(*(self._postings.get(g, ()) for g in rarest))
+            size, needed = len(query), threshold * len(query)
+            scored = []
+            for pk in candidates:
+                title, artist, name = self._docs[pk]
+                best = None
+                for grams in (title, artist):
+                    shared = len(query & grams)
+                    if shared >= needed:
+                        # (share of the query matched, Jaccard similarity as tie-break)
+                        rank = (-shared / size, -shared / (size + len(grams) - shared))
+                        best = rank if best is None else min(best, rank)
+                if best is not None:
+                    scored.append((*best, name, pk))
+        scored.sort()
+        return [(pk, -score) for score, _, _, pk in scored[:limit]]
+
+    def __len__(self):
+        return len(self._docs)
+
+
+index = TrigramIndex()
+_build_lock = threading.Lock()
+
+
+def get_index() -> TrigramIndex:
+    if not index.built:
+        with _build_lock:
+            if not index.built:
+                from .models import GuitarTab
+                index.load(GuitarTab.objects.values_list("id", "title", "artist").iterator())
+    return index
+
+
+def reset() -> None:
+    with index._lock:
+        index._postings, index._docs, index.built = defaultdict(set), {}, False
+
+
+def update(tab) -> None:
+    if index.built:
+        index.add(tab.pk, tab.title, tab.artist)
+
+
+def discard(pk) -> None:
+    if index.built:
+        index.remove(pk)
+
+
+# ---------------------------------------------------------------------------
+# query
+# ---------------------------------------------------------------------------
+def search_tabs(queryset, text: str, ranked: bool = True):
+    """
+    Restrict *queryset* to tabs whose title or artist resembles *text*.
+    With ``ranked=True`` they are ordered best-first and carry a
+    ``search_rank`` attribute; otherwise the caller's ordering is kept.
+    """
+    text = text.strip()
+    if not text:
+        return queryset
+    if len(text) < MIN_QUERY_LENGTH:
+        return queryset.filter(Q(title__icontains=text) | Q(artist__icontains=text))
+    if pg_available(queryset.db):
+        qs = queryset.extra(
+            where=["(%s <%% title OR %s <%% artist)"],
+            params=[text, text],
+        )
+        if ranked:
+            qs = qs.extra(
+                select={"search_rank": "GREATEST(word_similarity(%s, title), word_similarity(%s, artist))"},
+                select_params=[text, text],
+            ).order_by("-search_rank", "id")
+        return qs
+
+    matches = get_index().search(text)
+    if not matches:
+        return queryset.none()
+    if not ranked:
+        return queryset.filter(id__in=[pk for pk, _ in matches])
+    # one WHEN per distinct score, however many tabs match
+    by_score = defaultdict(list)
+    for pk, score in matches:
+        by_score[score].append(pk)
+    return queryset.annotate(search_rank=Case(
+        *(When(id__in=ids, then=Value(score)) for score, ids in by_score.items()),
+        output_field=FloatField(),
+    )).filter(search_rank__isnull=False).order_by("-search_rank", "id")
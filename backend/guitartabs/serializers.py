@@ -5,3 +5,20 @@ class GuitarTabSerializer(serializers.ModelSerializer):
     class Meta:
         model = GuitarTab
         fields = '__all__'
+
+
+class TabNoteSerializer(serializers.Serializer):
+    fret = serializers.IntegerField(min_value=0, max_value=36)
+    position = serializers.IntegerField(min_value=0)
+    connection = serializers.DictField(required=False)
+    isBending = serializers.BooleanField(required=False)
+
+
+class TabStringSerializer(serializers.Serializer):
+    string = serializers.IntegerField(min_value=1, max_value=12)
+    notes = TabNoteSerializer(many=True)
+
+
+class TabLineSerializer(serializers.Serializer):
+    """One ``tab_data["lines"]`` entry; used to validate the lines a JSON Patch touches."""
+    strings = TabStringSerializer(many=True)
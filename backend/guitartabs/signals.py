@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from worship_sys import response_cache
+
+from . import search
+from .models import GuitarTab
+
+
+@receiver(post_save, sender=GuitarTab)
+def index_tab(sender, instance, using, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: search.update(instance), using=using)
+
+
+@receiver(post_delete, sender=GuitarTab)
+def unindex_tab(sender, instance, using, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: search.discard(pk), using=using)
+
+
+@receiver(pre_delete, sender=GuitarTab)
+def detach_versions(sender, instance, using, **kwargs):
+    # on_delete=SET_NULL would clear original_tab in bulk, past save(): bump
+    # the versions' revision and stamp so their ETags change with it
+    GuitarTab.objects.using(using).filter(original_tab=instance).update(
+        original_tab=None, revision=F('revision') + 1, updated_at=timezone.now())
+
+
+@receiver(post_save, sender=GuitarTab)
+def invalidate_tab_lists(sender, using, **kwargs):
+    response_cache.invalidate('guitartabs', using=using)
+
+
+@receiver(post_delete, sender=GuitarTab)
+def invalidate_tab_and_song_lists(sender, using, **kwargs):
+    # songs pointing at the tab have their guitar_tab set to NULL in bulk
+    response_cache.invalidate('guitartabs', 'songs', using=using)
@@ -1,3 +1,144 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import search
+from .models import GuitarTab
+
+
+class GuitarTabListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("player", password="pw"))
+        cache.clear()   # bulk_create sends no signals: drop cached list pages
+        GuitarTab.objects.bulk_create(GuitarTab(title=f"Riff {i}", artist="Band") for i in range(5))
+
+    def test_cursor_pagination(self):
+        res = self.client.get("/api/guitartabs/", {"cursor": "", "page_size": 3})
+        self.assertEqual([t["title"] for t in res.data["guitartabs"]], ["Riff 0", "Riff 1", "Riff 2"])
+        res = self.client.get("/api/guitartabs/", {"cursor": res.data["next_cursor"], "page_size": 3})
+        self.assertEqual([t["title"] for t in res.data["guitartabs"]], ["Riff 3", "Riff 4"])
+        self.assertIsNone(res.data["next_cursor"])
+
+    async def test_async_list_matches_the_sync_view(self):
+        user = await User.objects.aget(username="player")
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(user).access_token))()
+        client = AsyncClient()
+        for query in ({"page": 2, "page_size": 2}, {"cursor": "", "page_size": 3, "include_total": "1"}):
+            res = await client.get("/api/async/guitartabs/", query, headers={"AUTHORIZATION": f"Bearer {token}"})
+            self.assertEqual(res.status_code, 200)
+            expected = await sync_to_async(self.client.get)("/api/guitartabs/", query)
+            self.assertEqual(res.json(), expected.json())
+
+    def test_list_is_cached_until_a_tab_changes(self):
+        res = self.client.get("/api/guitartabs/", {"page_size": 2})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/guitartabs/", {"page_size": "2 "}).json(), res.json())
+        GuitarTab.objects.get(title="Riff 0").delete()
+        res = self.client.get("/api/guitartabs/", {"page_size": 2})
+        self.assertEqual([t["title"] for t in res.json()["guitartabs"]], ["Riff 1", "Riff 2"])
+
+    def test_detail_conditional_get(self):
+        tab = GuitarTab.objects.first()
+        url = f"/api/guitartabs/{tab.id}/"
+        res = self.client.get(url)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=res["ETag"], HTTP_IF_MODIFIED_SINCE=res["Last-Modified"])
+        self.assertEqual(res.status_code, 304)
+        self.client.patch(url, {"title": "Riff X"}, format="json")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=res["ETag"]).status_code, 200)
+
+    def test_deleting_the_original_changes_the_version_etag(self):
+        root = GuitarTab.objects.get(title="Riff 0")
+        v2 = GuitarTab.objects.create(title="Riff 0", artist="Band", version=2, original_tab=root)
+        url = f"/api/guitartabs/{v2.id}/"
+        etag = self.client.get(url)["ETag"]
+        root.delete()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertIsNone(res.data["original_tab"])
+
+    def test_version_tree_and_latest_filter(self):
+        root = GuitarTab.objects.get(title="Riff 0")
+        v2 = GuitarTab.objects.create(title="Riff 0", artist="Band", version=2, original_tab=root)
+        v3 = GuitarTab.objects.create(title="Riff 0", artist="Band", version=3, original_tab=v2)
+        res = self.client.get(f"/api/guitartabs/{root.pk}/versions/")
+        self.assertEqual(res.data["descendants"], [v2.pk, v3.pk])
+        self.assertEqual(res.data["latest"], v3.pk)
+
+        res = self.client.get("/api/guitartabs/", {"latest": "1", "page_size": 10})
+        titles = [(t["title"], t["version"]) for t in res.data["guitartabs"]]
+        self.assertIn(("Riff 0", 3), titles)
+        self.assertNotIn(("Riff 0", 1), titles)
+
+    def test_if_match_conflict(self):
+        tab = GuitarTab.objects.get(title="Riff 0")
+        url = f"/api/guitartabs/{tab.pk}/"
+        etag = self.client.get(url)["ETag"]
+        res = self.client.patch(url, {"key": "A"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual((res.status_code, res.data["revision"]), (200, 2))
+        res = self.client.patch(url, {"key": "B"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual((res.status_code, res.data["key"]), (412, "A"))
+
+    def test_json_patch_tab_lines(self):
+        tab = GuitarTab.objects.create(title="Intro", artist="Band", tab_data={"lines": [
+            {"strings": [{"string": 1, "notes": [{"fret": 3, "position": 0}]}]},
+        ]})
+        url = f"/api/guitartabs/{tab.pk}/"
+        ops = [{"op": "replace", "path": "/tab_data/lines/0/strings/0/notes/0/fret", "value": 5},
+               {"op": "add", "path": "/tab_data/lines/-", "value": {"strings": []}}]
+        res = self.client.patch(url, json.dumps(ops), content_type="application/json-patch+json")
+        self.assertEqual(res.status_code, 200)
+        lines = GuitarTab.objects.get(pk=tab.pk).tab_data["lines"]
+        self.assertEqual((lines[0]["strings"][0]["notes"][0]["fret"], len(lines)), (5, 2))
+
+        ops = [{"op": "replace", "path": "/tab_data/lines/1/strings", "value": [{"string": 1, "notes": [{"fret": -2}]}]}]
+        res = self.client.patch(url, json.dumps(ops), content_type="application/json-patch+json")
+        self.assertEqual((res.status_code, list(res.data)), (400, ["/tab_data/lines/1"]))
+
+
+class TabSearchTests(TestCase):
+    def setUp(self):
+        search.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("player", password="pw"))
+        for title, artist in [("Amazing Grace", "Chris Tomlin"), ("Oceans", "Hillsong United"),
+                              ("Cornerstone", "Hillsong Worship"), ("Great Are You Lord", "All Sons")]:
+            GuitarTab.objects.create(title=title, artist=artist)
+
+    def titles(self, q, **params):
+        res = self.client.get("/api/guitartabs/", {"search": q, "page_size": 10, **params})
+        return [t["title"] for t in res.data["guitartabs"]]
+
+    def test_typo_tolerant_and_ranked(self):
+        self.assertEqual(self.titles("amazng grce"), ["Amazing Grace"])
+        self.assertEqual(self.titles("hilsong"), ["Oceans", "Cornerstone"])
+        self.assertEqual(self.titles("ocean"), ["Oceans"])
+        self.assertEqual(self.titles("zzzz"), [])
+
+    def test_short_queries_fall_back_to_substring_match(self):
+        self.assertEqual(self.titles("a"), ["Amazing Grace", "Oceans", "Great Are You Lord"])
+        self.assertEqual(self.titles(" hi "), ["Oceans", "Cornerstone"])
+
+    def test_every_match_is_paginated(self):
+        cache.clear()   # bulk_create sends no signals: drop cached list pages
+        GuitarTab.objects.bulk_create(GuitarTab(title=f"Hillsong Medley {i}", artist="Band") for i in range(250))
+        search.reset()
+        res = self.client.get("/api/guitartabs/", {"search": "hillsong", "page_size": 100, "page": 3})
+        self.assertEqual(res.data["total"], 252)
+        self.assertEqual(len(res.data["guitartabs"]), 52)
+        res = self.client.get("/api/guitartabs/", {"search": "hillsong", "cursor": "", "page_size": 300})
+        self.assertEqual(len(res.data["guitartabs"]), 252)
+
+    def test_index_follows_writes(self):
+        self.titles("x")  # build the index
+        with self.captureOnCommitCallbacks(execute=True):
+            tab = GuitarTab.objects.create(title="Goodness of God", artist="Bethel")
+        self.assertEqual(self.titles("godness"), ["Goodness of God"])
+        with self.captureOnCommitCallbacks(execute=True):
+            tab.delete()
+        self.assertEqual(self.titles("godness"), [])
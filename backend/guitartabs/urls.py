@@ -3,10 +3,12 @@ from .views import (
     list_guitartabs,
     create_guitartab,
     guitartab_detail,
+    guitartab_versions,
 )
 
 urlpatterns = [
     path('', list_guitartabs, name='list_guitartabs'),
     path('create/', create_guitartab, name='create_guitartab'),
     path('<int:tab_id>/', guitartab_detail, name='guitartab_detail'),
+    path('<int:tab_id>/versions/', guitartab_versions, name='guitartab_versions'),
 ]
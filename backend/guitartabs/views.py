@@ -1,33 +1,73 @@
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, parser_classes
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Max
+from worship_sys import conditional, jsonpatch, pagination, response_cache, version_tree
+from worship_sys.concurrency import RevisionConflict, claim_revision
+from . import search as tab_search
 from .models import GuitarTab
-from .serializers import GuitarTabSerializer
+from .serializers import GuitarTabSerializer, TabLineSerializer
+
+def _tab_list_queryset(request):
+    """
+    ``list_guitartabs``' filtered queryset. May read the database to build the
+    search index, so async callers run it in a thread.
+    """
+    search = request.query_params.get("search", "")
+    tabs_qs = GuitarTab.objects.all().order_by('id')
+    # Fuzzy title/artist match through the trigram index; best matches first,
+    # except in cursor mode, which walks matches in id order
+    if search.strip():
+        tabs_qs = tab_search.search_tabs(tabs_qs, search, ranked=not pagination.wants_cursor(request))
+
+    # ?latest=true: only the head of each version chain
+    if version_tree.wants_latest(request):
+        tabs_qs = version_tree.latest_only(tabs_qs, 'original_tab')
+    return tabs_qs
+
+# every query parameter list_guitartabs reads; shared with its async twin
+cached_tab_list = response_cache.cached_list(
+    'guitartabs', depends_on=('guitartabs',),
+    params=('search', 'latest', 'cursor', 'include_total', 'page', 'page_size'),
+    folded=('search', 'latest', 'include_total'), defaults={'page': '1', 'page_size': '5'},
+)
 
 @api_view(['GET'])
+@cached_tab_list
 def list_guitartabs(request):
-    # Get search query and pagination parameters from the request
-    search = request.query_params.get("search", "")
-    try:
-        page = int(request.query_params.get("page", 1))
-    except ValueError:
-        page = 1
-    try:
-        page_size = int(request.query_params.get("page_size", 5))
-    except ValueError:
-        page_size = 5
+    page, page_size = pagination.page_params(request)
+    tabs_qs = _tab_list_queryset(request)
+
+    params = request.query_params.urlencode()
 
-    # Filter by title or artist if a search query is provided
-    if search:
-        tabs_qs = GuitarTab.objects.filter(
-            Q(title__icontains=search) | Q(artist__icontains=search)
-        ).order_by('id')
-    else:
-        tabs_qs = GuitarTab.objects.all().order_by('id')
+    # Keyset mode: ?cursor= walks by id and skips the count unless asked for
+    if pagination.wants_cursor(request):
+        try:
+            window = pagination.cursor_queryset(tabs_qs, request, page_size)
+        except pagination.InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        etag = conditional.make_etag('guitartabs', params, *window.values_list('id', 'updated_at'))
+        not_modified = conditional.conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
 
-    # Calculate total count before paginating
-    total = tabs_qs.count()
+        tabs, next_cursor, total = pagination.paginate_by_cursor(tabs_qs, request, page_size)
+        data = {
+            "guitartabs": GuitarTabSerializer(tabs, many=True).data,
+            "next_cursor": next_cursor,
+        }
+        if total is not None:
+            data["total"] = total
+        return conditional.set_validators(Response(data, status=status.HTTP_200_OK), etag)
+
+    # Calculate total count (and the collection ETag) before paginating
+    stamps = tabs_qs.aggregate(total=Count('id'), modified=Max('updated_at'))
+    total = stamps['total']
+    etag = conditional.make_etag('guitartabs', params, total, stamps['modified'])
+    not_modified = conditional.conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
 
     # Apply pagination by slicing the queryset
     start = (page - 1) * page_size
@@ -36,7 +76,9 @@ def list_guitartabs(request):
     serializer = GuitarTabSerializer(tabs, many=True)
     
     # Return a JSON object with both the guitar tabs and total count
-    return Response({"guitartabs": serializer.data, "total": total}, status=status.HTTP_200_OK)
+    return conditional.set_validators(
+        Response({"guitartabs": serializer.data, "total": total}, status=status.HTTP_200_OK), etag
+    )
 
 @api_view(['POST'])
 def create_guitartab(request):
@@ -46,23 +88,127 @@ def create_guitartab(request):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+def guitartab_versions(request, tab_id):
+    """The whole version tree ``tab_id`` belongs to, in one query."""
+    nodes = version_tree.lineage(GuitarTab, tab_id, 'original_tab', fields=('title', 'artist', 'key', 'created_at'))
+    tree = version_tree.build(nodes, tab_id, 'original_tab', lambda t: {
+        "title": t.title, "artist": t.artist, "key": t.key, "created_at": t.created_at,
+    })
+    if tree is None:
+        return Response({"error": "Guitar tab not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(tree, status=status.HTTP_200_OK)
+
+def _tab_response(tab, status_code=status.HTTP_200_OK):
+    return conditional.set_validators(
+        Response(GuitarTabSerializer(tab).data, status=status_code),
+        conditional.version_etag('guitartab', tab.id, tab.revision), tab.updated_at,
+    )
+
+# Fields a JSON Patch may touch
+TAB_PATCH_FIELDS = ('title', 'artist', 'imageUrl', 'key', 'tempo', 'tab_data')
+PATCH_ATTEMPTS = 3
+
+def _tab_patch(tab, operations):
+    """
+    Apply JSON Patch *operations* to *tab*'s editable fields. Returns
+    ``(serializer, tab_data, errors)``: a partial serializer over the changed
+    scalar fields, the patched ``tab_data`` (``None`` if untouched) with only
+    the changed ``lines`` validated, and their errors.
+    """
+    document = {f: getattr(tab, f) for f in TAB_PATCH_FIELDS}
+    patched = jsonpatch.apply(document, operations)
+    if not isinstance(patched, dict) or patched.keys() != document.keys():
+        raise jsonpatch.PatchUnprocessable(f"Only these fields can be patched: {', '.join(TAB_PATCH_FIELDS)}")
+
+    tab_data, errors = patched.pop('tab_data'), {}
+    if tab_data is document['tab_data']:
+        tab_data = None
+    elif not isinstance(tab_data, dict):
+        errors['/tab_data'] = ["Expected an object."]
+    elif 'lines' in tab_data:
+        before = (document['tab_data'] or {}).get('lines')
+        lines, errors = jsonpatch.validate_changed(before, tab_data['lines'], TabLineSerializer, '/tab_data/lines')
+        tab_data = {**tab_data, 'lines': lines}
+    data = {f: v for f, v in patched.items() if v is not document[f]}
+    return GuitarTabSerializer(tab, data=data, partial=True), tab_data, errors
+
+def _patch_tab(request, tab):
+    """
+    PATCH with an RFC 6902 body, applied to the loaded row and saved as a
+    conditional update on its revision (re-applied if another write slipped
+    in, or 412 when the client sent If-Match).
+    """
+    expected = conditional.parse_if_match(request, 'guitartab', tab.id)
+    for _ in range(PATCH_ATTEMPTS):
+        if expected is not None and expected != (tab.revision,):
+            return _tab_response(tab, status.HTTP_412_PRECONDITION_FAILED)
+        try:
+            serializer, tab_data, errors = _tab_patch(tab, request.data)
+        except jsonpatch.PatchError as e:
+            return Response({"error": str(e)}, status=e.status_code)
+        if not serializer.is_valid() or errors:
+            return Response({**serializer.errors, **errors}, status=status.HTTP_400_BAD_REQUEST)
+        if tab_data is not None:
+            tab.tab_data = tab_data
+        try:
+            with transaction.atomic():
+                claim_revision(tab, tab.revision)
+                serializer.save()
+            return _tab_response(tab)
+        except RevisionConflict:
+            tab = GuitarTab.objects.filter(id=tab.id).first()
+            if tab is None:
+                return Response({"error": "Guitar tab not found"}, status=status.HTTP_404_NOT_FOUND)
+            if expected is not None:
+                return _tab_response(tab, status.HTTP_412_PRECONDITION_FAILED)
+    return _tab_response(tab, status.HTTP_409_CONFLICT)
+
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
+@parser_classes(jsonpatch.parser_classes())
 def guitartab_detail(request, tab_id):
+    if request.method == 'GET' and conditional.has_conditions(request):
+        # Revalidation: answer 304 from the row stamps alone
+        stamps = GuitarTab.objects.filter(id=tab_id).values_list('revision', 'updated_at').first()
+        if stamps is not None:
+            revision, updated_at = stamps
+            not_modified = conditional.conditional_response(
+                request, conditional.version_etag('guitartab', tab_id, revision), updated_at
+            )
+            if not_modified is not None:
+                return not_modified
+
     try:
         tab = GuitarTab.objects.get(id=tab_id)
     except GuitarTab.DoesNotExist:
         return Response({"error": "Guitar tab not found"}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        serializer = GuitarTabSerializer(tab)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return _tab_response(tab)
+
+    elif request.method == 'PATCH' and jsonpatch.is_patch(request):
+        return _patch_tab(request, tab)
     
     elif request.method in ['PUT', 'PATCH']:
+        # If-Match: conditional UPDATE on the revision, 412 + current state on conflict
+        expected = conditional.parse_if_match(request, 'guitartab', tab.id)
+        if expected is not None and expected != (tab.revision,):
+            return _tab_response(tab, status.HTTP_412_PRECONDITION_FAILED)
+
         partial = (request.method == 'PATCH')
         serializer = GuitarTabSerializer(tab, data=request.data, partial=partial)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            try:
+                with transaction.atomic():
+                    if expected is not None:
+                        claim_revision(tab, tab.revision)
+                    serializer.save()
+            except RevisionConflict:
+                current = GuitarTab.objects.filter(id=tab_id).first()
+                if current is None:
+                    return Response({"error": "Guitar tab not found"}, status=status.HTTP_404_NOT_FOUND)
+                return _tab_response(current, status.HTTP_412_PRECONDITION_FAILED)
+            return _tab_response(tab)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == 'DELETE':
@@ -1,8 +1,11 @@
 from django.contrib import admin
 from .models import Song
 from .models import SongFlow
+from .models import Setlist, SetlistItem
 
 
 # Register your models here.
 admin.site.register(Song)
 admin.site.register(SongFlow)
+admin.site.register(Setlist)
+admin.site.register(SetlistItem)
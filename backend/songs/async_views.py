@@ -0,0 +1,93 @@
+"""
+ASGI-native twins of the busiest read endpoints (``get_songs``,
+``get_song_detail``), same query parameters and payloads, on the async ORM.
+Edits stay on the DRF views in ``songs.views``.
+"""
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from rest_framework import status
+
+from worship_sys import conditional, pagination
+from worship_sys.async_api import async_api_view, json_response
+from .models import Song
+from .serializers import SongSerializer
+from .views import _list_projection, _song_list_queryset, _song_list_render, _song_validators, cached_song_list
+
+
+@async_api_view(['GET'], allow_anonymous=True)
+@cached_song_list
+async def get_songs(request):
+    cursor_mode = pagination.wants_cursor(request)
+    try:
+        fields = _list_projection(request)
+    except ValueError as e:
+        return json_response({"error": str(e)}, status.HTTP_400_BAD_REQUEST)
+
+    # the search index may have to be read in first: that runs in a thread
+    if request.query_params.get('search', '').strip():
+        stamp_qs = await sync_to_async(_song_list_queryset)(request)
+    else:
+        stamp_qs = _song_list_queryset(request)
+    qs, render = _song_list_render(stamp_qs, fields)
+    page, page_size = pagination.page_params(request)
+
+    params = request.query_params.urlencode()
+    if cursor_mode:
+        try:
+            window = pagination.cursor_queryset(stamp_qs, request, page_size)
+        except pagination.InvalidCursor as e:
+            return json_response({"error": str(e)}, status.HTTP_400_BAD_REQUEST)
+        stamps = [row async for row in window.values_list('id', 'updated_at', 'flow__updated_at')]
+        etag = conditional.make_etag('songs', params, *stamps)
+        not_modified = conditional.conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        songs, next_cursor, total = await pagination.apaginate_by_cursor(qs, request, page_size)
+        data = {
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "songs": render(songs),
+        }
+        if total is not None:
+            data["total"] = total
+        return conditional.set_validators(json_response(data), etag)
+
+    stamps = await stamp_qs.aaggregate(total=Count('id'), modified=Max('updated_at'),
+                                       flow_modified=Max('flow__updated_at'))
+    total = stamps['total']
+    etag = conditional.make_etag('songs', params, total, stamps['modified'], stamps['flow_modified'])
+    not_modified = conditional.conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    start = (page - 1) * page_size
+    rows = [row async for row in qs[start:start + page_size]]
+    return conditional.set_validators(json_response({
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "songs": render(rows),
+    }), etag)
+
+
+@async_api_view(['GET'])
+async def get_song_detail(request, song_id):
+    if conditional.has_conditions(request):
+        # Revalidation: answer 304 from the row stamps alone
+        stamps = await Song.objects.filter(id=song_id).values_list(
+            'revision', 'updated_at', 'flow__updated_at').afirst()
+        if stamps is not None:
+            not_modified = conditional.conditional_response(request, *_song_validators(song_id, *stamps))
+            if not_modified is not None:
+                return not_modified
+
+    try:
+        song = await Song.objects.with_related().aget(id=song_id)
+    except Song.DoesNotExist:
+        return json_response({"error": "Song not found"}, status.HTTP_404_NOT_FOUND)
+    flow = getattr(song, 'flow', None)
+    return conditional.set_validators(
+        json_response(SongSerializer(song).data),
+        *_song_validators(song.id, song.revision, song.updated_at, flow and flow.updated_at),
+    )
@@ -0,0 +1,157 @@
+"""
+Process-local prefix index for title/artist typeahead.
+
+Every song and guitar tab contributes ``(term, kind, id)`` entries: the
+whole normalized title, each title suffix that starts at a word boundary,
+and the same for the artist. Each rank tier (title start, title word,
+artist) keeps its own sorted list. A lookup bisects the tiers best first,
+scans a bounded run of matches in each, and stops once a tier has filled
+the limit, so a short prefix with many artist matches never crowds out a
+title match. Cost depends on the number of matches, not the catalog size.
+
+The index is built from the database on first use and then kept current by
+the signal handlers in ``songs.signals``. It lives in each worker process;
+a worker that misses a change from another process catches up when the
+index is rebuilt (``reset()``) or the process restarts.
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+from guitartabs.models import GuitarTab
+from .models import Song
+
+SONG = "song"
+TAB = "tab"
+
+# rank of a match: lower is better
+TITLE_START, TITLE_WORD, ARTIST = 0, 1, 2
+RANKS = (TITLE_START, TITLE_WORD, ARTIST)
+
+# Khmer text often separates words with ZERO WIDTH SPACE rather than spaces
+_WORD_SPLIT = re.compile(r"[\s\u200b]+")
+# Upper bound on entries looked at per tier and query, keeps lookups sub-millisecond
+MAX_SCAN = 500
+
+
+def normalize(text: str) -> str:
+    """NFKC + casefold, so composed/decomposed and cased forms compare equal."""
+    return unicodedata.normalize("NFKC", text or "").casefold().strip()
+
+
+def _suffixes(text: str):
+    words = [w for w in _WORD_SPLIT.split(normalize(text)) if w]
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._tiers = {rank: [] for rank in RANKS}   # rank -> sorted (term, kind, id)
+        self._docs = {}      # (kind, id) -> (payload, [(term, rank, kind, id)])
+        self._lock = threading.RLock()
+        self.built = False
+
+    def _entries_for(self, kind, pk, title, artist):
+        entries = []
+        for i, term in enumerate(_suffixes(title)):
+            entries.append((term, TITLE_START if i == 0 else TITLE_WORD, kind, pk))
+        for term in _suffixes(artist):
+            entries.append((term, ARTIST, kind, pk))
+        return entries
+
+    def load(self, docs):
+        """Replace the index with ``(kind, id, title, artist, key)`` rows."""
+        tiers, table = {rank: [] for rank in RANKS}, {}
+        for kind, pk, title, artist, key in docs:
+            own = self._entries_for(kind, pk, title, artist)
+            for term, rank, _, _ in own:
+                tiers[rank].append((term, kind, pk))
+            table[(kind, pk)] = ({"type": kind, "id": pk, "title": title, "artist": artist, "key": key}, own)
+        for entries in tiers.values():
+            entries.sort()
+        with self._lock:
+            self._tiers, self._docs, self.built = tiers, table, True
+
+    def add(self, kind, pk, title, artist, key=None):
+        with self._lock:
+            self.remove(kind, pk)
+            own = self._entries_for(kind, pk, title, artist)
+            for term, rank, _, _ in own:
+                insort(self._tiers[rank], (term, kind, pk))
+            self._docs[(kind, pk)] = ({"type": kind, "id": pk, "title": title, "artist": artist, "key": key}, own)
+
+    def remove(self, kind, pk):
+        with self._lock:
+            doc = self._docs.pop((kind, pk), None)
+            if doc is None:
+                return
+            for term, rank, _, _ in doc[1]:
+                entries, entry = self._tiers[rank], (term, kind, pk)
+                i = bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+
+    def search(self, query: str, limit: int = 10, kinds=(SONG, TAB)):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        best = {}
+        with self._lock:
+            for rank in RANKS:
+                # every doc found so far outranks anything a later tier can add
+                if len(best) >= limit:
+                    break
+                entries = self._tiers[rank]
+                i = bisect_left(entries, (prefix,))
+                end = min(len(entries), i + MAX_SCAN)
+                while i < end:
+                    term, kind, pk = entries[i]
+                    if not term.startswith(prefix):
+                        break
+                    # a whole-word match beats a partial one at the same rank
+                    score = rank * 2 + (len(term) > len(prefix) and term[len(prefix)] != " ")
+                    if kind in kinds and score < best.get((kind, pk), 99):
+                        best[(kind, pk)] = score
+                    i += 1
+            docs = [(score, self._docs[k][0]) for k, score in best.items()]
+        docs.sort(key=lambda d: (d[0], len(d[1]["title"]), d[1]["title"]))
+        return [doc for _, doc in docs[:limit]]
+
+    def __len__(self):
+        return len(self._docs)
+
+
+index = PrefixIndex()
+_build_lock = threading.Lock()
+
+
+def _load_from_db():
+    songs = ((SONG, pk, t, a, k) for pk, t, a, k in Song.objects.values_list("id", "title", "artist", "key"))
+    tabs = ((TAB, pk, t, a, k) for pk, t, a, k in GuitarTab.objects.values_list("id", "title", "artist", "key"))
+    index.load([*songs, *tabs])
+
+
+def get_index() -> PrefixIndex:
+    """The process index, built from the database on first use."""
+    if not index.built:
+        with _build_lock:
+            if not index.built:
+                _load_from_db()
+    return index
+
+
+def reset() -> None:
+    """Drop the index; the next lookup rebuilds it."""
+    with index._lock:
+        index._tiers, index._docs, index.built = {rank: [] for rank in RANKS}, {}, False
+
+
+def update(kind, obj) -> None:
+    if index.built:
+        index.add(kind, obj.pk, obj.title, obj.artist, obj.key)
+
+
+def discard(kind, pk) -> None:
+    if index.built:
+        index.remove(kind, pk)
@@ -0,0 +1,58 @@
+"""
+Minimal ChordPro reader.
+
+Turns a ``.cho``/``.chordpro`` file into the record shape the importer and
+``SongSerializer`` expect: metadata from directives and ``lyrics`` as
+``[{text, chords: [{chord, position}]}]`` with positions as character
+offsets into the line.
+"""
+import re
+
+_DIRECTIVE = re.compile(r'^\{\s*([A-Za-z_]+)\s*(?::\s*(.*?))?\s*\}$')
+_CHORD = re.compile(r'\[([^\]]*)\]')
+
+# directive -> record field
+_META = {
+    'title': 'title', 't': 'title',
+    'artist': 'artist', 'subtitle': 'artist', 'st': 'artist',
+    'key': 'key',
+    'tempo': 'tempo',
+    'time': 'time_signature',
+}
+
+
+def parse_line(line: str) -> dict:
+    """``"[G]Amazing [D]grace"`` -> ``{"text": "Amazing grace", "chords": [...]}``."""
+    text, chords, last = [], [], 0
+    length = 0
+    for m in _CHORD.finditer(line):
+        chunk = line[last:m.start()]
+        text.append(chunk)
+        length += len(chunk)
+        if m.group(1).strip():
+            chords.append({"chord": m.group(1).strip(), "position": length})
+        last = m.end()
+    text.append(line[last:])
+    return {"text": "".join(text), "chords": chords}
+
+
+def parse(source: str) -> dict:
+    record = {"lyrics": []}
+    for raw in source.splitlines():
+        line = raw.rstrip()
+        if line.startswith('#'):
+            continue
+        m = _DIRECTIVE.match(line.strip())
+        if m:
+            field = _META.get(m.group(1).lower())
+            if field and m.group(2):
+                record.setdefault(field, m.group(2))
+            continue
+        record["lyrics"].append(parse_line(line))
+    # drop leading/trailing blank lines left around directives
+    lyrics = record["lyrics"]
+    while lyrics and not lyrics[0]["text"].strip() and not lyrics[0]["chords"]:
+        lyrics.pop(0)
+    while lyrics and not lyrics[-1]["text"].strip() and not lyrics[-1]["chords"]:
+        lyrics.pop()
+    return record
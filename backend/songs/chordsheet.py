@@ -0,0 +1,345 @@
+"""
+Print-ready chord sheets for songs and setlists.
+
+``build_song``/``build_setlist`` reduce what is printed to a plain dict (the
+already transposed ``lyrics`` plus title, artist, key and flow notes).
+``render`` turns that into chord-over-lyric text or a PDF and keeps the
+result on disk under the sha256 of the dict, so printing an unchanged
+setlist again is a file read.
+
+Chords are placed by display column, not by code point: Khmer combining
+signs, subscript consonants (coeng + consonant) and format characters such
+as the zero-width space take no column, and East Asian wide characters take
+two, so a chord stays over the syllable it belongs to.
+
+The PDF is written by hand in Courier (no dependency); Courier only covers
+Windows-1252, so other characters print as ``?``. Setting
+``CHORDSHEET_FONT`` to a TrueType file with the needed glyphs (e.g. Noto
+Sans Khmer) renders pages through Pillow instead, placing each chord at the
+measured width of the lyric before it. Pillow only shapes Khmer correctly
+when built with libraqm.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import unicodedata
+
+from django.conf import settings
+
+# bump when the output for the same input changes
+RENDER_VERSION = 1
+
+CONTENT_TYPES = {
+    "txt": "text/plain; charset=utf-8",
+    "pdf": "application/pdf",
+}
+
+KHMER_COENG = "្"
+
+# A4 in points
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+MARGIN = 40
+FONT_SIZE, MIN_FONT_SIZE = 10.0, 6.0
+COURIER_ADVANCE = 0.6   # glyph width / font size
+RASTER_DPI = 150
+
+
+# ---------------------------------------------------------------------------
+# layout
+# ---------------------------------------------------------------------------
+def char_width(ch: str) -> int:
+    """Terminal-style column width of one code point."""
+    if " " <= ch < "\x7f":
+        return 1
+    if unicodedata.category(ch) in ("Mn", "Me", "Cf", "Cc"):
+        return 0
+    return 2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1
+
+
+def text_width(text: str) -> int:
+    width, after_coeng = 0, False
+    for ch in text:
+        # the consonant after a coeng is written below the previous one
+        if not after_coeng:
+            width += char_width(ch)
+        after_coeng = ch == KHMER_COENG
+    return width
+
+
+def chord_line(text: str, chords) -> str:
+    """The chord row for a lyric line; chords never overlap, at least one space apart."""
+    out, col = [], 0
+    for chord in sorted(chords, key=lambda c: c.get("position", 0)):
+        name = chord.get("chord") or ""
+        if not name:
+            continue
+        at = text_width(text[:max(chord.get("position", 0), 0)])
+        if out:
+            at = max(at, col + 1)
+        out.append(" " * (at - col) + name)
+        col = at + text_width(name)
+    return "".join(out)
+
+
+def song_blocks(song: dict) -> list:
+    """
+    A song as blocks of lines that should not be split across pages: the
+    header, then one block per lyric line (its chord row plus the lyric).
+    """
+    header = [song.get("title") or "Untitled"]
+    details = [d for d in (song.get("artist"), song.get("key") and f"Key: {song['key']}") if d]
+    if details:
+        header.append(" · ".join(details))
+    if song.get("flow_notes"):
+        header.append(f"Flow: {song['flow_notes']}")
+    header.append("")
+
+    blocks = [header]
+    for line in song.get("lyrics") or ():
+        text = line.get("text") or ""
+        chords = chord_line(text, line.get("chords") or ())
+        blocks.append([row for row in (chords, text) if row] or [""])
+    return blocks
+
+
+def render_text(sheet: dict) -> str:
+    """Plain text, one song after another separated by form feeds."""
+    pages = []
+    for song in sheet["songs"]:
+        lines = [row for block in song_blocks(song) for row in block]
+        pages.append("\n".join(lines).rstrip("\n") + "\n")
+    title = sheet.get("title")
+    if title and pages:
+        pages[0] = f"{title}\n\n{pages[0]}"
+    return "\f".join(pages)
+
+
+def _paginate(sheet: dict, rows_per_page: int) -> list:
+    """Pages of lines; every song starts a new page and blocks are kept whole."""
+    pages = []
+    for i, song in enumerate(sheet["songs"]):
+        blocks = song_blocks(song)
+        if i == 0 and sheet.get("title"):
+            blocks.insert(0, [sheet["title"], ""])
+        page = []
+        for block in blocks:
+            if page and len(page) + len(block) > rows_per_page:
+                pages.append(page)
+                page = []
+            page.extend(block)
+        pages.append(page)
+    return pages or [[]]
+
+
+# ---------------------------------------------------------------------------
+# PDF (Courier)
+# ---------------------------------------------------------------------------
+def _pdf_string(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def render_pdf(sheet: dict) -> bytes:
+    lines = [row for song in sheet["songs"] for block in song_blocks(song) for row in block]
+    columns = max((text_width(row) for row in lines), default=0)
+    usable = PAGE_WIDTH - 2 * MARGIN
+    # shrink to fit the widest line rather than wrapping it away from its chords
+    size = FONT_SIZE if columns * COURIER_ADVANCE * FONT_SIZE <= usable else max(
+        MIN_FONT_SIZE, usable / (columns * COURIER_ADVANCE))
+    leading = size * 1.2
+    pages = _paginate(sheet, int((PAGE_HEIGHT - 2 * MARGIN) // leading))
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,   # page tree, once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for page in pages:
+        stream = b"BT /F1 %.2f Tf %.2f TL %d %.2f Td\n" % (size, leading, MARGIN, PAGE_HEIGHT - MARGIN - size)
+        stream += b"".join(_pdf_string(row) + b" Tj T*\n" for row in page) + b"ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# PDF (TrueType via Pillow)
+# ---------------------------------------------------------------------------
+def _font(size: int):
+    from PIL import ImageFont
+    return ImageFont.truetype(settings.CHORDSHEET_FONT, size)
+
+
+def render_pdf_raster(sheet: dict) -> bytes:
+    from PIL import Image, ImageDraw
+
+    scale = RASTER_DPI / 72
+    width, height, margin = (int(v * scale) for v in (PAGE_WIDTH, PAGE_HEIGHT, MARGIN))
+    font = _font(int(FONT_SIZE * scale))
+    leading = int(FONT_SIZE * 1.5 * scale)
+
+    images, y, draw = [], height, None
+
+    def new_page():
+        nonlocal y, draw
+        image = Image.new("L", (width, height), 255)
+        images.append(image)
+        draw, y = ImageDraw.Draw(image), margin
+
+    for i, song in enumerate(sheet["songs"]):
+        new_page()
+        if i == 0 and sheet.get("title"):
+            draw.text((margin, y), sheet["title"], font=font, fill=0)
+            y += 2 * leading
+        blocks = song_blocks(song)
+        rows = [[(0, row)] for row in blocks[0]]
+        for line in song.get("lyrics") or ():
+            text = line.get("text") or ""
+            placed, end = [], 0
+            for chord in sorted(line.get("chords") or (), key=lambda c: c.get("position", 0)):
+                if chord.get("chord"):
+                    x = max(font.getlength(text[:max(chord.get("position", 0), 0)]), end)
+                    placed.append((x, chord["chord"]))
+                    end = x + font.getlength(chord["chord"] + " ")
+            rows.append(placed)
+            rows.append([(0, text)])
+        for row in rows:
+            if y + leading > height - margin:
+                new_page()
+            for x, text in row:
+                draw.text((margin + x, y), text, font=font, fill=0)
+            y += leading if row else leading // 2
+
+    if not images:
+        new_page()
+    out = io.BytesIO()
+    images[0].save(out, "PDF", resolution=RASTER_DPI, save_all=True, append_images=images[1:])
+    return out.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# disk cache
+# ---------------------------------------------------------------------------
+def cache_dir() -> str:
+    return str(getattr(settings, "CHORDSHEET_CACHE_DIR", os.path.join(settings.BASE_DIR, "chordsheet_cache")))
+
+
+def digest(sheet: dict, fmt: str) -> str:
+    font = getattr(settings, "CHORDSHEET_FONT", None) if fmt == "pdf" else None
+    payload = json.dumps([RENDER_VERSION, fmt, font, sheet], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _render(sheet: dict, fmt: str) -> bytes:
+    if fmt == "txt":
+        return render_text(sheet).encode("utf-8")
+    if getattr(settings, "CHORDSHEET_FONT", None):
+        return render_pdf_raster(sheet)
+    return render_pdf(sheet)
+
+
+def _prune(directory: str, keep: int) -> None:
+    """Drop all but the *keep* most recently used sheets."""
+    # *.tmp files are another writer's sheet on its way in
+    suffixes = tuple(f".{fmt}" for fmt in CONTENT_TYPES)
+    entries = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(suffixes):
+            continue
+        try:
+            entries.append((entry.stat().st_mtime, entry.path))
+        except FileNotFoundError:   # pruned by someone else meanwhile
+            pass
+    entries.sort(reverse=True)
+    for _, path in entries[keep:]:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _open_cached(path: str):
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(path)   # a hit keeps the sheet at the young end for _prune
+    except FileNotFoundError:
+        pass             # pruned after the open: the open file still reads fine
+    return f
+
+
+def render(sheet: dict, fmt: str):
+    """
+    ``(file, sha256)``: *sheet* rendered as *fmt*, as an open binary file the
+    caller closes, rendering only on a cache miss.
+    """
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported format: {fmt!r}")
+    key = digest(sheet, fmt)
+    directory = cache_dir()
+    path = os.path.join(directory, f"{key}.{fmt}")
+    f = _open_cached(path)
+    if f is not None:
+        return f, key
+
+    os.makedirs(directory, exist_ok=True)
+    data = _render(sheet, fmt)
+    # write aside and rename, so a concurrent reader never sees half a file
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as out:
+        out.write(data)
+    os.replace(tmp, path)
+    _prune(directory, getattr(settings, "CHORDSHEET_CACHE_MAX_FILES", 500))
+    # served from memory: a concurrent prune may already have taken the file
+    return io.BytesIO(data), key
+
+
+# ---------------------------------------------------------------------------
+# input
+# ---------------------------------------------------------------------------
+def _entry(data: dict) -> dict:
+    return {field: data.get(field) for field in ("title", "artist", "key", "flow_notes", "lyrics")}
+
+
+def build_song(song, lyrics=None, key=None) -> dict:
+    """Sheet for one song, optionally with already transposed *lyrics* and *key*."""
+    flow = getattr(song, "flow", None)
+    return {
+        "title": None,
+        "songs": [_entry({
+            "title": song.title,
+            "artist": song.artist,
+            "key": key or song.key,
+            "flow_notes": flow.flow_notes if flow else "",
+            "lyrics": song.lyrics if lyrics is None else lyrics,
+        })],
+    }
+
+
+def build_setlist(payload: dict) -> dict:
+    """Sheet for a hydrated setlist payload (see ``songs.views._hydrate_setlist``)."""
+    title = " · ".join(str(p) for p in (payload.get("name"), payload.get("service_date")) if p)
+    return {"title": title or None, "songs": [_entry(song) for song in payload["songs"]]}
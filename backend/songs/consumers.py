@@ -0,0 +1,57 @@
+"""
+WebSocket consumer for live charts: ``ws/songs/<id>/`` follows one song,
+``ws/setlists/<id>/`` every song of a setlist (messages in ``songs.live``).
+
+The socket is read-only; edits still go through the REST API. On connect
+the client gets ``{"type": "subscribed", ...}`` with the revisions it should
+compare against. It is sent after joining the group and counting the
+subscriber (``live.watch``), so no edit committed later is missed. Close
+codes: 4401 without a valid ``?token=``, 4404 for an unknown id.
+"""
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from . import live
+from .models import Setlist, SetlistItem, Song
+
+
+class ChartConsumer(AsyncJsonWebsocketConsumer):
+    group = None
+
+    async def connect(self):
+        await self.accept()
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        kwargs = self.scope["url_route"]["kwargs"]
+        if "song_id" in kwargs:
+            song_id = kwargs["song_id"]
+            group, found = live.song_group(song_id), await Song.objects.filter(id=song_id).aexists()
+        else:
+            setlist_id = kwargs["setlist_id"]
+            group, found = live.setlist_group(setlist_id), await Setlist.objects.filter(id=setlist_id).aexists()
+        if not found:
+            await self.close(code=4404)
+            return
+
+        self.group = group
+        await self.channel_layer.group_add(group, self.channel_name)
+        await live.watch(group)
+        if "song_id" in kwargs:
+            revision = await Song.objects.filter(id=song_id).values_list("revision", flat=True).afirst()
+            await self.send_json({"type": "subscribed", "song_id": song_id, "revision": revision})
+        else:
+            items = SetlistItem.objects.filter(setlist_id=setlist_id).values_list("song_id", "song__revision")
+            await self.send_json({
+                "type": "subscribed",
+                "setlist_id": setlist_id,
+                "revisions": {str(song_id): revision async for song_id, revision in items},
+            })
+
+    async def disconnect(self, code):
+        if self.group is not None:
+            await live.unwatch(self.group)
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def chart_message(self, event):
+        await self.send_json(event["message"])
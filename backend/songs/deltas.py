@@ -0,0 +1,161 @@
+"""
+Line-level deltas between song versions.
+
+A version (a Song with ``original_song`` set) may store ``lyrics_delta``
+instead of its full lyrics: a list of ops against the parent's lyrics,
+
+    ["=", n]         keep the parent's next n lines
+    ["-", n]         skip the parent's next n lines
+    ["+", [...]]     insert these lines
+
+``delta_depth`` is an upper bound on the number of deltas between a row and
+the nearest full copy. A version whose depth would exceed
+``SONG_VERSION_SNAPSHOT_INTERVAL`` is stored whole, so reading any version
+resolves at most that many ancestors: one query per chain level, shared by
+every row in the batch (see ``SongIterable``).
+"""
+import json
+from difflib import SequenceMatcher
+
+from django.conf import settings
+
+OPS = ("=", "-", "+")
+
+# columns needed to turn a stored row back into its lyrics
+STORAGE_FIELDS = ("lyrics", "lyrics_packed", "lyrics_delta", "original_song")
+
+
+def snapshot_interval() -> int:
+    return getattr(settings, "SONG_VERSION_SNAPSHOT_INTERVAL", 8)
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def diff(base: list, lyrics: list) -> list:
+    """Ops that turn *base* into *lyrics*."""
+    a = [_dumps(line) for line in base]
+    b = [_dumps(line) for line in lyrics]
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append(["=", i2 - i1])
+            continue
+        if i2 > i1:
+            ops.append(["-", i2 - i1])
+        if j2 > j1:
+            ops.append(["+", lyrics[j1:j2]])
+    return ops
+
+
+def _copy_line(line):
+    # lines shared with the parent are copied so versions never alias each other
+    if isinstance(line, dict):
+        chords = line.get("chords")
+        line = dict(line)
+        if isinstance(chords, list):
+            line["chords"] = [dict(c) if isinstance(c, dict) else c for c in chords]
+    return line
+
+
+def apply(base: list, ops: list) -> list:
+    """Inverse of ``diff``: rebuild a version's lyrics from its parent's."""
+    lyrics, i = [], 0
+    for op, arg in ops:
+        if op == "=":
+            lyrics.extend(_copy_line(line) for line in base[i:i + arg])
+            i += arg
+        elif op == "-":
+            i += arg
+        elif op == "+":
+            lyrics.extend(arg)
+        else:
+            raise ValueError(f"Unknown lyrics delta op {op!r}")
+    return lyrics
+
+
+def make_delta(parent_lyrics, parent_depth: int, lyrics):
+    """
+    ``(ops, depth)`` for storing *lyrics* against its parent, or ``(None, 0)``
+    when a full copy is due (snapshot interval reached, or the delta would be
+    no smaller than the lyrics themselves).
+    """
+    if (not isinstance(parent_lyrics, list) or not isinstance(lyrics, list)
+            or parent_depth + 1 > snapshot_interval()):
+        return None, 0
+    ops = diff(parent_lyrics, lyrics)
+    if len(_dumps(ops)) >= len(_dumps(lyrics)):
+        return None, 0
+    return ops, parent_depth + 1
+
+
+def resolve(songs, using: str = "default") -> None:
+    """Fill in ``lyrics`` for delta-stored *songs* in place."""
+    pending = [
+        s for s in songs
+        if s.__dict__.get("lyrics_delta") is not None and "lyrics" in s.__dict__
+        and s.__dict__.get("original_song_id") is not None
+    ]
+    if not pending:
+        return
+    from .models import Song
+
+    # the parents come through SongIterable too, which resolves the next level up
+    parents = Song.objects.using(using).only(*STORAGE_FIELDS).in_bulk(
+        {s.original_song_id for s in pending}
+    )
+    for song in pending:
+        parent = parents.get(song.original_song_id)
+        if parent is not None and parent.lyrics is not None:
+            song.lyrics = apply(parent.lyrics, song.lyrics_delta)
+
+
+def rebase_children(bases: dict, using: str = "default") -> int:
+    """
+    Re-express the delta versions of the songs in *bases* before those songs
+    are rewritten. *bases* maps parent id -> ``(new_lyrics, new_depth)``, or
+    ``(None, 0)`` for a parent that is being deleted. Children whose delta is
+    unchanged are left alone; the others get a new delta, or a full copy when
+    the new one would be deeper than their stored depth (which later
+    versions rely on as an upper bound). Returns the number of rows written.
+    """
+    if not bases:
+        return 0
+    from .models import Song
+
+    children = Song.objects.using(using).filter(
+        original_song__in=list(bases), lyrics_delta__isnull=False,
+    ).only("id", "delta_depth", *STORAGE_FIELDS)
+    changed = []
+    for child in children:
+        lyrics, depth = bases[child.original_song_id]
+        ops, new_depth = make_delta(lyrics, depth, child.lyrics) if lyrics is not None else (None, 0)
+        if ops is not None and new_depth > child.delta_depth:
+            ops, new_depth = None, 0
+        if ops == child.lyrics_delta and new_depth == child.delta_depth:
+            continue
+        # bulk_update skips Field.pre_save: write exactly the stored form
+        if ops is not None:
+            child.lyrics = None
+        child.lyrics_packed, child.lyrics_delta, child.delta_depth = None, ops, new_depth
+        changed.append(child)
+    if changed:
+        Song.objects.using(using).bulk_update(
+            changed, ["lyrics", "lyrics_packed", "lyrics_delta", "delta_depth"]
+        )
+    return len(changed)
+
+
+def prepare(song, using: str = "default") -> None:
+    """
+    Called from ``Song.save`` when lyrics may change: choose delta or full
+    storage for *song* and rebase its own delta children onto the new lyrics.
+    """
+    ops, depth = None, 0
+    if song.original_song_id is not None and song.original_song_id != song.pk:
+        parent = song.original_song
+        ops, depth = make_delta(parent.lyrics, parent.delta_depth, song.lyrics)
+    song.lyrics_delta, song.delta_depth = ops, depth
+    if song.pk is not None:
+        rebase_children({song.pk: (song.lyrics, depth)}, using)
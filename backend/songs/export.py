@@ -0,0 +1,34 @@
+"""
+Streaming NDJSON export of the song catalog.
+
+Songs are read with ``QuerySet.iterator(chunk_size=...)`` (flow notes and the
+linked guitar tab joined in the same query) and encoded one line at a time,
+so memory use does not depend on the size of the catalog.
+"""
+import json
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from guitartabs.serializers import GuitarTabSerializer
+from .models import Song
+from .serializers import SongSerializer
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def iter_records(queryset=None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield one dict per song: the SongSerializer payload plus ``guitar_tab``."""
+    if queryset is None:
+        queryset = Song.objects.all()
+    songs = queryset.with_related().select_related('guitar_tab').order_by('id')
+    for song in songs.iterator(chunk_size=chunk_size):
+        record = SongSerializer(song).data
+        record["guitar_tab"] = GuitarTabSerializer(song.guitar_tab).data if song.guitar_tab else None
+        yield record
+
+
+def iter_ndjson(queryset=None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Yield the catalog as UTF-8 encoded NDJSON lines."""
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for record in iter_records(queryset, chunk_size):
+        yield (encoder.encode(record) + "\n").encode("utf-8")
@@ -0,0 +1,173 @@
+"""
+Bulk song importer used by ``manage.py import_songs``.
+
+Records (JSON, NDJSON or ChordPro) are validated with ``SongSerializer`` and
+written per batch inside a transaction: new songs via ``bulk_create``,
+existing ones (matched on title, artist, version) via ``bulk_update``, with
+their SongFlow rows handled the same way.
+"""
+import json
+from pathlib import Path
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from guitartabs.models import GuitarTab
+from . import chordpro, deltas
+from .models import Song, SongFlow
+from .serializers import SongSerializer
+from .signals import songs_bulk_saved
+
+JSON_SUFFIXES = {'.json'}
+NDJSON_SUFFIXES = {'.ndjson', '.jsonl'}
+CHORDPRO_SUFFIXES = {'.cho', '.chordpro', '.chopro', '.crd', '.pro'}
+SUFFIXES = JSON_SUFFIXES | NDJSON_SUFFIXES | CHORDPRO_SUFFIXES
+
+# Export-only keys that do not carry over between databases
+IGNORED_KEYS = ('id', 'created_at', 'updated_at', 'original_song', 'guitar_tab')
+
+# bulk_update skips Field.pre_save, so updated rows are written as plain JSON
+# (no packed form or version delta) until their next save or 'manage.py
+# pack_lyrics' / 'manage.py compact_song_versions'.
+UPDATE_FIELDS = [
+    'imageUrl', 'key', 'tempo', 'time_signature', 'lyrics', 'lyrics_packed',
+    'lyrics_delta', 'delta_depth', 'guitar_tab', 'updated_at', 'revision',
+]
+
+
+def iter_files(path):
+    path = Path(path)
+    if path.is_dir():
+        return sorted(p for p in path.rglob('*') if p.suffix.lower() in SUFFIXES)
+    return [path]
+
+
+def read_records(path):
+    """Yield ``(source, record)`` pairs from a file or directory."""
+    for file in iter_files(path):
+        suffix = file.suffix.lower()
+        if suffix in NDJSON_SUFFIXES:
+            with file.open(encoding='utf-8') as fh:
+                for lineno, line in enumerate(fh, 1):
+                    if line.strip():
+                        yield f'{file}:{lineno}', json.loads(line)
+        elif suffix in CHORDPRO_SUFFIXES:
+            yield str(file), chordpro.parse(file.read_text(encoding='utf-8'))
+        else:
+            data = json.loads(file.read_text(encoding='utf-8'))
+            if isinstance(data, dict):
+                data = [data]
+            for i, record in enumerate(data):
+                yield f'{file}[{i}]', record
+
+
+def validate(record, tab_ids):
+    """Return ``(validated_data, errors)`` for one record."""
+    if not isinstance(record, dict):
+        return None, {'non_field_errors': ['Expected a JSON object']}
+    data = {k: v for k, v in record.items() if k not in IGNORED_KEYS}
+    # tab links are checked against a preloaded id set instead of one query per row
+    tab_id = data.pop('guitar_tab_id', None)
+    serializer = SongSerializer(data=data)
+    if not serializer.is_valid():
+        return None, serializer.errors
+    validated = dict(serializer.validated_data)
+    if tab_id is not None:
+        if tab_id not in tab_ids:
+            return None, {'guitar_tab_id': [f'Invalid pk "{tab_id}" - object does not exist.']}
+        validated['guitar_tab_id'] = tab_id
+    return validated, None
+
+
+def _write_batch(rows, using):
+    """Upsert one batch of validated rows; returns ``(created, updated)``."""
+    keys = {(r['title'], r['artist'], r.get('version', 1)) for r in rows}
+    existing = {
+        (s.title, s.artist, s.version): s
+        for s in Song.objects.using(using).filter(title__in={k[0] for k in keys})
+        if (s.title, s.artist, s.version) in keys
+    }
+
+    now = timezone.now()
+    to_create, to_update, flows = [], [], []
+    for row in rows:
+        row = dict(row)
+        flow_notes = row.pop('flow_notes', None)
+        key = (row['title'], row['artist'], row.get('version', 1))
+        song = existing.get(key)
+        if song is None:
+            song = Song(**row)
+            to_create.append(song)
+            existing[key] = song  # a later duplicate in the batch updates this one
+        else:
+            for field, value in row.items():
+                setattr(song, field, value)
+            song.updated_at = now
+            song.lyrics_packed = song.lyrics_delta = None
+            song.delta_depth = 0
+            if song.pk and song not in to_update:
+                song.revision = F('revision') + 1
+                to_update.append(song)
+        song.normalize()
+        if flow_notes is not None:
+            flows.append((song, flow_notes))
+
+    Song.objects.using(using).bulk_create(to_create)
+    if to_update:
+        # versions stored as deltas against these rows must not see the new lyrics
+        deltas.rebase_children({s.pk: (s.lyrics, 0) for s in to_update}, using)
+        Song.objects.using(using).bulk_update(to_update, UPDATE_FIELDS)
+        # the bumped revisions were computed by the database; receivers see the stored values
+        revisions = dict(Song.objects.using(using).filter(pk__in=[s.pk for s in to_update])
+                         .values_list('pk', 'revision'))
+        for song in to_update:
+            song.revision = revisions[song.pk]
+
+    flow_map = {f.song_id: f for f in SongFlow.objects.using(using).filter(song__in=[s for s, _ in flows])}
+    new_flows, changed_flows = [], []
+    for song, notes in flows:
+        flow = flow_map.get(song.pk)
+        if flow is None:
+            flow_map[song.pk] = flow = SongFlow(song=song, flow_notes=notes)
+            new_flows.append(flow)
+        else:
+            flow.flow_notes = notes
+            flow.updated_at = now
+            changed_flows.append(flow)
+    SongFlow.objects.using(using).bulk_create(new_flows)
+    SongFlow.objects.using(using).bulk_update(changed_flows, ['flow_notes', 'updated_at'])
+
+    songs_bulk_saved.send(sender=Song, songs=to_create + to_update, using=using)
+    return len(to_create), len(to_update)
+
+
+def import_records(records, batch_size=500, dry_run=False, using='default', on_error=None):
+    """
+    Validate and upsert ``(source, record)`` pairs.
+    Returns a dict of ``created``/``updated``/``invalid`` counts.
+    """
+    tab_ids = set(GuitarTab.objects.using(using).values_list('id', flat=True))
+    stats = {'created': 0, 'updated': 0, 'invalid': 0}
+    batch = []
+
+    def flush():
+        if batch and not dry_run:
+            with transaction.atomic(using=using):
+                created, updated = _write_batch(batch, using)
+            stats['created'] += created
+            stats['updated'] += updated
+        batch.clear()
+
+    for source, record in records:
+        validated, errors = validate(record, tab_ids)
+        if errors:
+            stats['invalid'] += 1
+            if on_error:
+                on_error(source, errors)
+            continue
+        batch.append(validated)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return stats
@@ -0,0 +1,193 @@
+"""
+Live chart sync: committed song edits pushed to WebSocket subscribers
+(``songs.consumers``) through the channel layer.
+
+Every save of a song sends its group ``song-<id>`` one message,
+
+    {"type": "chart.delta", "song_id": 7, "base_revision": 4, "revision": 5,
+     "fields": {"key": "A"}, "ops": [["=", 3], ["-", 1], ["+", [...]]]}
+
+``fields`` holds the chart fields that changed and ``ops`` the
+``songs.deltas`` line ops from the lyrics at ``base_revision`` (absent when
+the lyrics did not change). A client at ``base_revision`` applies the
+message; one already past ``revision`` ignores it; any other client missed
+something and refetches the song. Each setlist holding the song gets the
+same message on ``setlist-<id>`` per item, with the item's ``position`` and
+fields/ops taken between the charts transposed to its target key.
+
+Consumers count their subscribers in the default cache (``watch``), so a
+save nobody is listening to costs two cache ``get_many`` calls and nothing
+else. Only when the song (or any setlist) has a subscriber is the chart
+being overwritten read in ``pre_save`` (one query on the row being
+written). The save has already claimed its revision by then
+(``worship_sys.concurrency``), which locks the row, so that read is the
+chart at ``revision - 1``. Bulk writers keep no before-state, nor does a
+save that found no subscriber but commits after one arrived: those
+subscribers get ``chart.reload`` instead. As with the response cache, with
+more than one worker the cache must be shared, or a worker never learns of
+sockets held by another.
+Setlist edits send ``setlist.changed`` with the new item list; deletions
+send ``chart.deleted`` / ``setlist.deleted``.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+
+from . import deltas
+from .models import Setlist, SetlistItem, Song
+
+CHART_FIELDS = ("title", "artist", "key", "tempo", "time_signature")
+# the handler on ChartConsumer that relays a group message to its socket
+MESSAGE_TYPE = "chart.message"
+# subscriber counts: one per song group, one shared by every setlist group
+WATCHERS_KEY = "live-watchers:{}"
+SETLIST_WATCHERS = WATCHERS_KEY.format("setlists")
+
+logger = logging.getLogger(__name__)
+
+
+def song_group(song_id) -> str:
+    return f"song-{song_id}"
+
+
+def setlist_group(setlist_id) -> str:
+    return f"setlist-{setlist_id}"
+
+
+def _watchers_key(group) -> str:
+    return SETLIST_WATCHERS if group.startswith("setlist-") else WATCHERS_KEY.format(group)
+
+
+async def watch(group) -> None:
+    key = _watchers_key(group)
+    await cache.aadd(key, 0, None)
+    await cache.aincr(key)
+
+
+async def unwatch(group) -> None:
+    try:
+        await cache.adecr(_watchers_key(group))
+    except ValueError:   # evicted or cleared meanwhile
+        pass
+
+
+def listeners(song_ids) -> tuple[set, bool]:
+    """The *song_ids* with a subscriber, and whether any setlist has one."""
+    keys = {pk: WATCHERS_KEY.format(song_group(pk)) for pk in song_ids}
+    counts = cache.get_many([*keys.values(), SETLIST_WATCHERS])
+    return {pk for pk, key in keys.items() if counts.get(key, 0) > 0}, counts.get(SETLIST_WATCHERS, 0) > 0
+
+
+def charted(song, update_fields=None) -> bool:
+    """Whether saving *song* with *update_fields* can change a stored chart."""
+    if song._state.adding or song.pk is None:
+        return False
+    return update_fields is None or bool({*CHART_FIELDS, "lyrics"} & set(update_fields))
+
+
+def stored_chart(song, using, update_fields=None):
+    """
+    The stored row *song*'s save is about to overwrite (None if new,
+    untouched, or nobody is subscribed).
+    """
+    if not charted(song, update_fields):
+        return None
+    songs, setlists = listeners([song.pk])
+    if not (songs or setlists):
+        return None
+    before = Song.objects.using(using).only(
+        "revision", "updated_at", *CHART_FIELDS, *deltas.STORAGE_FIELDS
+    ).filter(pk=song.pk).first()
+    if before is not None:
+        before.revision -= 1   # the row already carries the revision this save claimed
+    return before
+
+
+def _chart(song, target_key=None):
+    """``(fields, lyrics)`` of *song* as shown in *target_key*, like a setlist does."""
+    fields = {f: getattr(song, f) for f in CHART_FIELDS}
+    lyrics = song.lyrics
+    if target_key:
+        from transpose.views import transpose_payload
+
+        transposed, error = transpose_payload(song, target_key=target_key)
+        if not error:
+            fields["key"], lyrics = transposed["transposed_key"], transposed["transposed_lyrics"]
+    return fields, lyrics
+
+
+def _changes(old, new) -> dict:
+    (old_fields, old_lyrics), (new_fields, new_lyrics) = old, new
+    changes = {"fields": {f: v for f, v in new_fields.items() if old_fields[f] != v}}
+    if old_lyrics != new_lyrics:
+        changes["ops"] = deltas.diff(old_lyrics or [], new_lyrics or [])
+    return changes
+
+
+def _setlist_items(song_ids, using):
+    return SetlistItem.objects.using(using).filter(song_id__in=song_ids).values_list(
+        "setlist_id", "position", "song_id", "target_key")
+
+
+def song_messages(before, song, using) -> list:
+    """``(group, message)`` pairs announcing *song*'s save over *before*."""
+    header = {"type": "chart.delta", "song_id": song.pk,
+              "base_revision": before.revision, "revision": song.revision}
+    messages = [(song_group(song.pk), {**header, **_changes(_chart(before), _chart(song))})]
+    if not listeners([])[1]:
+        return messages
+    by_key = {}
+    for setlist_id, position, _, target_key in _setlist_items([song.pk], using):
+        if target_key not in by_key:
+            by_key[target_key] = _changes(_chart(before, target_key), _chart(song, target_key))
+        messages.append((setlist_group(setlist_id),
+                         {**header, "setlist_id": setlist_id, "position": position, **by_key[target_key]}))
+    return messages
+
+
+def reload_messages(song_ids, using) -> list:
+    watched, setlists = listeners(song_ids)
+    messages = [(song_group(pk), {"type": "chart.reload", "song_id": pk}) for pk in song_ids if pk in watched]
+    if not setlists:
+        return messages
+    for setlist_id, position, song_id, _ in _setlist_items(song_ids, using):
+        messages.append((setlist_group(setlist_id), {
+            "type": "chart.reload", "song_id": song_id, "setlist_id": setlist_id, "position": position,
+        }))
+    return messages
+
+
+def setlist_messages(setlist_id, using) -> list:
+    setlist = Setlist.objects.using(using).filter(pk=setlist_id).first()
+    if setlist is None:
+        return []
+    items = SetlistItem.objects.using(using).filter(setlist_id=setlist_id).values(
+        "position", "song_id", "target_key")
+    return [(setlist_group(setlist_id), {
+        "type": "setlist.changed",
+        "setlist_id": setlist_id,
+        "name": setlist.name,
+        "service_date": setlist.service_date.isoformat() if setlist.service_date else None,
+        "items": list(items),
+    })]
+
+
+def send(messages) -> None:
+    """
+    Deliver *messages* (one round trip to the layer per message, one event
+    loop hop). Runs after commit, so a layer that is down is logged, not
+    raised: the write stands and subscribers catch up on their next message.
+    """
+    layer = get_channel_layer()
+    if layer is None or not messages:
+        return
+
+    async def send_all():
+        for group, message in messages:
+            await layer.group_send(group, {"type": MESSAGE_TYPE, "message": message})
+    try:
+        async_to_sync(send_all)()
+    except Exception:
+        logger.exception("live: could not send %d message(s)", len(messages))
@@ -0,0 +1,121 @@
+"""
+Compact binary encoding for ``Song.lyrics``.
+
+Layout (all integers little-endian)::
+
+    header   magic "LY", format version, flags,
+             n_symbols, n_lines, n_chords, symbols_len, text_len
+    symbols  distinct chord symbols, UTF-8, NUL separated
+    text     every line's text concatenated, UTF-8
+    lengths  uint32[n_lines]   code points per line
+    counts   uint16[n_lines]   chords per line
+    ids      uint16[n_chords]  index into symbols
+    offsets  uint16|int32[n_chords]  chord positions
+
+Each chord symbol is stored once, and positions and ids are packed arrays
+rather than JSON objects, so a chart shrinks to roughly its text plus a few
+bytes per chord. ``encode`` returns ``None`` for anything that would not
+round-trip exactly to the JSON shape ``[{text, chords: [{chord, position}]}]``.
+"""
+import struct
+import sys
+from array import array
+from itertools import islice
+
+MAGIC = b"LY"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<2sBBIIIII")
+
+_WIDE_POSITIONS = 0x01   # positions stored as int32 instead of uint16
+_LITTLE = sys.byteorder == "little"
+
+
+def _pack(typecode, values) -> bytes:
+    arr = array(typecode, values)
+    if not _LITTLE:
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _unpack(typecode, buf, start, count):
+    arr = array(typecode)
+    end = start + count * arr.itemsize
+    arr.frombytes(buf[start:end])
+    if not _LITTLE:
+        arr.byteswap()
+    return arr, end
+
+
+def encode(lyrics):
+    """Pack *lyrics* into bytes, or return ``None`` if it is not lossless."""
+    if not isinstance(lyrics, list):
+        return None
+    symbols, symbol_ids = [], {}
+    texts, lengths, counts, ids, positions = [], [], [], [], []
+    for line in lyrics:
+        if not isinstance(line, dict) or line.keys() != {"text", "chords"}:
+            return None
+        text, chords = line["text"], line["chords"]
+        if not isinstance(text, str) or not isinstance(chords, list) or len(chords) > 0xFFFF:
+            return None
+        texts.append(text)
+        lengths.append(len(text))
+        counts.append(len(chords))
+        for chord in chords:
+            if not isinstance(chord, dict) or chord.keys() != {"chord", "position"}:
+                return None
+            symbol, position = chord["chord"], chord["position"]
+            if (not isinstance(symbol, str) or "\0" in symbol
+                    or type(position) is not int or not -2**31 <= position < 2**31):
+                return None
+            sid = symbol_ids.get(symbol)
+            if sid is None:
+                sid = symbol_ids[symbol] = len(symbols)
+                symbols.append(symbol)
+            ids.append(sid)
+            positions.append(position)
+    if len(symbols) > 0xFFFF:
+        return None
+
+    flags = 0
+    if positions and (min(positions) < 0 or max(positions) > 0xFFFF):
+        flags |= _WIDE_POSITIONS
+    symbol_blob = "\0".join(symbols).encode("utf-8")
+    text_blob = "".join(texts).encode("utf-8")
+    return b"".join((
+        _HEADER.pack(MAGIC, FORMAT_VERSION, flags, len(symbols), len(lyrics),
+                     len(ids), len(symbol_blob), len(text_blob)),
+        symbol_blob,
+        text_blob,
+        _pack("I", lengths),
+        _pack("H", counts),
+        _pack("H", ids),
+        _pack("i" if flags & _WIDE_POSITIONS else "H", positions),
+    ))
+
+
+def decode(data) -> list:
+    """Inverse of ``encode``."""
+    buf = bytes(data)
+    magic, version, flags, n_symbols, n_lines, n_chords, symbols_len, text_len = \
+        _HEADER.unpack_from(buf)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("Not a packed lyrics blob")
+    pos = _HEADER.size
+    symbols = buf[pos:pos + symbols_len].decode("utf-8").split("\0") if n_symbols else []
+    pos += symbols_len
+    text = buf[pos:pos + text_len].decode("utf-8")
+    pos += text_len
+    lengths, pos = _unpack("I", buf, pos, n_lines)
+    counts, pos = _unpack("H", buf, pos, n_lines)
+    ids, pos = _unpack("H", buf, pos, n_chords)
+    positions, pos = _unpack("i" if flags & _WIDE_POSITIONS else "H", buf, pos, n_chords)
+
+    # build every chord dict in one comprehension, then deal them out per line
+    chords = iter([{"chord": symbols[i], "position": p} for i, p in zip(ids, positions)])
+    lines = []
+    t = 0
+    for length, count in zip(lengths, counts):
+        lines.append({"text": text[t:t + length], "chords": list(islice(chords, count))})
+        t += length
+    return lines
@@ -0,0 +1,145 @@
+# songs/management/commands/bench_asgi.py
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from songs.models import Song
+
+LYRICS = [{"text": "Amazing grace how sweet the sound", "chords": [{"chord": "G", "position": 0}]}] * 40
+
+
+class _ThreadPeak:
+    """Samples ``threading.active_count()`` while a run is in progress."""
+
+    def __enter__(self):
+        self.peak, self._stop = threading.active_count(), threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(0.002):
+            self.peak = max(self.peak, threading.active_count() - 1)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._sampler.join()
+
+
+def _environ(url):
+    parts = urlsplit(url)
+    return {
+        'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': parts.path, 'QUERY_STRING': parts.query,
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+
+
+def run_wsgi(url, requests, concurrency):
+    """A threaded WSGI server's worth of requests: one pool thread per in-flight request."""
+    app = WSGIHandler()
+    statuses = []
+
+    def call(_):
+        response = app(_environ(url), lambda status, headers: statuses.append(status))
+        try:
+            b''.join(response)
+        finally:
+            response.close()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(requests)))
+    return statuses
+
+
+def run_asgi(url, requests, concurrency):
+    """*requests* ASGI calls, *concurrency* at a time, on one event loop."""
+    app = ASGIHandler()
+    parts = urlsplit(url)
+    statuses = []
+
+    async def call():
+        finished = asyncio.Event()
+        body_sent = False
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+            elif not message.get('more_body'):
+                finished.set()
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': parts.path, 'raw_path': parts.path.encode(),
+            'query_string': parts.query.encode(), 'root_path': '',
+            'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+        }
+        await app(scope, receive, send)
+
+    async def main():
+        gate = asyncio.Semaphore(concurrency)
+
+        async def limited():
+            async with gate:
+                await call()
+        await asyncio.gather(*(limited() for _ in range(requests)))
+
+    asyncio.run(main())
+    return statuses
+
+
+class Command(BaseCommand):
+    help = 'Compares WSGI (thread per request) with ASGI on the song list, sync and async views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--songs', type=int, default=200, help='Songs seeded into the scratch database')
+        parser.add_argument('--query', default='page_size=20&view=summary')
+
+    def handle(self, *args, **options):
+        # a throwaway test database, so the benchmark never touches real data
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            Song.objects.bulk_create(
+                Song(title=f'Song {i}', artist='Bench', key='G', lyrics=LYRICS) for i in range(options['songs'])
+            )
+            self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _run(self, options):
+        requests, concurrency, query = options['requests'], options['concurrency'], options['query']
+        runs = (
+            ('WSGI, sync view', run_wsgi, f'/api/songs/?{query}'),
+            ('ASGI, sync view', run_asgi, f'/api/songs/?{query}'),
+            ('ASGI, async view', run_asgi, f'/api/async/songs/?{query}'),
+        )
+        for name, runner, url in runs:
+            runner(url, concurrency, concurrency)   # warm-up: imports, search index, connections
+            with _ThreadPeak() as threads:
+                began = time.perf_counter()
+                statuses = runner(url, requests, concurrency)
+                elapsed = time.perf_counter() - began
+            failed = sum(1 for s in statuses if not str(s).startswith('200'))
+            self.stdout.write(
+                f'{name:>17}: {requests / elapsed:8.0f} req/s, peak {threads.peak:3d} threads'
+                + (f', {failed} failed' if failed else '')
+            )
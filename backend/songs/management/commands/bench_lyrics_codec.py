@@ -0,0 +1,73 @@
+# songs/management/commands/bench_lyrics_codec.py
+import json
+import random
+import timeit
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from songs import lyrics_codec
+from songs.models import Song
+
+CHORDS = ["C", "G", "Am", "F", "D", "Em", "G/B", "D/F#", "Cmaj7", "Esus4", "Bb", "Am7"]
+TEXT = ["ព្រះយេស៊ូ ជាម្ចាស់នៃជីវិតខ្ញុំ", "Amazing grace how sweet the sound", "That saved a wretch like me"]
+
+
+def _synthetic(lines, rnd):
+    return [
+        {
+            "text": rnd.choice(TEXT),
+            "chords": [{"chord": rnd.choice(CHORDS), "position": p * 7} for p in range(rnd.randint(0, 5))],
+        }
+        for _ in range(lines)
+    ]
+
+
+def _peak_bytes(fn):
+    tracemalloc.start()
+    try:
+        kept = fn()  # keep the result alive so it counts towards the peak
+        return tracemalloc.get_traced_memory()[1], kept
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = 'Compares row size, decode time and memory of JSON vs packed lyrics'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', type=int, default=0,
+                            help='Benchmark N synthetic 120-line charts instead of the database')
+        parser.add_argument('--number', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if options['synthetic']:
+            rnd = random.Random(1)
+            charts = [_synthetic(120, rnd) for _ in range(options['synthetic'])]
+        else:
+            charts = [s.lyrics for s in Song.objects.only('lyrics', 'lyrics_packed').iterator() if s.lyrics]
+        # JSON as the database stores it (Django's JSONField keeps ensure_ascii)
+        json_rows = [json.dumps(c) for c in charts]
+        packed_rows = [lyrics_codec.encode(c) for c in charts]
+        pairs = [(j, p) for j, p in zip(json_rows, packed_rows) if p is not None]
+        if not pairs:
+            self.stdout.write('No encodable charts to benchmark.')
+            return
+        json_rows, packed_rows = zip(*pairs)
+
+        json_size = sum(len(j.encode()) for j in json_rows)
+        packed_size = sum(len(p) for p in packed_rows)
+        n = options['number']
+        json_time = timeit.timeit(lambda: [json.loads(j) for j in json_rows], number=n) / n
+        packed_time = timeit.timeit(lambda: [lyrics_codec.decode(p) for p in packed_rows], number=n) / n
+        json_mem, _ = _peak_bytes(lambda: [json.loads(j) for j in json_rows])
+        packed_mem, _ = _peak_bytes(lambda: [lyrics_codec.decode(p) for p in packed_rows])
+
+        count = len(pairs)
+        self.stdout.write(f'{count} charts ({len(charts) - count} not encodable)')
+        self.stdout.write(f'{"":>10} {"bytes/row":>12} {"decode us":>12} {"peak KiB":>10}')
+        self.stdout.write(f'{"json":>10} {json_size / count:12.0f} {json_time / count * 1e6:12.1f} {json_mem / 1024:10.0f}')
+        self.stdout.write(f'{"packed":>10} {packed_size / count:12.0f} {packed_time / count * 1e6:12.1f} {packed_mem / 1024:10.0f}')
+        self.stdout.write(self.style.SUCCESS(
+            f'size {json_size / packed_size:.1f}x smaller, decode {json_time / packed_time:.1f}x faster, '
+            f'peak memory {json_mem / packed_mem:.1f}x lower'
+        ))
@@ -0,0 +1,77 @@
+# songs/management/commands/compact_song_versions.py
+import json
+
+from django.core.management.base import BaseCommand
+from songs import deltas
+from songs.models import Song
+
+WRITE_FIELDS = ['lyrics', 'lyrics_packed', 'lyrics_delta', 'delta_depth']
+
+
+def _stored_size(song) -> int:
+    value = song.lyrics_delta if song.lyrics_delta is not None else song.lyrics
+    return len(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+
+
+class Command(BaseCommand):
+    help = 'Rewrites full-copy song versions as deltas against their original_song'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--dry-run', action='store_true', help='Report the savings without writing')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        # lower versions first so a parent's new depth is known before its children
+        qs = (Song.objects.filter(original_song__isnull=False)
+              .only('id', 'version', 'delta_depth', *deltas.STORAGE_FIELDS)
+              .order_by('version', 'id'))
+
+        depths = {}
+        totals = [0, 0, 0, 0]   # versions, as deltas, bytes before, bytes after
+        batch = []
+        for song in qs.iterator(chunk_size=batch_size):
+            batch.append(song)
+            if len(batch) >= batch_size:
+                self._add(totals, self._compact(batch, depths, options['dry_run']))
+                batch = []
+        if batch:
+            self._add(totals, self._compact(batch, depths, options['dry_run']))
+
+        total, as_delta, before, after = totals
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}{as_delta} of {total} versions stored as deltas; '
+            f'lyrics {before} -> {after} bytes'
+        ))
+
+    @staticmethod
+    def _add(totals, stats):
+        for i, value in enumerate(stats):
+            totals[i] += value
+
+    def _compact(self, songs, depths, dry_run):
+        parents = Song.objects.only('id', 'delta_depth', *deltas.STORAGE_FIELDS).in_bulk(
+            {s.original_song_id for s in songs}
+        )
+        changed = []
+        as_delta = before = after = 0
+        for song in songs:
+            before += _stored_size(song)
+            parent = parents.get(song.original_song_id)
+            ops, depth = (None, 0) if parent is None else deltas.make_delta(
+                parent.lyrics, depths.get(parent.pk, parent.delta_depth), song.lyrics,
+            )
+            depths[song.pk] = depth
+            if ops != song.lyrics_delta or depth != song.delta_depth:
+                # bulk_update skips Field.pre_save: set the stored form directly
+                song.lyrics_packed, song.lyrics_delta, song.delta_depth = None, ops, depth
+                changed.append(song)
+            after += _stored_size(song)
+            as_delta += ops is not None
+        if changed and not dry_run:
+            for song in changed:
+                if song.lyrics_delta is not None:
+                    song.lyrics = None
+            Song.objects.bulk_update(changed, WRITE_FIELDS)
+        return len(songs), as_delta, before, after
@@ -0,0 +1,27 @@
+# songs/management/commands/export_songs.py
+import sys
+
+from django.core.management.base import BaseCommand
+from songs import export
+
+
+class Command(BaseCommand):
+    help = 'Streams the song catalog (with flow notes and guitar tabs) as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-o', '--output', help='File to write; defaults to stdout')
+        parser.add_argument('--chunk-size', type=int, default=export.DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        out = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        count = 0
+        try:
+            for line in export.iter_ndjson(chunk_size=options['chunk_size']):
+                out.write(line)
+                count += 1
+        finally:
+            if options['output']:
+                out.close()
+            else:
+                out.flush()
+        self.stderr.write(self.style.SUCCESS(f'Exported {count} songs'))
@@ -0,0 +1,46 @@
+# songs/management/commands/import_songs.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from songs import importer
+
+
+class Command(BaseCommand):
+    help = 'Bulk imports song charts from a JSON / NDJSON / ChordPro file or directory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing')
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--max-errors', type=int, default=20, help='How many invalid rows to print')
+
+    def handle(self, *args, **options):
+        files = importer.iter_files(options['path'])
+        if not files or not files[0].exists():
+            raise CommandError(f"Nothing to import at {options['path']}")
+
+        shown = 0
+
+        def on_error(source, errors):
+            nonlocal shown
+            if shown < options['max_errors']:
+                self.stderr.write(self.style.WARNING(f'{source}: {errors}'))
+            shown += 1
+
+        started = time.perf_counter()
+        stats = importer.import_records(
+            importer.read_records(options['path']),
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            using=options['database'],
+            on_error=on_error,
+        )
+        elapsed = time.perf_counter() - started
+        written = stats['created'] + stats['updated']
+        rate = written / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Validated' if options['dry_run'] else 'Imported'}: "
+            f"{stats['created']} created, {stats['updated']} updated, {stats['invalid']} invalid "
+            f"in {elapsed:.2f}s ({rate:.0f} songs/s)"
+        ))
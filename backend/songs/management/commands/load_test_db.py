@@ -0,0 +1,146 @@
+# songs/management/commands/load_test_db.py
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.utils import load_backend
+from worship_sys import db
+
+PROFILES = ('stock', 'tuned')
+ROWS = 20
+
+
+def profile_config(profile, path):
+    if profile == 'tuned':
+        return db.sqlite_config(path)
+    # what settings.py used before worship_sys.db: rollback journal, BEGIN DEFERRED
+    return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}
+
+
+def _connect(alias, settings_dict):
+    """Give the calling thread its own connection under *alias* (not a configured database)."""
+    backend = load_backend(settings_dict['ENGINE'])
+    connections[alias] = backend.DatabaseWrapper(settings_dict, alias)
+    return connections[alias]
+
+
+def _disconnect(alias):
+    connections[alias].close()
+    del connections[alias]
+
+
+def _edit(alias, row, worker):
+    """One song-edit shaped transaction: read the current value, then write."""
+    with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+        cursor.execute('SELECT n FROM counter WHERE id = %s', [row])
+        n = cursor.fetchone()[0]
+        cursor.execute('UPDATE counter SET n = %s WHERE id = %s', [n + 1, row])
+        cursor.execute('INSERT INTO history (counter_id, n, worker) VALUES (%s, %s, %s)', [row, n + 1, worker])
+
+
+def run(profile, writers, transactions, readers=2):
+    """Hammer a scratch database with *writers* threads; returns the stats."""
+    with tempfile.TemporaryDirectory() as tmp:
+        alias = f'load_test_{profile}'
+        settings_dict = connections.configure_settings(
+            {'default': profile_config(profile, os.path.join(tmp, 'load.sqlite3'))}
+        )['default']
+        try:
+            with _connect(alias, settings_dict).cursor() as cursor:
+                cursor.execute('CREATE TABLE counter (id INTEGER PRIMARY KEY, n INTEGER NOT NULL)')
+                cursor.execute('CREATE TABLE history (id INTEGER PRIMARY KEY, counter_id INTEGER, '
+                               'n INTEGER, worker INTEGER)')
+                cursor.executemany('INSERT INTO counter (id, n) VALUES (%s, 0)', [[i] for i in range(ROWS)])
+
+            latencies, locked, done = [], [0], threading.Event()
+            lock = threading.Lock()
+            start = threading.Barrier(writers + readers)
+
+            def writer(worker):
+                _connect(alias, settings_dict)
+                start.wait()
+                try:
+                    for i in range(transactions):
+                        began = time.perf_counter()
+                        try:
+                            _edit(alias, (worker + i) % ROWS, worker)
+                        except OperationalError as e:
+                            if 'locked' not in str(e) and 'busy' not in str(e):
+                                raise
+                            with lock:
+                                locked[0] += 1
+                            continue
+                        with lock:
+                            latencies.append(time.perf_counter() - began)
+                finally:
+                    _disconnect(alias)
+
+            def reader():
+                _connect(alias, settings_dict)
+                start.wait()
+                try:
+                    while not done.is_set():
+                        try:
+                            with connections[alias].cursor() as cursor:
+                                cursor.execute('SELECT COUNT(*), MAX(n) FROM history')
+                                cursor.fetchone()
+                        except OperationalError:
+                            pass
+                finally:
+                    _disconnect(alias)
+
+            threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+            threads += [threading.Thread(target=reader) for _ in range(readers)]
+            began = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads[:writers]:
+                t.join()
+            elapsed = time.perf_counter() - began
+            done.set()
+            for t in threads[writers:]:
+                t.join()
+
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT SUM(n) FROM counter')
+                total = cursor.fetchone()[0]
+        finally:
+            _disconnect(alias)
+
+    latencies.sort()
+    return {
+        'profile': profile,
+        'committed': len(latencies),
+        'locked': locked[0],
+        'lost_updates': len(latencies) - total,
+        'tps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else 0.0,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Concurrent write load test on a scratch SQLite file: stock settings vs worship_sys.db tuning'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=PROFILES, action='append',
+                            help='Profile to run (repeatable; default: both)')
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--transactions', type=int, default=100, help='Per writer')
+        parser.add_argument('--readers', type=int, default=2)
+
+    def handle(self, *args, **options):
+        for profile in options['profile'] or PROFILES:
+            stats = run(profile, options['writers'], options['transactions'], options['readers'])
+            attempted = options['writers'] * options['transactions']
+            line = (
+                f"{profile:>6}: {stats['committed']}/{attempted} committed, "
+                f"{stats['locked']} locked, {stats['lost_updates']} lost updates, "
+                f"{stats['tps']:.0f} tx/s, p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms"
+            )
+            style = self.style.SUCCESS if not stats['locked'] else self.style.WARNING
+            self.stdout.write(style(line))
@@ -0,0 +1,47 @@
+# songs/management/commands/pack_lyrics.py
+from django.core.management.base import BaseCommand
+from songs import lyrics_codec
+from songs.models import Song
+
+
+class Command(BaseCommand):
+    help = 'Backfills the compact lyrics encoding (or --unpack to go back to plain JSON)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--unpack', action='store_true', help='Rewrite packed rows as JSON')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        qs = Song.objects.only('id', 'lyrics', 'lyrics_packed').order_by('id')
+        if options['unpack']:
+            qs = qs.filter(lyrics_packed__isnull=False)
+        else:
+            qs = qs.filter(lyrics_packed__isnull=True, lyrics__isnull=False)
+
+        changed = skipped = 0
+        batch = []
+        for song in qs.iterator(chunk_size=batch_size):
+            # bulk_update writes attributes as-is (no Field.pre_save), which
+            # lets us set exactly what lands in each column
+            if options['unpack']:
+                song.lyrics_packed = None
+            else:
+                packed = lyrics_codec.encode(song.lyrics)
+                if packed is None:
+                    skipped += 1
+                    continue
+                song.lyrics, song.lyrics_packed = None, packed
+            batch.append(song)
+            if len(batch) >= batch_size:
+                Song.objects.bulk_update(batch, ['lyrics', 'lyrics_packed'])
+                changed += len(batch)
+                batch = []
+        if batch:
+            Song.objects.bulk_update(batch, ['lyrics', 'lyrics_packed'])
+            changed += len(batch)
+
+        action = 'Unpacked' if options['unpack'] else 'Packed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {changed} songs' + (f', {skipped} left as JSON (not losslessly encodable)' if skipped else '')
+        ))
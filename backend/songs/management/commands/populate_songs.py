@@ -1,14 +1,14 @@
 # songs/management/commands/populate_songs.py
 from django.core.management.base import BaseCommand
-from songs.models import Song
+from songs import importer
 
 class Command(BaseCommand):
     help = 'Populates the database with initial song data'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
     def handle(self, *args, **options):
-        # Clear existing songs
-        Song.objects.all().delete()
-        
         # Initial song data
         songs = [
             {
@@ -17,7 +17,7 @@ class Command(BaseCommand):
                 'imageUrl': 'https://via.placeholder.com/50',
                 'key': 'Em',
                 'tempo': '86 BPM',
-                'timeSignature': '4/4',
+                'time_signature': '4/4',
             },
             {
                 'title': 'Perfect',
@@ -25,7 +25,7 @@ class Command(BaseCommand):
                 'imageUrl': 'https://via.placeholder.com/50',
                 'key': 'Ab',
                 'tempo': '93 BPM',
-                'timeSignature': '4/4',
+                'time_signature': '4/4',
             },
             {
                 'title': 'Let It Be',
@@ -33,7 +33,7 @@ class Command(BaseCommand):
                 'imageUrl': 'https://via.placeholder.com/50',
                 'key': 'C',
                 'tempo': '72 BPM',
-                'timeSignature': '4/4',
+                'time_signature': '4/4',
             },
             {
                 'title': 'Hotel California',
@@ -41,11 +41,16 @@ class Command(BaseCommand):
                 'imageUrl': 'https://via.placeholder.com/50',
                 'key': 'Bm',
                 'tempo': '75 BPM',
-                'timeSignature': '4/4',
+                'time_signature': '4/4',
             },
         ]
         
-        for song_data in songs:
-            Song.objects.create(**song_data)
-            
-        self.stdout.write(self.style.SUCCESS('Successfully populated song data'))
\ No newline at end of file
+        # one batched upsert on (title, artist, version): rerunning updates in place
+        stats = importer.import_records(
+            ((f'seed[{i}]', song) for i, song in enumerate(songs)),
+            using=options['database'],
+            on_error=lambda source, errors: self.stderr.write(self.style.WARNING(f'{source}: {errors}')),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully populated song data: {stats['created']} created, {stats['updated']} updated"
+        ))
\ No newline at end of file
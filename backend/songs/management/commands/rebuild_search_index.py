@@ -0,0 +1,19 @@
+# songs/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand, CommandError
+from songs import search
+from songs.models import Song
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index for all songs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search.is_available(using):
+            raise CommandError(f"No search index on database '{using}'; run migrate first.")
+        total = search.rebuild(Song.objects.using(using), using=using, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} songs'))
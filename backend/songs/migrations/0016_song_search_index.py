@@ -0,0 +1,70 @@
+from django.db import migrations
+
+# The search tables as they stood at this migration; songs.search maintains them.
+FTS_TABLE = "songs_song_fts"
+PG_TABLE = "songs_song_search"
+
+
+def _lyrics_text(lyrics):
+    return "\n".join(line.get("text", "") for line in lyrics or [] if isinstance(line, dict))
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                    "title, artist, lyrics, "
+                    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+                )
+            except Exception:  # SQLite built without FTS5
+                return
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')")
+            insert = f"INSERT INTO {FTS_TABLE}(rowid, title, artist, lyrics) VALUES (%s, %s, %s, %s)"
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {PG_TABLE} ("
+                "song_id bigint PRIMARY KEY REFERENCES songs_song(id) "
+                "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {PG_TABLE}_document_gin "
+                f"ON {PG_TABLE} USING GIN (document)"
+            )
+            insert = (
+                f"INSERT INTO {PG_TABLE}(song_id, document) VALUES (%s, "
+                "setweight(to_tsvector('simple', %s), 'A') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                "setweight(to_tsvector('simple', %s), 'C')) "
+                "ON CONFLICT (song_id) DO UPDATE SET document = EXCLUDED.document"
+            )
+        else:
+            return
+
+        Song = apps.get_model('songs', 'Song')
+        rows = Song.objects.using(connection.alias).values_list('id', 'title', 'artist', 'lyrics')
+        cursor.executemany(insert, [
+            (pk, title or "", artist or "", _lyrics_text(lyrics)) for pk, title, artist, lyrics in rows
+        ])
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    table = {"sqlite": FTS_TABLE, "postgresql": PG_TABLE}.get(connection.vendor)
+    if table:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('songs', '0015_song_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:38
+
+import songs.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('songs', '0017_setlist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='song',
+            name='lyrics_packed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='song',
+            name='lyrics',
+            field=songs.models.LyricsField(blank=True, default=list, null=True),
+        ),
+    ]
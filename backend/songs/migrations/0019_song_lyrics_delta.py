@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('songs', '0018_song_lyrics_packed'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='song',
+            options={'base_manager_name': 'objects'},
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='delta_depth',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='lyrics_delta',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('songs', '0019_song_lyrics_delta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='song',
+            name='revision',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
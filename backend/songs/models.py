@@ -1,8 +1,62 @@
+from django.conf import settings
 from django.db import models
+from django.db.models.query import ModelIterable
 from guitartabs.models import GuitarTab
+from worship_sys.concurrency import RevisionedMixin
+from . import deltas, lyrics_codec
 
 
-class Song(models.Model):
+def packed_lyrics_enabled() -> bool:
+    return getattr(settings, 'SONG_LYRICS_STORAGE', 'json') == 'packed'
+
+
+class LyricsField(models.JSONField):
+    """
+    JSON lyrics column that steps aside for ``lyrics_packed`` when
+    ``SONG_LYRICS_STORAGE = 'packed'``: the row then stores the binary
+    encoding and NULL here, while the instance keeps the decoded list.
+    """
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        if model_instance.lyrics_delta is not None:
+            # a version stored as a delta against its parent (songs.deltas)
+            model_instance.lyrics_packed = None
+            return None
+        packed = lyrics_codec.encode(value) if packed_lyrics_enabled() else None
+        model_instance.lyrics_packed = packed
+        return None if packed is not None else value
+
+
+class SongIterable(ModelIterable):
+    """Yields songs with delta-stored lyrics resolved, a chunk at a time."""
+    def __iter__(self):
+        db = self.queryset.db
+        batch = []
+        for song in super().__iter__():
+            batch.append(song)
+            if len(batch) >= self.chunk_size:
+                deltas.resolve(batch, db)
+                yield from batch
+                batch = []
+        deltas.resolve(batch, db)
+        yield from batch
+
+
+class SongQuerySet(models.QuerySet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._iterable_class = SongIterable
+
+    def with_related(self):
+        """
+        Join the one-to-one SongFlow so ``SongSerializer`` never goes back to
+        the database per row. ``guitar_tab_id``/``original_song`` are
+        serialized as raw ids and need no join.
+        """
+        return self.select_related('flow')
+
+
+class Song(RevisionedMixin, models.Model):
     # ── existing fields ───────────────────────────────────────────────
     title = models.CharField(max_length=200)
     artist = models.CharField(max_length=200)
@@ -11,7 +65,15 @@ class Song(models.Model):
     tempo = models.CharField(max_length=20, blank=True, null=True)
     time_signature = models.CharField(max_length=10, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    lyrics = models.JSONField(default=list, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # bumped on every save; the version token behind If-Match (worship_sys.concurrency)
+    revision = models.PositiveIntegerField(default=1, editable=False)
+    lyrics = LyricsField(default=list, blank=True, null=True)
+    # compact encoding of ``lyrics`` (see songs.lyrics_codec); set only in packed mode
+    lyrics_packed = models.BinaryField(blank=True, null=True)
+    # versions: ops against original_song's lyrics instead of a full copy
+    lyrics_delta = models.JSONField(blank=True, null=True)
+    delta_depth = models.PositiveSmallIntegerField(default=0)
     version = models.IntegerField(default=1)
     original_song = models.ForeignKey(
         'self', null=True, blank=True,
@@ -22,9 +84,39 @@ class Song(models.Model):
         on_delete=models.SET_NULL, related_name='songs'
     )
 
-    def save(self, *args, **kwargs):
+    objects = SongQuerySet.as_manager()
+
+    class Meta:
+        # related-object access (item.song, song.original_song) resolves deltas too
+        base_manager_name = 'objects'
+
+    def normalize(self):
+        """Field clean-up applied on every save (and by bulk writers)."""
         if self.key:
             self.key = self.key.strip().capitalize()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = instance.__dict__
+        if loaded.get('lyrics') is None and loaded.get('lyrics_packed') is not None:
+            instance.lyrics = lyrics_codec.decode(instance.lyrics_packed)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        if fields is not None and 'lyrics' in fields:
+            # the stored form may live in any of these columns
+            deferred = self.get_deferred_fields()
+            fields = {*fields, *(f for f in ('lyrics_packed', 'lyrics_delta', 'original_song_id') if f in deferred)}
+        super().refresh_from_db(using, fields, from_queryset)
+
+    def save(self, *args, **kwargs):
+        self.normalize()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'lyrics', 'original_song'} & set(update_fields):
+            deltas.prepare(self, kwargs.get('using') or self._state.db or 'default')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'lyrics', 'lyrics_packed', 'lyrics_delta', 'delta_depth'}
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -48,3 +140,36 @@ class SongFlow(models.Model):
     def __str__(self):
         preview = (self.flow_notes[:40] + "…") if len(self.flow_notes) > 40 else self.flow_notes
         return f"Flow for «{self.song}»: {preview}"
+
+
+# ─────────────────────────────────────────────────────────────────────
+# Setlists: the ordered songs (and keys) for a service
+class Setlist(models.Model):
+    name = models.CharField(max_length=200)
+    service_date = models.DateField(blank=True, null=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True,
+        on_delete=models.SET_NULL, related_name='setlists'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.service_date or 'undated'})"
+
+
+class SetlistItem(models.Model):
+    setlist = models.ForeignKey(Setlist, on_delete=models.CASCADE, related_name='items')
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='setlist_items')
+    position = models.PositiveIntegerField()
+    # key to play the song in; blank means the song's own key
+    target_key = models.CharField(max_length=10, blank=True, null=True)
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['setlist', 'position'], name='unique_setlist_position'),
+        ]
+
+    def __str__(self):
+        return f"{self.setlist.name} #{self.position}: {self.song.title}"
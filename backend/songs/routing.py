@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .consumers import ChartConsumer
+
+websocket_urlpatterns = [
+    path('ws/songs/<int:song_id>/', ChartConsumer.as_asgi()),
+    path('ws/setlists/<int:setlist_id>/', ChartConsumer.as_asgi()),
+]
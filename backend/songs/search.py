@@ -0,0 +1,155 @@
+"""
+Full-text search over song title, artist and lyric text.
+
+SQLite uses an FTS5 table (``songs_song_fts``, rowid = song id); Postgres uses
+a side table with a GIN-indexed tsvector (``songs_song_search``). Both are
+kept in sync from ``songs.signals``; on any other backend, or before the
+migration has run, ``search_songs`` returns ``None`` and callers fall back to
+the old title regex.
+"""
+import re
+
+from django.db import connections
+
+from . import deltas
+
+FTS_TABLE = "songs_song_fts"
+PG_TABLE = "songs_song_search"
+
+_available = {}
+
+
+def lyrics_text(lyrics) -> str:
+    """Flatten a ``Song.lyrics`` list into plain searchable text."""
+    return "\n".join(
+        line.get("text", "") for line in lyrics or [] if isinstance(line, dict)
+    )
+
+
+def _terms(text: str):
+    return [t for t in text.split() if t]
+
+
+def _fts5_query(text: str) -> str:
+    # every whitespace-separated term must match as a prefix
+    return " ".join('"%s"*' % t.replace('"', '""') for t in _terms(text))
+
+
+def _tsquery(text: str) -> str:
+    terms = [re.sub(r"[&|!():*'\\<>]", " ", t).strip() for t in _terms(text)]
+    return " & ".join("'%s':*" % t for t in terms if t)
+
+
+def is_available(using: str = "default") -> bool:
+    if using not in _available:
+        connection = connections[using]
+        table = {"sqlite": FTS_TABLE, "postgresql": PG_TABLE}.get(connection.vendor)
+        _available[using] = bool(table) and table in connection.introspection.table_names()
+    return _available[using]
+
+
+# ---------------------------------------------------------------------------
+# sync
+# ---------------------------------------------------------------------------
+def index_rows(rows, using: str = "default") -> None:
+    """Upsert ``(id, title, artist, lyrics)`` tuples into the index."""
+    if not is_available(using):
+        return
+    connection = connections[using]
+    params = [(pk, title or "", artist or "", lyrics_text(lyrics)) for pk, title, artist, lyrics in rows]
+    if not params:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(p[0],) for p in params])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE}(rowid, title, artist, lyrics) VALUES (%s, %s, %s, %s)",
+                params,
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {PG_TABLE}(song_id, document) VALUES (%s, "
+                "setweight(to_tsvector('simple', %s), 'A') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                "setweight(to_tsvector('simple', %s), 'C')) "
+                "ON CONFLICT (song_id) DO UPDATE SET document = EXCLUDED.document",
+                params,
+            )
+
+
+def index_songs(songs, using: str = "default") -> None:
+    index_rows(((s.pk, s.title, s.artist, s.lyrics) for s in songs), using)
+
+
+def remove_songs(ids, using: str = "default") -> None:
+    if not is_available(using):
+        return
+    connection = connections[using]
+    table, column = (FTS_TABLE, "rowid") if connection.vendor == "sqlite" else (PG_TABLE, "song_id")
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {table} WHERE {column} = %s", [(pk,) for pk in ids])
+
+
+def rebuild(queryset, using: str = "default", batch_size: int = 500) -> int:
+    """Reindex every song in *queryset*; returns the number indexed."""
+    if not is_available(using):
+        return 0
+    with connections[using].cursor() as cursor:
+        table = FTS_TABLE if connections[using].vendor == "sqlite" else PG_TABLE
+        cursor.execute(f"DELETE FROM {table}")
+    rows, total = [], 0
+    # model instances rather than values(): packed and delta rows are decoded on load
+    songs = queryset.only("id", "title", "artist", *deltas.STORAGE_FIELDS)
+    for song in songs.iterator(chunk_size=batch_size):
+        rows.append((song.pk, song.title, song.artist, song.lyrics))
+        if len(rows) >= batch_size:
+            index_rows(rows, using)
+            total += len(rows)
+            rows = []
+    index_rows(rows, using)
+    return total + len(rows)
+
+
+# ---------------------------------------------------------------------------
+# query
+# ---------------------------------------------------------------------------
+def search_songs(queryset, text: str, ranked: bool = True):
+    """
+    Restrict *queryset* to songs matching *text* (prefix match on every term).
+
+    With ``ranked=True`` results are ordered best-first and carry a
+    ``search_rank`` attribute; otherwise the caller's ordering is kept.
+    Returns ``None`` when no index is available for the queryset's database.
+    """
+    using = queryset.db
+    if not is_available(using):
+        return None
+    song_table = queryset.model._meta.db_table
+    if connections[using].vendor == "sqlite":
+        expr = _fts5_query(text)
+        if not expr:
+            return queryset.none()
+        qs = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE}.rowid = {song_table}.id", f"{FTS_TABLE} MATCH %s"],
+            params=[expr],
+        )
+        if ranked:
+            qs = qs.extra(select={"search_rank": f"{FTS_TABLE}.rank"}).order_by("search_rank", "id")
+        return qs
+
+    expr = _tsquery(text)
+    if not expr:
+        return queryset.none()
+    qs = queryset.extra(
+        tables=[PG_TABLE],
+        where=[f"{PG_TABLE}.song_id = {song_table}.id",
+               f"{PG_TABLE}.document @@ to_tsquery('simple', %s)"],
+        params=[expr],
+    )
+    if ranked:
+        qs = qs.extra(
+            select={"search_rank": f"ts_rank({PG_TABLE}.document, to_tsquery('simple', %s))"},
+            select_params=[expr],
+        ).order_by("-search_rank", "id")
+    return qs
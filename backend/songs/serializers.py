@@ -1,6 +1,7 @@
+from django.db import router, transaction
 from rest_framework import serializers
 from guitartabs.models import GuitarTab          # update if GuitarTab lives elsewhere
-from .models import Song, SongFlow
+from .models import Setlist, SetlistItem, Song, SongFlow
 
 
 class SongSerializer(serializers.ModelSerializer):
@@ -34,6 +35,7 @@ class SongSerializer(serializers.ModelSerializer):
             "created_at",
             "lyrics",
             "version",
+            "revision",
             "original_song",
             "guitar_tab_id",
             "flow_notes",            # 👈 include in payload
@@ -49,6 +51,7 @@ class SongSerializer(serializers.ModelSerializer):
         flow_obj, _ = SongFlow.objects.get_or_create(song=song)
         flow_obj.flow_notes = text
         flow_obj.save(update_fields=["flow_notes", "updated_at"])
+        song.flow = flow_obj  # keep a select_related flow in step with the write
 
     # ------------------------------------------------------------------
     # create / update overrides
@@ -79,9 +82,76 @@ class SongSerializer(serializers.ModelSerializer):
         return data
 
 
+class ChordSerializer(serializers.Serializer):
+    chord = serializers.CharField(max_length=30)
+    position = serializers.IntegerField(min_value=0)
+
+
+class LyricsLineSerializer(serializers.Serializer):
+    """One ``Song.lyrics`` line; used to validate the lines a JSON Patch touches."""
+    text = serializers.CharField(allow_blank=True, trim_whitespace=False)
+    chords = ChordSerializer(many=True)
+
+
 class GuitarTabSerializer(serializers.ModelSerializer):
     """Unchanged helper serializer (keep if you still expose guitar-tab APIs)."""
 
     class Meta:
         model = GuitarTab
         fields = "__all__"
+
+
+class SetlistItemSerializer(serializers.ModelSerializer):
+    song_id = serializers.PrimaryKeyRelatedField(
+        source="song", queryset=Song.objects.all()
+    )
+    target_key = serializers.CharField(
+        max_length=10, required=False, allow_blank=True, allow_null=True
+    )
+
+    class Meta:
+        model = SetlistItem
+        fields = ["position", "song_id", "target_key"]
+        read_only_fields = ["position"]
+
+
+class SetlistSerializer(serializers.ModelSerializer):
+    """
+    Setlist metadata plus its ordered ``items``. Writing ``items`` replaces
+    the whole list; positions follow the order they are sent in.
+    """
+    items = SetlistItemSerializer(many=True, required=False)
+
+    class Meta:
+        model = Setlist
+        fields = ["id", "name", "service_date", "created_by", "created_at", "updated_at", "items"]
+        read_only_fields = ["created_by"]
+
+    def _replace_items(self, setlist: Setlist, items) -> None:
+        setlist.items.all().delete()
+        SetlistItem.objects.bulk_create(
+            SetlistItem(
+                setlist=setlist,
+                song=item["song"],
+                position=i,
+                target_key=(item.get("target_key") or "").strip() or None,
+            )
+            for i, item in enumerate(items, 1)
+        )
+
+    # Setlist and items are written in one transaction: a failed item insert
+    # leaves nothing behind, and live subscribers (songs.live) see the new items.
+    def create(self, validated_data):
+        items = validated_data.pop("items", [])
+        with transaction.atomic(using=router.db_for_write(Setlist)):
+            setlist = super().create(validated_data)
+            self._replace_items(setlist, items)
+        return setlist
+
+    def update(self, instance, validated_data):
+        items = validated_data.pop("items", None)
+        with transaction.atomic(using=instance._state.db):
+            setlist = super().update(instance, validated_data)
+            if items is not None:
+                self._replace_items(setlist, items)
+        return setlist
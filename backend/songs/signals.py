@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from guitartabs.models import GuitarTab
+from worship_sys import response_cache
+from . import autocomplete, deltas, live, search
+from .models import Setlist, Song, SongFlow
+
+# Sent by bulk writers (bulk_create/bulk_update bypass post_save) with
+# ``songs`` (the saved instances) and ``using``.
+songs_bulk_saved = Signal()
+
+
+@receiver(post_save, sender=Song)
+def index_song(sender, instance, using, raw=False, **kwargs):
+    if not raw:
+        search.index_songs([instance], using=using)
+        transaction.on_commit(lambda: autocomplete.update(autocomplete.SONG, instance), using=using)
+
+
+@receiver(pre_save, sender=Song)
+def remember_chart(sender, instance, using, raw=False, update_fields=None, **kwargs):
+    if not raw and live.charted(instance, update_fields):
+        instance._live_before = live.stored_chart(instance, using, update_fields)
+
+
+@receiver(post_save, sender=Song)
+def broadcast_chart(sender, instance, using, raw=False, **kwargs):
+    if raw or '_live_before' not in instance.__dict__:
+        return
+    before = instance.__dict__.pop('_live_before')
+    if before is not None:
+        messages = live.song_messages(before, instance, using)
+        transaction.on_commit(lambda: live.send(messages), using=using)
+    else:
+        # nobody was subscribed before the save; anyone who is by now reloads
+        pk = instance.pk
+        transaction.on_commit(lambda: live.send(live.reload_messages([pk], using)), using=using)
+
+
+@receiver(songs_bulk_saved)
+def index_songs(sender, songs, using, **kwargs):
+    search.index_songs(songs, using=using)
+    messages = live.reload_messages([song.pk for song in songs], using)
+
+    def update_autocomplete():
+        for song in songs:
+            autocomplete.update(autocomplete.SONG, song)
+        live.send(messages)
+    transaction.on_commit(update_autocomplete, using=using)
+
+
+# flows go with their song (no delete receiver keeps that cascade a single DELETE)
+@receiver([post_save, post_delete], sender=Song)
+@receiver(post_save, sender=SongFlow)
+@receiver(songs_bulk_saved)
+def invalidate_song_lists(sender, using, **kwargs):
+    response_cache.invalidate('songs', using=using)
+
+
+@receiver(pre_delete, sender=Song)
+def snapshot_versions(sender, instance, using, **kwargs):
+    # versions stored as deltas against this song need their full lyrics first
+    deltas.rebase_children({instance.pk: (None, 0)}, using)
+    # then lose their original, with a new revision (see detach_tab)
+    Song.objects.using(using).filter(original_song=instance).update(
+        original_song=None, revision=F('revision') + 1, updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Song)
+def unindex_song(sender, instance, using, **kwargs):
+    search.remove_songs([instance.pk], using=using)
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.discard(autocomplete.SONG, pk), using=using)
+    transaction.on_commit(
+        lambda: live.send([(live.song_group(pk), {"type": "chart.deleted", "song_id": pk})]), using=using)
+
+
+@receiver(post_save, sender=Setlist)
+def broadcast_setlist(sender, instance, using, created, raw=False, **kwargs):
+    if not raw and not created:
+        # read at commit time: the serializer replaces the items after saving the setlist
+        pk = instance.pk
+        transaction.on_commit(lambda: live.send(live.setlist_messages(pk, using)), using=using)
+
+
+@receiver(post_delete, sender=Setlist)
+def broadcast_setlist_deleted(sender, instance, using, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(
+        lambda: live.send([(live.setlist_group(pk), {"type": "setlist.deleted", "setlist_id": pk})]),
+        using=using)
+
+
+@receiver(post_save, sender=GuitarTab)
+def index_tab(sender, instance, using, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: autocomplete.update(autocomplete.TAB, instance), using=using)
+
+
+@receiver(pre_delete, sender=GuitarTab)
+def detach_tab(sender, instance, using, **kwargs):
+    # on_delete=SET_NULL would clear guitar_tab in bulk, past save(): move the
+    # songs' revision and stamp along so their ETags and If-Match tokens change
+    Song.objects.using(using).filter(guitar_tab=instance).update(
+        guitar_tab=None, revision=F('revision') + 1, updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=GuitarTab)
+def unindex_tab(sender, instance, using, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.discard(autocomplete.TAB, pk), using=using)
@@ -1,3 +1,952 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import unicodedata
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from channels.layers import InMemoryChannelLayer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from guitartabs.models import GuitarTab
+from worship_sys import version_tree
+from worship_sys.websocket_auth import JWTAuthMiddleware
+from worship_sys.concurrency import RevisionConflict, claim_revision
+
+from . import autocomplete, chordsheet, deltas, live, lyrics_codec
+from .routing import websocket_urlpatterns
+from .models import Setlist, SetlistItem, Song, SongFlow
+from .signals import songs_bulk_saved
+
+
+class SongSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Song.objects.create(title="Let It Be", artist="The Beatles", key="C",
+                            lyrics=[{"text": "When I find myself in times of trouble", "chords": []}])
+        Song.objects.create(title="Be Thou My Vision", artist="Traditional", key="D", lyrics=[])
+        Song.objects.create(title="ព្រះយេស៊ូ", artist="LIFE Band", key="Em", lyrics=[])
+
+    def search(self, term):
+        res = self.client.get("/api/songs/", {"search": term, "page_size": 10})
+        self.assertEqual(res.status_code, 200)
+        return [s["title"] for s in res.json()["songs"]]
+
+    def test_prefix_match_ranks_title_first(self):
+        self.assertEqual(self.search("be")[0], "Be Thou My Vision")
+        self.assertEqual(set(self.search("be")), {"Let It Be", "Be Thou My Vision"})
+
+    def test_matches_artist_and_lyrics(self):
+        self.assertEqual(self.search("beatl"), ["Let It Be"])
+        self.assertEqual(self.search("trouble"), ["Let It Be"])
+
+    def test_khmer_title(self):
+        self.assertEqual(self.search("ព្រះ"), ["ព្រះយេស៊ូ"])
+
+    def test_index_follows_edits_and_deletes(self):
+        song = Song.objects.get(title="Let It Be")
+        song.title = "Hey Jude"
+        song.save()
+        self.assertEqual(self.search("jude"), ["Hey Jude"])
+        song.delete()
+        self.assertEqual(self.search("jude"), [])
+
+
+class SongCursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()   # bulk_create sends no signals: drop cached list pages
+        Song.objects.bulk_create(Song(title=f"Song {i}", artist="Band") for i in range(7))
+
+    def test_walks_all_pages_without_counting(self):
+        seen, cursor = [], ""
+        while cursor is not None:
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get("/api/songs/", {"cursor": cursor, "page_size": 3})
+            self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+            self.assertNotIn("total", res.data)
+            seen += [s["title"] for s in res.data["songs"]]
+            cursor = res.data["next_cursor"]
+        self.assertEqual(seen, [f"Song {i}" for i in range(7)])
+
+    def test_total_on_request(self):
+        res = self.client.get("/api/songs/", {"cursor": "", "page_size": 3, "include_total": "true"})
+        self.assertEqual(res.data["total"], 7)
+
+    def test_bad_cursor(self):
+        res = self.client.get("/api/songs/", {"cursor": "not-a-cursor"})
+        self.assertEqual(res.status_code, 400)
+
+
+class SongListQueryCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()   # bulk_create sends no signals: drop cached list pages
+        songs = Song.objects.bulk_create(Song(title=f"Song {i}", artist="Band") for i in range(20))
+        SongFlow.objects.bulk_create(SongFlow(song=s, flow_notes="V C V C B C") for s in songs[::2])
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        # one COUNT + one joined SELECT, whatever the page size
+        for page_size in (5, 20):
+            with self.assertNumQueries(2):
+                res = self.client.get("/api/songs/", {"page_size": page_size})
+            self.assertEqual(len(res.data["songs"]), page_size)
+        self.assertEqual(res.data["songs"][0]["flow_notes"], "V C V C B C")
+        self.assertEqual(res.data["songs"][1]["flow_notes"], "")
+
+    def test_detail_is_one_query(self):
+        self.client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        song = Song.objects.first()
+        with self.assertNumQueries(1):
+            res = self.client.get(f"/api/songs/{song.id}/")
+        self.assertEqual(res.data["flow_notes"], "V C V C B C")
+
+
+class SongSummaryViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Song.objects.create(title="Let It Be", artist="The Beatles", key="C", tempo="72 BPM",
+                            lyrics=[{"text": "When I find myself", "chords": [{"chord": "C", "position": 0}]}])
+
+    def test_summary_skips_lyrics(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/songs/", {"view": "summary"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(set(res.data["songs"][0]), {"id", "title", "artist", "key", "tempo", "imageUrl"})
+        self.assertFalse(any('"lyrics"' in q["sql"] for q in ctx.captured_queries))
+
+    def test_fields_param(self):
+        res = self.client.get("/api/songs/", {"fields": "title,key", "search": "let"})
+        self.assertEqual(res.data["songs"], [{"id": res.data["songs"][0]["id"], "title": "Let It Be", "key": "C"}])
+        res = self.client.get("/api/songs/", {"fields": "title,lyrics"})
+        self.assertEqual(res.status_code, 400)
+
+    def test_summary_with_cursor(self):
+        res = self.client.get("/api/songs/", {"view": "summary", "cursor": "", "page_size": 1})
+        self.assertEqual(res.data["songs"][0]["title"], "Let It Be")
+
+
+class SongConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        self.song = Song.objects.create(title="Let It Be", artist="The Beatles", key="C", lyrics=[])
+
+    def test_detail_304_without_loading_the_song(self):
+        url = f"/api/songs/{self.song.id}/"
+        etag = self.client.get(url)["ETag"]
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res["ETag"], etag)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('"lyrics"', ctx.captured_queries[0]["sql"])
+
+        self.client.patch(url, {"flow_notes": "V C B C"}, format="json")
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_list_etag(self):
+        for params in ({"page_size": 5}, {"cursor": "", "page_size": 5}):
+            etag = self.client.get("/api/songs/", params)["ETag"]
+            self.assertEqual(self.client.get("/api/songs/", params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            Song.objects.create(title="Hey Jude", artist="The Beatles")
+            self.assertEqual(self.client.get("/api/songs/", params, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deleting_the_tab_changes_the_etags(self):
+        tab = GuitarTab.objects.create(title="Intro riff", artist="Band", tab_data={"lines": []})
+        Song.objects.filter(id=self.song.id).update(guitar_tab=tab)
+        url = f"/api/songs/{self.song.id}/"
+        detail_etag = self.client.get(url)["ETag"]
+        list_etag = self.client.get("/api/songs/")["ETag"]
+
+        tab.delete()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertIsNone(res.data["guitar_tab_id"])
+        self.assertEqual(self.client.get("/api/songs/", HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+    def test_deleting_the_original_changes_the_version_etag(self):
+        version = Song.objects.create(title="Let It Be", artist="The Beatles", key="D", lyrics=[],
+                                      version=2, original_song=self.song)
+        url = f"/api/songs/{version.id}/"
+        etag = self.client.get(url)["ETag"]
+        self.song.delete()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertIsNone(res.data["original_song"])
+
+
+class SongExportTests(TestCase):
+    def test_streams_ndjson(self):
+        tab = GuitarTab.objects.create(title="Intro riff", artist="Band", tab_data={"lines": []})
+        song = Song.objects.create(title="ព្រះយេស៊ូ", artist="LIFE Band", key="Em", guitar_tab=tab,
+                                   lyrics=[{"text": "a", "chords": [{"chord": "Em", "position": 0}]}])
+        SongFlow.objects.create(song=song, flow_notes="V C")
+        Song.objects.create(title="Let It Be", artist="The Beatles")
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("admin", password="pw"))
+        res = client.get("/api/songs/export/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in b"".join(res.streaming_content).splitlines()]
+        self.assertEqual([r["title"] for r in lines], ["ព្រះយេស៊ូ", "Let It Be"])
+        self.assertEqual(lines[0]["flow_notes"], "V C")
+        self.assertEqual(lines[0]["guitar_tab"]["title"], "Intro riff")
+        self.assertIsNone(lines[1]["guitar_tab"])
+
+
+class SongImportTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        root = Path(self.dir.name)
+        (root / "a.ndjson").write_text("\n".join(json.dumps(r) for r in [
+            {"title": "Let It Be", "artist": "The Beatles", "key": "c", "flow_notes": "V C",
+             "lyrics": [{"text": "When I find", "chords": [{"chord": "C", "position": 0}]}]},
+            {"title": "Broken", "artist": "X", "lyrics": "not a list", "version": "x"},
+        ]), encoding="utf-8")
+        (root / "b.cho").write_text(
+            "{title: ព្រះយេស៊ូ}\n{artist: LIFE Band}\n{key: Em}\n\n[Em]Line [C/E]one\n", encoding="utf-8"
+        )
+
+    def run_import(self):
+        out = io.StringIO()
+        call_command("import_songs", self.dir.name, "--batch-size", "1", stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_import_and_upsert(self):
+        self.assertIn("2 created, 0 updated, 1 invalid", self.run_import())
+        song = Song.objects.get(title="Let It Be")
+        self.assertEqual(song.key, "C")
+        self.assertEqual(song.flow.flow_notes, "V C")
+        khmer = Song.objects.get(artist="LIFE Band")
+        self.assertEqual(khmer.lyrics, [{"text": "Line one", "chords": [
+            {"chord": "Em", "position": 0}, {"chord": "C/E", "position": 5}]}])
+
+        self.assertIn("0 created, 2 updated, 1 invalid", self.run_import())
+        self.assertEqual(Song.objects.count(), 2)
+        # bulk writes still reach the search index
+        res = APIClient().get("/api/songs/", {"search": "find"})
+        self.assertEqual([s["title"] for s in res.data["songs"]], ["Let It Be"])
+
+    def test_receivers_see_stored_revisions(self):
+        self.run_import()
+        seen = []
+
+        def receiver(sender, songs, **kwargs):
+            seen.extend(song.revision for song in songs)
+        songs_bulk_saved.connect(receiver)
+        self.addCleanup(songs_bulk_saved.disconnect, receiver)
+        self.run_import()
+        self.assertEqual(seen, [2, 2])
+
+    def test_populate_songs_upserts(self):
+        out = io.StringIO()
+        call_command("populate_songs", stdout=out)
+        self.assertIn("4 created, 0 updated", out.getvalue())
+        call_command("populate_songs", stdout=out)
+        self.assertIn("0 created, 4 updated", out.getvalue())
+        self.assertEqual(Song.objects.get(title="Let It Be").time_signature, "4/4")
+
+
+class SetlistTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        self.songs = [
+            Song.objects.create(title=f"Song {i}", artist="Band", key="G",
+                                lyrics=[{"text": "la", "chords": [{"chord": "G", "position": 0}]}])
+            for i in range(4)
+        ]
+        for song in self.songs:
+            SongFlow.objects.create(song=song, flow_notes="V C")
+
+    def test_create_and_hydrate(self):
+        payload = {"name": "Sunday", "service_date": "2026-10-18", "items": [
+            {"song_id": self.songs[2].id, "target_key": "A"},
+            {"song_id": self.songs[0].id},
+            {"song_id": self.songs[1].id, "target_key": "Am"},
+        ]}
+        res = self.client.post("/api/songs/setlists/", payload, format="json")
+        self.assertEqual(res.status_code, 201)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(f"/api/songs/setlists/{res.data['id']}/")
+        songs = res.data["songs"]
+        self.assertEqual([s["song_id"] for s in songs], [self.songs[2].id, self.songs[0].id, self.songs[1].id])
+        self.assertEqual((songs[0]["key"], songs[0]["lyrics"][0]["chords"][0]["chord"]), ("A", "A"))
+        self.assertEqual((songs[1]["key"], songs[1]["lyrics"][0]["chords"][0]["chord"]), ("G", "G"))
+        self.assertIn("transpose_error", songs[2])
+        self.assertEqual(songs[0]["flow_notes"], "V C")
+
+    def test_replace_items(self):
+        res = self.client.post("/api/songs/setlists/", {"name": "Sunday", "items": [
+            {"song_id": self.songs[0].id}]}, format="json")
+        url = f"/api/songs/setlists/{res.data['id']}/"
+        res = self.client.patch(url, {"items": [{"song_id": self.songs[3].id}, {"song_id": self.songs[0].id}]},
+                                format="json")
+        self.assertEqual([s["position"] for s in res.data["songs"]], [1, 2])
+        self.assertEqual(res.data["songs"][0]["song_id"], self.songs[3].id)
+        res = self.client.get("/api/songs/setlists/")
+        self.assertEqual(res.data["setlists"][0]["song_count"], 2)
+
+    def test_failed_item_insert_leaves_no_setlist(self):
+        payload = {"name": "Sunday", "items": [{"song_id": self.songs[0].id}]}
+        with mock.patch.object(SetlistItem.objects, "bulk_create", side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.client.post("/api/songs/setlists/", payload, format="json")
+        self.assertFalse(Setlist.objects.exists())
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        autocomplete.reset()
+        self.addCleanup(autocomplete.reset)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        Song.objects.create(title="Let It Be", artist="The Beatles", key="C")
+        Song.objects.create(title="Be Thou My Vision", artist="Traditional", key="D")
+        Song.objects.create(title="ព្រះយេស៊ូ​ជាម្ចាស់", artist="LIFE Band", key="Em")
+        GuitarTab.objects.create(title="Beautiful One", artist="Tim Hughes")
+
+    def lookup(self, q, **params):
+        res = self.client.get("/api/songs/autocomplete/", {"q": q, **params})
+        return [(r["type"], r["title"]) for r in res.data["results"]]
+
+    def test_ranks_title_start_over_inner_word(self):
+        self.assertEqual(self.lookup("be"), [
+            ("song", "Be Thou My Vision"), ("tab", "Beautiful One"), ("song", "Let It Be"),
+        ])
+        self.assertEqual(self.lookup("BE", type="tab"), [("tab", "Beautiful One")])
+        self.assertEqual(self.lookup("beatles"), [("song", "Let It Be")])
+
+    def test_many_artist_matches_do_not_hide_a_title_match(self):
+        index = autocomplete.PrefixIndex()
+        index.load([(autocomplete.SONG, i, f"Song {i}", f"aa{i:04d}", "C") for i in range(600)]
+                   + [(autocomplete.SONG, 999, "Azure", "Band", "D")])
+        results = index.search("a", 5)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0]["title"], "Azure")
+        index.remove(autocomplete.SONG, 999)
+        self.assertNotIn("Azure", [r["title"] for r in index.search("a", 5)])
+
+    def test_khmer_and_unicode_normalization(self):
+        self.assertEqual(len(self.lookup("ព្រះ")), 1)
+        self.assertEqual(len(self.lookup("ជាម្ចាស់")), 1)
+        # decomposed input still matches the composed title
+        with self.captureOnCommitCallbacks(execute=True):
+            Song.objects.create(title="Café Worship", artist="X")
+        self.assertEqual(self.lookup(unicodedata.normalize("NFD", "café")), [("song", "Café Worship")])
+
+    def test_follows_saves_and_deletes(self):
+        self.lookup("x")  # build the index
+        with self.captureOnCommitCallbacks(execute=True):
+            song = Song.objects.create(title="Oceans", artist="Hillsong United")
+        self.assertEqual(self.lookup("ocean"), [("song", "Oceans")])
+        with self.captureOnCommitCallbacks(execute=True):
+            song.delete()
+        self.assertEqual(self.lookup("ocean"), [])
+
+
+LYRICS = [
+    {"text": "Amazing grace how sweet", "chords": [{"chord": "G", "position": 0}, {"chord": "C/G", "position": 8}]},
+    {"text": "ព្រះគុណដ៏អស្ចារ្យ", "chords": [{"chord": "G", "position": 3}]},
+    {"text": "", "chords": []},
+]
+
+
+class LyricsCodecTests(TestCase):
+    def test_round_trip(self):
+        self.assertEqual(lyrics_codec.decode(lyrics_codec.encode(LYRICS)), LYRICS)
+        self.assertEqual(lyrics_codec.decode(lyrics_codec.encode([])), [])
+        wide = [{"text": "x", "chords": [{"chord": "D", "position": 70000}, {"chord": "E", "position": -1}]}]
+        self.assertEqual(lyrics_codec.decode(lyrics_codec.encode(wide)), wide)
+
+    def test_refuses_lossy_input(self):
+        for lyrics in (
+            None,
+            {"text": "x"},
+            [{"text": "x"}],
+            [{"text": "x", "chords": [], "comment": "y"}],
+            [{"text": "x", "chords": [{"chord": "G", "position": 1.5}]}],
+            [{"text": "x", "chords": [{"chord": "G", "position": True}]}],
+        ):
+            self.assertIsNone(lyrics_codec.encode(lyrics), lyrics)
+
+
+@override_settings(SONG_LYRICS_STORAGE="packed")
+class PackedLyricsStorageTests(TestCase):
+    def stored(self, song):
+        return Song.objects.filter(pk=song.pk).values_list("lyrics", "lyrics_packed").get()
+
+    def test_packed_row_reads_back_unchanged(self):
+        song = Song.objects.create(title="Amazing Grace", artist="Newton", lyrics=LYRICS)
+        lyrics, packed = self.stored(song)
+        self.assertIsNone(lyrics)
+        self.assertIsNotNone(packed)
+        self.assertEqual(song.lyrics, LYRICS)
+        self.assertEqual(Song.objects.get(pk=song.pk).lyrics, LYRICS)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        res = client.get(f"/api/songs/{song.pk}/")
+        self.assertEqual(res.data["lyrics"], LYRICS)
+
+    def test_unencodable_lyrics_stay_json(self):
+        odd = [{"text": "x", "chords": [], "comment": "kept"}]
+        song = Song.objects.create(title="Odd", artist="X", lyrics=odd)
+        self.assertEqual(self.stored(song), (odd, None))
+        self.assertEqual(Song.objects.get(pk=song.pk).lyrics, odd)
+
+    def test_pack_and_unpack_commands(self):
+        with override_settings(SONG_LYRICS_STORAGE="json"):
+            song = Song.objects.create(title="Amazing Grace", artist="Newton", lyrics=LYRICS)
+        self.assertEqual(self.stored(song), (LYRICS, None))
+
+        call_command("pack_lyrics", stdout=io.StringIO())
+        self.assertIsNone(self.stored(song)[0])
+        self.assertEqual(Song.objects.get(pk=song.pk).lyrics, LYRICS)
+
+        call_command("pack_lyrics", "--unpack", stdout=io.StringIO())
+        self.assertEqual(self.stored(song)[0], LYRICS)
+        self.assertIsNone(self.stored(song)[1])
+
+
+def _chart(n, tag=""):
+    return [{"text": f"Line {i}{tag}", "chords": [{"chord": "G", "position": 0}]} for i in range(n)]
+
+
+class SongVersionDeltaTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        self.original = Song.objects.create(title="Oceans", artist="Hillsong United", key="D", lyrics=_chart(30))
+
+    def new_version(self, parent, lyrics):
+        res = self.client.post(f"/api/songs/{parent.pk}/new-version/", {
+            "title": parent.title, "artist": parent.artist, "key": "E", "lyrics": lyrics,
+        }, format="json")
+        self.assertEqual(res.status_code, 201)
+        return Song.objects.get(pk=res.data["id"])
+
+    def stored(self, song):
+        return Song.objects.filter(pk=song.pk).values_list("lyrics", "lyrics_delta", "delta_depth").get()
+
+    def test_version_stored_as_delta(self):
+        edited = _chart(30)
+        edited[4]["text"] = "Spirit lead me"
+        version = self.new_version(self.original, edited)
+
+        lyrics, delta, depth = self.stored(version)
+        self.assertIsNone(lyrics)
+        self.assertEqual(depth, 1)
+        self.assertEqual(delta[0], ["=", 4])
+        self.assertEqual(version.lyrics, edited)
+
+        res = self.client.get(f"/api/songs/{version.pk}/")
+        self.assertEqual(res.data["lyrics"], edited)
+        res = self.client.get("/api/songs/", {"page_size": 10})
+        self.assertEqual({s["id"]: s["lyrics"] for s in res.data["songs"]}[version.pk], edited)
+
+    @override_settings(SONG_VERSION_SNAPSHOT_INTERVAL=3)
+    def test_snapshots_bound_chain_reads(self):
+        song, expected = self.original, _chart(30)
+        for i in range(7):
+            expected = [*expected, {"text": f"Tag {i}", "chords": []}]
+            song = self.new_version(song, expected)
+        depths = Song.objects.exclude(pk=self.original.pk).order_by("version").values_list("delta_depth", flat=True)
+        self.assertEqual(list(depths), [1, 2, 3, 0, 1, 2, 3])
+
+        # the row plus one query per delta level
+        with self.assertNumQueries(4):
+            self.assertEqual(Song.objects.get(pk=song.pk).lyrics, expected)
+
+    def test_parent_edit_and_delete_keep_versions(self):
+        edited = [*_chart(30), {"text": "Outro", "chords": []}]
+        version = self.new_version(self.original, edited)
+
+        retitled = _chart(30)
+        retitled[0]["text"] = "Intro"
+        self.original.lyrics = retitled
+        self.original.save()
+        self.assertEqual(Song.objects.get(pk=version.pk).lyrics, edited)
+        self.assertIsNotNone(self.stored(version)[1])
+
+        self.original.delete()
+        self.assertEqual(self.stored(version), (edited, None, 0))
+        self.assertEqual(Song.objects.get(pk=version.pk).lyrics, edited)
+
+    def test_compact_existing_copies(self):
+        copies = [
+            Song.objects.create(title="Oceans", artist="Hillsong United", version=2,
+                                lyrics=_chart(30, tag=" (v2)" if i else "")[:30 - i])
+            for i in range(2)
+        ]
+        Song.objects.filter(pk__in=[s.pk for s in copies]).update(original_song=self.original)
+
+        out = io.StringIO()
+        call_command("compact_song_versions", stdout=out)
+        self.assertIn("1 of 2 versions stored as deltas", out.getvalue())
+        self.assertEqual(self.stored(copies[0])[:2], (None, [["=", 30]]))
+        self.assertEqual(self.stored(copies[1])[1], None)
+        self.assertEqual(Song.objects.get(pk=copies[0].pk).lyrics, _chart(30))
+
+
+class SongVersionTreeTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        # root -> v2 -> v3, with a second branch root -> v2b
+        self.root = Song.objects.create(title="Oceans", artist="Hillsong United")
+        self.v2 = Song.objects.create(title="Oceans", artist="Hillsong United", version=2, original_song=self.root)
+        self.v2b = Song.objects.create(title="Oceans", artist="Hillsong United", version=2, original_song=self.root)
+        self.v3 = Song.objects.create(title="Oceans", artist="Hillsong United", version=3, original_song=self.v2)
+        self.other = Song.objects.create(title="Cornerstone", artist="Hillsong")
+
+    def test_tree_in_one_query(self):
+        with self.assertNumQueries(1):
+            tree = version_tree.build(
+                version_tree.lineage(Song, self.v2.pk, "original_song"), self.v2.pk, "original_song", lambda s: {}
+            )
+        self.assertEqual(tree["root"], self.root.pk)
+        self.assertEqual(tree["ancestors"], [self.root.pk])
+        self.assertEqual(tree["descendants"], [self.v3.pk])
+        self.assertEqual(tree["latest"], self.v3.pk)
+        self.assertEqual({v["id"] for v in tree["versions"]}, {self.root.pk, self.v2.pk, self.v2b.pk, self.v3.pk})
+
+    def test_endpoint_and_latest_filter(self):
+        res = self.client.get(f"/api/songs/{self.v3.pk}/versions/")
+        self.assertEqual(res.data["ancestors"], [self.root.pk, self.v2.pk])
+        heads = {v["id"] for v in res.data["versions"] if v["is_head"]}
+        self.assertEqual(heads, {self.v2b.pk, self.v3.pk})
+        self.assertEqual(self.client.get("/api/songs/999/versions/").status_code, 404)
+
+        res = self.client.get("/api/songs/", {"latest": "true", "page_size": 10})
+        self.assertEqual({s["id"] for s in res.data["songs"]}, {self.v2b.pk, self.v3.pk, self.other.pk})
+
+
+class SongOptimisticLockingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        self.song = Song.objects.create(title="Oceans", artist="Hillsong United", key="D")
+        self.url = f"/api/songs/{self.song.pk}/"
+
+    def test_if_match_write_and_conflict(self):
+        etag = self.client.get(self.url)["ETag"]
+        res = self.client.patch(self.url, {"key": "E"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["revision"], 2)
+        self.assertNotEqual(res["ETag"], etag)
+
+        # a second leader still holding the old ETag gets the current chart back
+        res = self.client.patch(self.url, {"key": "F"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, 412)
+        self.assertEqual(res.data["key"], "E")
+        self.assertEqual(Song.objects.get(pk=self.song.pk).key, "E")
+
+        res = self.client.patch(self.url, {"flow_notes": "V C B"}, format="json", HTTP_IF_MATCH=res["ETag"])
+        self.assertEqual((res.status_code, res.data["flow_notes"]), (200, "V C B"))
+        self.assertEqual(self.client.get(self.url)["ETag"], res["ETag"])
+
+    def test_conditional_update_catches_concurrent_write(self):
+        stale = Song.objects.get(pk=self.song.pk)
+        Song.objects.get(pk=self.song.pk).save()  # someone else's blind write
+        self.assertEqual(Song.objects.get(pk=self.song.pk).revision, 2)
+
+        stale.key = "G"
+        with self.assertRaises(RevisionConflict), transaction.atomic():
+            claim_revision(stale, 1)
+            stale.save()
+        self.assertEqual(Song.objects.get(pk=self.song.pk).key, "D")
+
+    def test_if_match_from_before_the_tab_was_deleted(self):
+        tab = GuitarTab.objects.create(title="Intro riff", artist="Band", tab_data={"lines": []})
+        res = self.client.patch(self.url, {"guitar_tab_id": tab.id}, format="json")
+        etag = res["ETag"]
+        tab.delete()
+        res = self.client.patch(self.url, {"key": "E"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(res.status_code, 412)
+        self.assertIsNone(res.data["guitar_tab_id"])
+
+
+class SongJsonPatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        # line 0 predates validation and would not pass it; untouched, it must not block edits
+        self.song = Song.objects.create(title="Oceans", artist="Hillsong United", key="D", lyrics=[
+            {"text": "You call me out", "chords": [{"chord": "D", "position": -1}]},
+            {"text": "upon the waters", "chords": [{"chord": "A", "position": 5}]},
+        ])
+        self.url = f"/api/songs/{self.song.pk}/"
+
+    def patch(self, ops, **extra):
+        return self.client.patch(self.url, json.dumps(ops), content_type="application/json-patch+json", **extra)
+
+    def test_applies_line_ops(self):
+        res = self.patch([
+            {"op": "test", "path": "/lyrics/1/text", "value": "upon the waters"},
+            {"op": "replace", "path": "/lyrics/1/chords/0/position", "value": 0},
+            {"op": "add", "path": "/lyrics/-", "value": {"text": "the great unknown", "chords": []}},
+            {"op": "replace", "path": "/key", "value": "e"},
+        ])
+        self.assertEqual(res.status_code, 200)
+        song = Song.objects.get(pk=self.song.pk)
+        self.assertEqual(song.key, "E")
+        self.assertEqual(song.lyrics[0], self.song.lyrics[0])
+        self.assertEqual(song.lyrics[1]["chords"], [{"chord": "A", "position": 0}])
+        self.assertEqual(song.lyrics[2]["text"], "the great unknown")
+        self.assertEqual(res.data["revision"], 2)
+
+    def test_keeps_keys_the_serializer_does_not_declare(self):
+        line = {"text": "the great unknown", "section": "Verse 1",
+                "chords": [{"chord": "D", "position": 4, "fingering": "xx0232"}]}
+        res = self.patch([
+            {"op": "add", "path": "/lyrics/-", "value": line},
+            {"op": "replace", "path": "/lyrics/2/chords/0/position", "value": 0},
+        ])
+        self.assertEqual(res.status_code, 200)
+        stored = Song.objects.get(pk=self.song.pk).lyrics[2]
+        self.assertEqual(stored, {**line, "chords": [{"chord": "D", "position": 0, "fingering": "xx0232"}]})
+        self.assertIs(type(stored), dict)
+
+    def test_stores_coerced_values(self):
+        res = self.patch([
+            {"op": "replace", "path": "/lyrics/1/chords/0/position", "value": "7"},
+            {"op": "replace", "path": "/lyrics/1/chords/0/chord", "value": 123},
+        ])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(Song.objects.get(pk=self.song.pk).lyrics[1]["chords"], [{"chord": "123", "position": 7}])
+
+    def test_rejects_bad_patches(self):
+        res = self.patch([{"op": "add", "path": "/lyrics/1", "value": {"text": "x", "chords": [{"chord": "G"}]}}])
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(list(res.data), ["/lyrics/1"])
+        self.assertEqual(self.patch([{"op": "remove", "path": "/lyrics/9"}]).status_code, 422)
+        self.assertEqual(self.patch([{"op": "add", "path": "/revision", "value": 9}]).status_code, 422)
+        self.assertEqual(self.patch([{"op": "test", "path": "/key", "value": "G"}]).status_code, 409)
+        self.assertEqual(self.patch({"op": "remove"}).status_code, 400)
+        self.assertEqual(Song.objects.get(pk=self.song.pk).revision, 1)
+
+    def test_if_match(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.patch([{"op": "replace", "path": "/title", "value": "Oceans (Live)"}],
+                                    HTTP_IF_MATCH=etag).status_code, 200)
+        res = self.patch([{"op": "replace", "path": "/title", "value": "Oceans!"}], HTTP_IF_MATCH=etag)
+        self.assertEqual((res.status_code, res.data["title"]), (412, "Oceans (Live)"))
+
+
+class ChordSheetTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        overrides = override_settings(CHORDSHEET_CACHE_DIR=self.tmp.name, CHORDSHEET_FONT=None)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        self.song = Song.objects.create(
+            title="Amazing Grace", artist="Trad", key="G",
+            lyrics=[{"text": "Amazing grace", "chords": [{"chord": "G", "position": 0},
+                                                          {"chord": "D", "position": 8}]}],
+        )
+
+    def test_chords_align_by_display_width(self):
+        self.assertEqual(chordsheet.chord_line("Amazing grace", [{"chord": "D", "position": 8},
+                                                                 {"chord": "G", "position": 0}]),
+                         "G       D")
+        # the coeng and the subscript consonant after it take no column
+        khmer = "ព្រះ យេស៊ូ"
+        self.assertEqual(chordsheet.text_width("ព្រះ"), 2)
+        self.assertEqual(chordsheet.chord_line(khmer, [{"chord": "Em", "position": 5}]), "   Em")
+        # overlapping chords are pushed apart
+        self.assertEqual(chordsheet.chord_line("ab", [{"chord": "Cmaj7", "position": 0},
+                                                      {"chord": "D", "position": 1}]), "Cmaj7 D")
+
+    def test_song_text_is_transposed_and_cached(self):
+        url = f"/api/songs/{self.song.id}/chordsheet.txt"
+        res = self.client.get(url, {"key": "A"})
+        self.assertEqual(res.status_code, 200)
+        body = b"".join(res.streaming_content).decode()
+        self.assertIn("Trad · Key: A\n", body)
+        self.assertIn("A       E\nAmazing grace", body)
+
+        with mock.patch.object(chordsheet, "render_text", wraps=chordsheet.render_text) as spy:
+            again = self.client.get(url, {"key": "A"})
+            b"".join(again.streaming_content)
+        spy.assert_not_called()
+        self.assertEqual(again["ETag"], res["ETag"])
+        res = self.client.get(url, {"key": "A"}, HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, 304)
+
+    def test_setlist_pdf(self):
+        other = Song.objects.create(title="Cornerstone", artist="Hillsong", key="C",
+                                    lyrics=[{"text": "My hope", "chords": [{"chord": "C", "position": 0}]}])
+        setlist = Setlist.objects.create(name="Sunday")
+        SetlistItem.objects.create(setlist=setlist, song=self.song, position=1, target_key="A")
+        SetlistItem.objects.create(setlist=setlist, song=other, position=2)
+
+        res = self.client.get(f"/api/songs/setlists/{setlist.id}/chordsheet.pdf")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res["Content-Type"], "application/pdf")
+        pdf = b"".join(res.streaming_content)
+        self.assertTrue(pdf.startswith(b"%PDF-1.4"))
+        self.assertIn(b"/Count 2", pdf)
+        self.assertIn(b"(A       E) Tj", pdf)
+
+        self.assertEqual(self.client.get(f"/api/songs/setlists/{setlist.id}/chordsheet.doc").status_code, 404)
+
+    @override_settings(CHORDSHEET_CACHE_MAX_FILES=2)
+    def test_prune_keeps_recently_served_sheets(self):
+        sheets = [chordsheet.build_song(self.song, key=k) for k in ("A", "B", "C")]
+        paths = [os.path.join(self.tmp.name, f"{chordsheet.digest(sheet, 'txt')}.txt") for sheet in sheets]
+        stray = os.path.join(self.tmp.name, "in-flight.tmp")
+        Path(stray).touch()
+
+        chordsheet.render(sheets[0], "txt")[0].close()
+        chordsheet.render(sheets[1], "txt")[0].close()
+        os.utime(paths[0], (0, 0))
+        os.utime(paths[1], (1, 1))
+        chordsheet.render(sheets[0], "txt")[0].close()   # a hit: now the most recently used
+        chordsheet.render(sheets[2], "txt")[0].close()
+        self.assertEqual([os.path.exists(p) for p in paths], [True, False, True])
+
+        # a served sheet stays readable when a prune removes it mid-response
+        served, _ = chordsheet.render(sheets[0], "txt")
+        os.unlink(paths[0])
+        self.assertIn(b"Key: A", served.read())
+        served.close()
+        self.assertTrue(os.path.exists(stray))
+
+
+class LoadTestDbCommandTests(TestCase):
+    def test_tuned_sqlite_takes_concurrent_writes_without_lock_errors(self):
+        out = io.StringIO()
+        call_command("load_test_db", profile=["tuned"], writers=4, transactions=25, readers=1, stdout=out)
+        self.assertIn("100/100 committed, 0 locked, 0 lost updates", out.getvalue())
+
+
+class AsyncSongViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("leader", password="pw")
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.songs = [
+            Song.objects.create(title=f"Song {i}", artist="Trad", key="C",
+                                lyrics=[{"text": "la", "chords": [{"chord": "C", "position": 0}]}])
+            for i in range(3)
+        ]
+        SongFlow.objects.create(song=self.songs[0], flow_notes="V C V")
+        self.sync = APIClient()
+        self.sync.force_authenticate(self.user)
+
+    async def test_list_matches_the_sync_view(self):
+        client = AsyncClient()
+        for query in ({"page_size": 2}, {"page_size": 2, "view": "summary"}, {"cursor": "", "page_size": 2}):
+            res = await client.get("/api/async/songs/", query)
+            self.assertEqual(res.status_code, 200)
+            expected = await sync_to_async(self.sync.get)("/api/songs/", query)
+            self.assertEqual(res.json(), expected.json())
+            self.assertEqual(res["ETag"], expected["ETag"])
+        res = await client.get("/api/async/songs/", {"fields": "lyrics"})
+        self.assertEqual(res.status_code, 400)
+
+    async def test_detail_needs_a_token(self):
+        client = AsyncClient()
+        url = f"/api/async/songs/{self.songs[0].id}/"
+        res = await client.get(url)
+        self.assertEqual(res.status_code, 401)
+
+        auth = {"AUTHORIZATION": f"Bearer {self.token}"}
+        res = await client.get(url, headers=auth)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["flow_notes"], "V C V")
+        res = await client.get(url, headers={**auth, "If-None-Match": res["ETag"]})
+        self.assertEqual(res.status_code, 304)
+        res = await client.get("/api/async/songs/999999/", headers=auth)
+        self.assertEqual(res.status_code, 404)
+        res = await client.get(url, headers={"AUTHORIZATION": "Bearer nope"})
+        self.assertEqual(res.status_code, 401)
+
+
+class LiveChartTests(TestCase):
+    LYRICS = [
+        {"text": "Amazing grace", "chords": [{"chord": "G", "position": 0}]},
+        {"text": "how sweet the sound", "chords": [{"chord": "C", "position": 4}]},
+        {"text": "that saved a wretch", "chords": [{"chord": "D", "position": 0}]},
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("live", password="pw")
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.song = Song.objects.create(title="Grace", artist="Newton", key="G", lyrics=self.LYRICS)
+        self.setlist = Setlist.objects.create(name="Sunday")
+        SetlistItem.objects.create(setlist=self.setlist, song=self.song, position=1, target_key="A")
+        self.app = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+
+    async def subscribe(self, path, token=None):
+        communicator = WebsocketCommunicator(self.app, f"{path}?token={token or self.token}")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator, await communicator.receive_json_from()
+
+    def edit(self, **changes):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, value in changes.items():
+                setattr(self.song, name, value)
+            self.song.save()
+
+    async def test_needs_a_token_and_a_known_chart(self):
+        for path, code in ((f"/ws/songs/{self.song.id}/?token=nope", 4401),
+                           (f"/ws/songs/{self.song.id}/", 4401),
+                           ("/ws/setlists/999999/?token=" + self.token, 4404)):
+            communicator = WebsocketCommunicator(self.app, path)
+            await communicator.connect()
+            self.assertEqual((await communicator.receive_output())["code"], code)
+
+    async def test_edits_reach_every_subscriber_as_deltas(self):
+        clients = [await self.subscribe(f"/ws/songs/{self.song.id}/") for _ in range(3)]
+        self.assertEqual(clients[0][1], {"type": "subscribed", "song_id": self.song.id, "revision": 1})
+        setlist_client, hello = await self.subscribe(f"/ws/setlists/{self.setlist.id}/")
+        self.assertEqual(hello["revisions"], {str(self.song.id): 1})
+        in_a = await sync_to_async(self.setlist_lyrics)()
+
+        lyrics = [dict(line) for line in self.LYRICS]
+        lyrics[1] = {"text": "how sweet the sound", "chords": [{"chord": "Em", "position": 4}]}
+        await sync_to_async(self.edit)(lyrics=lyrics, key="g ")
+
+        for communicator, _ in clients:
+            message = await communicator.receive_json_from()
+            self.assertEqual(message["base_revision"], 1)
+            self.assertEqual(message["revision"], 2)
+            self.assertEqual(message["fields"], {})   # "g " is normalized back to "G"
+            self.assertEqual(deltas.apply(self.LYRICS, message["ops"]), lyrics)
+            await communicator.disconnect()
+
+        # setlist subscribers get the chart in the item's target key
+        message = await setlist_client.receive_json_from()
+        self.assertEqual((message["setlist_id"], message["position"]), (self.setlist.id, 1))
+        self.assertEqual(deltas.apply(in_a, message["ops"]), await sync_to_async(self.setlist_lyrics)())
+        self.assertTrue(await setlist_client.receive_nothing())
+        await setlist_client.disconnect()
+
+    def setlist_lyrics(self):
+        """The song's lyrics as the setlist endpoint shows them (in the target key)."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        return client.get(f"/api/songs/setlists/{self.setlist.id}/").json()["songs"][0]["lyrics"]
+
+    async def test_key_change_and_setlist_edit(self):
+        communicator, _ = await self.subscribe(f"/ws/songs/{self.song.id}/")
+        await sync_to_async(self.edit)(key="A", title="Amazing Grace")
+        message = await communicator.receive_json_from()
+        self.assertEqual(message["fields"], {"key": "A", "title": "Amazing Grace"})
+        self.assertNotIn("ops", message)
+        await communicator.disconnect()
+
+        communicator, _ = await self.subscribe(f"/ws/setlists/{self.setlist.id}/")
+
+        def put_items():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            with self.captureOnCommitCallbacks(execute=True):
+                res = client.put(f"/api/songs/setlists/{self.setlist.id}/",
+                                 {"name": "Sunday AM", "items": [{"song_id": self.song.id, "target_key": "D"}]},
+                                 format="json")
+            self.assertEqual(res.status_code, 200)
+        await sync_to_async(put_items)()
+        message = await communicator.receive_json_from()
+        self.assertEqual(message["type"], "setlist.changed")
+        self.assertEqual(message["name"], "Sunday AM")
+        self.assertEqual(message["items"], [{"position": 1, "song_id": self.song.id, "target_key": "D"}])
+        await communicator.disconnect()
+
+
+    def watch_song(self):
+        """Count a subscriber for the song, as an open socket elsewhere would."""
+        key = live.WATCHERS_KEY.format(live.song_group(self.song.id))
+        cache.set(key, 1, None)
+        self.addCleanup(cache.delete, key)
+
+    def test_edits_nobody_follows_skip_the_chart_work(self):
+        with mock.patch.object(live, "_changes") as changes, CaptureQueriesContext(connection) as unwatched:
+            self.edit(key="A")
+        changes.assert_not_called()
+
+        self.watch_song()
+        with CaptureQueriesContext(connection) as watched:
+            self.edit(key="B")
+        # the row read back for the delta; setlists have no subscriber, so no item lookup
+        self.assertEqual(len(watched), len(unwatched) + 1)
+        self.assertFalse([q for q in watched if "songs_setlistitem" in q["sql"]])
+
+    def test_a_channel_layer_that_is_down_does_not_fail_the_write(self):
+        self.watch_song()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch.object(InMemoryChannelLayer, "group_send", side_effect=ConnectionError), \
+                self.assertLogs("songs.live", "ERROR"), self.captureOnCommitCallbacks(execute=True):
+            res = client.patch(f"/api/songs/{self.song.id}/", {"key": "A"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.song.refresh_from_db()
+        self.assertEqual(self.song.key, "A")
+
+
+class SongListResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.songs = [Song.objects.create(title=f"Grace {i}", artist="Band") for i in range(3)]
+
+    def test_equivalent_queries_share_one_entry(self):
+        res = self.client.get("/api/songs/", {"search": "Grace", "page_size": 2})
+        self.assertEqual(res.status_code, 200)
+        with self.assertNumQueries(0):
+            again = self.client.get("/api/songs/?_=123&page=1&page_size=2&search=%20grace%20")
+            self.assertEqual(again.json(), res.json())
+            self.assertEqual(again["ETag"], res["ETag"])
+            not_modified = self.client.get("/api/songs/?page_size=2&search=grace", HTTP_IF_NONE_MATCH=res["ETag"])
+            self.assertEqual(not_modified.status_code, 304)
+        # signed-in users never share anonymous entries
+        self.client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/songs/", {"search": "grace", "page_size": 2})
+        self.assertTrue(queries)
+
+    def test_writes_retire_cached_pages(self):
+        self.client.get("/api/songs/")
+        song = self.songs[0]
+        song.title = "Amazing Grace"
+        song.save()
+        self.assertEqual(self.client.get("/api/songs/").json()["songs"][0]["title"], "Amazing Grace")
+
+        SongFlow.objects.create(song=song, flow_notes="V C")
+        self.assertEqual(self.client.get("/api/songs/").json()["songs"][0]["flow_notes"], "V C")
+
+        song.delete()
+        self.assertEqual(self.client.get("/api/songs/").json()["total"], 2)
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": tmp,
+        }}):
+            first = self.client.get("/api/songs/", {"view": "summary"})
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get("/api/songs/", {"view": "summary"}).json(), first.json())
+            self.songs[1].delete()
+            self.assertEqual(self.client.get("/api/songs/", {"view": "summary"}).json()["total"], 2)
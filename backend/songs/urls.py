@@ -1,9 +1,28 @@
 from django.urls import path
-from .views import get_songs, get_song_detail, create_song_version, create_song
+from .views import (
+    get_songs,
+    get_song_detail,
+    create_song_version,
+    song_versions,
+    create_song,
+    export_songs,
+    setlists,
+    setlist_detail,
+    autocomplete_titles,
+    song_chordsheet,
+    setlist_chordsheet,
+)
 
 urlpatterns = [
     path('', get_songs, name='get_songs'),
     path('<int:song_id>/', get_song_detail, name='get_song_detail'),
+    path('<int:song_id>/versions/', song_versions, name='song_versions'),
+    path('<int:song_id>/chordsheet.<str:fmt>', song_chordsheet, name='song_chordsheet'),
     path('<int:song_id>/new-version/', create_song_version, name='create_song_version'),
     path('create/', create_song, name='create_song'),
+    path('export/', export_songs, name='export_songs'),
+    path('autocomplete/', autocomplete_titles, name='autocomplete_titles'),
+    path('setlists/', setlists, name='setlists'),
+    path('setlists/<int:setlist_id>/', setlist_detail, name='setlist_detail'),
+    path('setlists/<int:setlist_id>/chordsheet.<str:fmt>', setlist_chordsheet, name='setlist_chordsheet'),
 ]
@@ -1,28 +1,158 @@
 import re
-from rest_framework.decorators import api_view, permission_classes
+from datetime import datetime, timedelta, timezone
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework.decorators import api_view, parser_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from .models import Song
-from .serializers import SongSerializer
+from worship_sys import conditional, jsonpatch, pagination, response_cache, version_tree
+from worship_sys.concurrency import RevisionConflict, claim_revision
+from transpose.views import transpose_payload
+from .models import Setlist, SetlistItem, Song
+from .serializers import LyricsLineSerializer, SetlistSerializer, SongSerializer
+from . import autocomplete, chordsheet, deltas, export, search as song_search
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def _flow_stamp(flow_updated_at):
+    """Flow notes are part of the payload: their stamp (in µs, 0 = no flow) joins the ETag."""
+    return (flow_updated_at - _EPOCH) // timedelta(microseconds=1) if flow_updated_at else 0
+
+def _song_token(song):
+    """The (revision, flow stamp) pair an If-Match for *song* must carry."""
+    flow = getattr(song, 'flow', None)
+    return song.revision, _flow_stamp(flow and flow.updated_at)
+
+def _song_validators(song_id, revision, updated_at, flow_updated_at):
+    """(ETag, Last-Modified) for a song."""
+    etag = conditional.version_etag('song', song_id, revision, _flow_stamp(flow_updated_at))
+    return etag, max(filter(None, (updated_at, flow_updated_at)))
+
+def _song_response(song, status_code=status.HTTP_200_OK):
+    flow = getattr(song, 'flow', None)
+    return conditional.set_validators(
+        Response(SongSerializer(song).data, status=status_code),
+        *_song_validators(song.id, song.revision, song.updated_at, flow and flow.updated_at),
+    )
+
+def _song_precondition(song, expected):
+    """False if the ``If-Match`` revision and flow stamp already differ from the loaded row."""
+    return tuple(expected) == _song_token(song)
+
+def _claim_song(song):
+    """
+    Conditional write: claim the next revision only if the stored row is
+    still at the loaded revision and flow stamp (else RevisionConflict).
+    """
+    flow = getattr(song, 'flow', None)
+    if flow is None:
+        claim_revision(song, song.revision, flow__isnull=True)
+    else:
+        claim_revision(song, song.revision, flow__updated_at=flow.updated_at)
+
+# Fields a JSON Patch may touch
+SONG_PATCH_FIELDS = ('title', 'artist', 'imageUrl', 'key', 'tempo', 'time_signature', 'flow_notes', 'lyrics')
+PATCH_ATTEMPTS = 3
+
+def _song_patch(song, operations):
+    """
+    Apply JSON Patch *operations* to *song*'s editable fields. Returns
+    ``(serializer, lyrics, errors)``: a partial SongSerializer over just the
+    changed scalar fields, the patched lyrics (``None`` if untouched) with
+    only the changed lines validated, and their errors.
+    """
+    flow = getattr(song, 'flow', None)
+    document = {f: getattr(song, f) for f in SONG_PATCH_FIELDS if f != 'flow_notes'}
+    document['flow_notes'] = flow.flow_notes if flow else ''
+    patched = jsonpatch.apply(document, operations)
+    if not isinstance(patched, dict) or patched.keys() != document.keys():
+        raise jsonpatch.PatchUnprocessable(f"Only these fields can be patched: {', '.join(SONG_PATCH_FIELDS)}")
+
+    lyrics, errors = patched.pop('lyrics'), {}
+    if lyrics is document['lyrics']:
+        lyrics = None
+    else:
+        lyrics, errors = jsonpatch.validate_changed(document['lyrics'], lyrics, LyricsLineSerializer, '/lyrics')
+    data = {f: v for f, v in patched.items() if v is not document[f]}
+    return SongSerializer(song, data=data, partial=True), lyrics, errors
+
+def _patch_song(request, song):
+    """
+    PATCH with an RFC 6902 body. The patch is applied to the loaded row and
+    saved as a conditional update on its revision; if another write slipped
+    in, it is re-applied to the fresh row (or 412 when the client sent
+    If-Match), so concurrent line edits never overwrite each other.
+    """
+    expected = conditional.parse_if_match(request, 'song', song.id)
+    for _ in range(PATCH_ATTEMPTS):
+        if not _song_precondition(song, _song_token(song) if expected is None else expected):
+            return _song_response(song, status.HTTP_412_PRECONDITION_FAILED)
+        try:
+            serializer, lyrics, errors = _song_patch(song, request.data)
+        except jsonpatch.PatchError as e:
+            return Response({"error": str(e)}, status=e.status_code)
+        if not serializer.is_valid() or errors:
+            return Response({**serializer.errors, **errors}, status=status.HTTP_400_BAD_REQUEST)
+        if lyrics is not None:
+            song.lyrics = lyrics
+        try:
+            with transaction.atomic():
+                _claim_song(song)
+                serializer.save()
+            return _song_response(song)
+        except RevisionConflict:
+            song = Song.objects.with_related().filter(id=song.id).first()
+            if song is None:
+                return Response({"error": "Song not found"}, status=status.HTTP_404_NOT_FOUND)
+            if expected is not None:
+                return _song_response(song, status.HTTP_412_PRECONDITION_FAILED)
+    return _song_response(song, status.HTTP_409_CONFLICT)
 
 @api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
+@parser_classes(jsonpatch.parser_classes())
 def get_song_detail(request, song_id):
+    if request.method == 'GET' and conditional.has_conditions(request):
+        # Revalidation: answer 304 from the row stamps alone
+        stamps = Song.objects.filter(id=song_id).values_list('revision', 'updated_at', 'flow__updated_at').first()
+        if stamps is not None:
+            not_modified = conditional.conditional_response(request, *_song_validators(song_id, *stamps))
+            if not_modified is not None:
+                return not_modified
+
     try:
-        song = Song.objects.get(id=song_id)
+        song = Song.objects.with_related().get(id=song_id)
     except Song.DoesNotExist:
         return Response({"error": "Song not found"}, status=status.HTTP_404_NOT_FOUND)
     
     if request.method == 'GET':
-        serializer = SongSerializer(song)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return _song_response(song)
+
+    elif request.method == 'PATCH' and jsonpatch.is_patch(request):
+        return _patch_song(request, song)
     
     elif request.method in ['PUT', 'PATCH']:
+        # If-Match: the write only lands if nobody changed the song since that ETag;
+        # otherwise 412 with the current state so the client can merge and retry
+        expected = conditional.parse_if_match(request, 'song', song.id)
+        if expected is not None and not _song_precondition(song, expected):
+            return _song_response(song, status.HTTP_412_PRECONDITION_FAILED)
+
         # Use partial update if the method is PATCH
         partial = request.method == 'PATCH'
         serializer = SongSerializer(song, data=request.data, partial=partial)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            try:
+                with transaction.atomic():
+                    if expected is not None:
+                        _claim_song(song)
+                    serializer.save()
+            except RevisionConflict:
+                current = Song.objects.with_related().filter(id=song_id).first()
+                if current is None:
+                    return Response({"error": "Song not found"}, status=status.HTTP_404_NOT_FOUND)
+                return _song_response(current, status.HTTP_412_PRECONDITION_FAILED)
+            return _song_response(song)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == 'DELETE':
@@ -32,41 +162,136 @@ def get_song_detail(request, song_id):
             status=status.HTTP_204_NO_CONTENT
         )
 
+# Columns a list client may ask for with ?fields= (no lyrics / flow notes).
+PROJECTABLE_FIELDS = (
+    'id', 'title', 'artist', 'imageUrl', 'key', 'tempo', 'time_signature',
+    'created_at', 'version', 'original_song', 'guitar_tab_id',
+)
+SUMMARY_FIELDS = ('id', 'title', 'artist', 'key', 'tempo', 'imageUrl')
+
+
+def _list_projection(request):
+    """
+    Columns requested via ``?view=summary`` or ``?fields=a,b``; ``None`` means
+    the full SongSerializer payload. Raises ValueError for unknown fields.
+    """
+    fields = request.query_params.get('fields', '').strip()
+    if fields:
+        names = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = sorted(set(names) - set(PROJECTABLE_FIELDS))
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        # id is always present so cursors and links keep working
+        return tuple(dict.fromkeys(['id', *names]))
+    if request.query_params.get('view') == 'summary':
+        return SUMMARY_FIELDS
+    return None
+
+
+def _song_list_queryset(request):
+    """
+    ``get_songs``' filtered queryset (``?latest=``, ``?search=``). May read
+    the database to build the search index, so async callers run it in a thread.
+    """
+    search = request.query_params.get('search', '').strip()
+    qs = Song.objects.with_related().order_by('id')
+    if version_tree.wants_latest(request):
+        qs = version_tree.latest_only(qs, 'original_song')
+    if search:
+        # Ranked prefix match over title, artist and lyrics via the search index;
+        # cursor mode walks matches in id order instead of rank order.
+        ranked = song_search.search_songs(qs, search, ranked=not pagination.wants_cursor(request))
+        if ranked is not None:
+            qs = ranked
+        else:
+            # No index on this database: fall back to a word-boundary title regex
+            regex = r'\b' + re.escape(search)
+            qs = qs.filter(title__iregex=regex)
+    return qs
+
+
+def _song_list_render(qs, fields):
+    """``(queryset, render)``: plain column dicts for a projection, else SongSerializer."""
+    if fields:
+        # Plain column tuples: the lyrics JSON is never loaded or decoded
+        return qs.values(*fields), list
+    return qs, lambda rows: SongSerializer(rows, many=True).data
+
+
+# every query parameter get_songs reads; shared with its async twin
+cached_song_list = response_cache.cached_list(
+    'songs', depends_on=('songs',),
+    params=('search', 'latest', 'view', 'fields', 'cursor', 'include_total', 'page', 'page_size'),
+    folded=('search', 'latest', 'include_total'), defaults={'page': '1', 'page_size': '5'},
+)
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cached_song_list
 def get_songs(request):
-    search = request.query_params.get('search', '').strip()
-    
-    # If a search query is provided, use a regex that matches a word boundary followed by the search term.
-    if search:
-        # Build a regex pattern that requires the search string to appear at a word boundary
-        regex = r'\b' + re.escape(search)
-        qs = Song.objects.filter(title__iregex=regex).order_by('id')
-    else:
-        qs = Song.objects.all().order_by('id')
-    
+    cursor_mode = pagination.wants_cursor(request)
     try:
-        page = int(request.query_params.get('page', 1))
-    except ValueError:
-        page = 1
-    try:
-        page_size = int(request.query_params.get('page_size', 5))
-    except ValueError:
-        page_size = 5
+        fields = _list_projection(request)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    stamp_qs = _song_list_queryset(request)
+    qs, render = _song_list_render(stamp_qs, fields)
+    page, page_size = pagination.page_params(request)
+
+    params = request.query_params.urlencode()
+    if cursor_mode:
+        try:
+            # Page-level ETag from the (id, stamps) of just this window
+            window = pagination.cursor_queryset(stamp_qs, request, page_size)
+        except pagination.InvalidCursor as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        etag = conditional.make_etag('songs', params, *window.values_list('id', 'updated_at', 'flow__updated_at'))
+        not_modified = conditional.conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        songs, next_cursor, total = pagination.paginate_by_cursor(qs, request, page_size)
+        data = {
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "songs": render(songs),
+        }
+        if total is not None:
+            data["total"] = total
+        return conditional.set_validators(Response(data, status=status.HTTP_200_OK), etag)
+
+    # Collection ETag; the same query provides the total
+    stamps = stamp_qs.aggregate(total=Count('id'), modified=Max('updated_at'), flow_modified=Max('flow__updated_at'))
+    total = stamps['total']
+    etag = conditional.make_etag('songs', params, total, stamps['modified'], stamps['flow_modified'])
+    not_modified = conditional.conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
 
-    total = qs.count()
     start = (page - 1) * page_size
     end = start + page_size
-    serializer = SongSerializer(qs[start:end], many=True)
-    return Response({
+    return conditional.set_validators(Response({
         "total": total,
         "page": page,
         "page_size": page_size,
-        "songs": serializer.data,
-    }, status=status.HTTP_200_OK)
+        "songs": render(qs[start:end]),
+    }, status=status.HTTP_200_OK), etag)
+
 
 
 
+@api_view(['GET'])
+def song_versions(request, song_id):
+    """The whole version tree ``song_id`` belongs to, in one query."""
+    nodes = version_tree.lineage(Song, song_id, 'original_song', fields=('title', 'artist', 'key', 'created_at'))
+    tree = version_tree.build(nodes, song_id, 'original_song', lambda s: {
+        "title": s.title, "artist": s.artist, "key": s.key, "created_at": s.created_at,
+    })
+    if tree is None:
+        return Response({"error": "Song not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(tree, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
 def create_song_version(request, song_id):
@@ -90,3 +315,156 @@ def create_song(request):
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET'])
+def export_songs(request):
+    """Stream the whole catalog as NDJSON, one song (with its tab) per line."""
+    response = StreamingHttpResponse(export.iter_ndjson(), content_type='application/x-ndjson')
+    response['Content-Disposition'] = 'attachment; filename="songs.ndjson"'
+    return response
+
+
+def _setlist_queryset():
+    # items -> song -> flow arrive with the setlist in a single prefetch query
+    return Setlist.objects.prefetch_related(
+        Prefetch('items', queryset=SetlistItem.objects.select_related('song__flow'))
+    )
+
+def _hydrate_setlist(setlist):
+    """Setlist payload with every song's chart, transposed to its target key."""
+    data = SetlistSerializer(setlist).data
+    data.pop('items')
+    items = setlist.items.all()
+    # songs arrive through select_related, which bypasses SongIterable
+    deltas.resolve([item.song for item in items], setlist._state.db)
+    songs = []
+    for item in items:
+        song = item.song
+        flow = getattr(song, 'flow', None)
+        entry = {
+            "position": item.position,
+            "song_id": song.id,
+            "title": song.title,
+            "artist": song.artist,
+            "imageUrl": song.imageUrl,
+            "tempo": song.tempo,
+            "time_signature": song.time_signature,
+            "original_key": song.key,
+            "target_key": item.target_key,
+            "key": song.key,
+            "flow_notes": flow.flow_notes if flow else "",
+            "lyrics": song.lyrics,
+        }
+        if item.target_key:
+            transposed, error = transpose_payload(song, target_key=item.target_key)
+            if error:
+                entry["transpose_error"] = error["error"]
+            else:
+                entry["key"] = transposed["transposed_key"]
+                entry["lyrics"] = transposed["transposed_lyrics"]
+        songs.append(entry)
+    data["songs"] = songs
+    return data
+
+@api_view(['GET', 'POST'])
+def setlists(request):
+    if request.method == 'POST':
+        serializer = SetlistSerializer(data=request.data)
+        if serializer.is_valid():
+            setlist = serializer.save(created_by=request.user)
+            return Response(_hydrate_setlist(_setlist_queryset().get(id=setlist.id)),
+                            status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    qs = Setlist.objects.annotate(song_count=Count('items')).order_by('-service_date', '-id')
+    return Response({
+        "setlists": [
+            {
+                "id": s.id,
+                "name": s.name,
+                "service_date": s.service_date,
+                "song_count": s.song_count,
+                "updated_at": s.updated_at,
+            }
+            for s in qs
+        ]
+    }, status=status.HTTP_200_OK)
+
+@api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
+def setlist_detail(request, setlist_id):
+    try:
+        setlist = _setlist_queryset().get(id=setlist_id)
+    except Setlist.DoesNotExist:
+        return Response({"error": "Setlist not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'GET':
+        return Response(_hydrate_setlist(setlist), status=status.HTTP_200_OK)
+
+    elif request.method in ['PUT', 'PATCH']:
+        partial = request.method == 'PATCH'
+        serializer = SetlistSerializer(setlist, data=request.data, partial=partial)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(_hydrate_setlist(_setlist_queryset().get(id=setlist.id)),
+                            status=status.HTTP_200_OK)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    elif request.method == 'DELETE':
+        setlist.delete()
+        return Response({"message": "Setlist deleted"}, status=status.HTTP_204_NO_CONTENT)
+
+def _chordsheet_response(request, sheet, fmt):
+    """Serve *sheet* from the render cache; its content hash is the ETag."""
+    if fmt not in chordsheet.CONTENT_TYPES:
+        return Response({"error": "Format must be one of: " + ", ".join(chordsheet.CONTENT_TYPES)},
+                        status=status.HTTP_404_NOT_FOUND)
+    etag = f'"{chordsheet.digest(sheet, fmt)}"'
+    not_modified = conditional.conditional_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+    sheet_file, key = chordsheet.render(sheet, fmt)
+    response = FileResponse(sheet_file, content_type=chordsheet.CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'inline; filename="chordsheet-{key[:12]}.{fmt}"'
+    return conditional.set_validators(response, etag)
+
+@api_view(['GET'])
+def song_chordsheet(request, song_id, fmt):
+    """Printable chart as ``.txt`` or ``.pdf``; ``?key=A`` transposes it first."""
+    try:
+        song = Song.objects.with_related().get(id=song_id)
+    except Song.DoesNotExist:
+        return Response({"error": "Song not found"}, status=status.HTTP_404_NOT_FOUND)
+    target_key = request.query_params.get('key')
+    if target_key:
+        transposed, error = transpose_payload(song, target_key=target_key)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+        sheet = chordsheet.build_song(song, transposed["transposed_lyrics"], transposed["transposed_key"])
+    else:
+        sheet = chordsheet.build_song(song)
+    return _chordsheet_response(request, sheet, fmt)
+
+@api_view(['GET'])
+def setlist_chordsheet(request, setlist_id, fmt):
+    """Every chart of a setlist, in order and in its target key, one song per page."""
+    try:
+        setlist = _setlist_queryset().get(id=setlist_id)
+    except Setlist.DoesNotExist:
+        return Response({"error": "Setlist not found"}, status=status.HTTP_404_NOT_FOUND)
+    return _chordsheet_response(request, chordsheet.build_setlist(_hydrate_setlist(setlist)), fmt)
+
+@api_view(['GET'])
+def autocomplete_titles(request):
+    """
+    Typeahead over song and guitar-tab titles/artists:
+    ``?q=<prefix>&limit=10&type=song|tab``.
+    """
+    query = request.query_params.get('q', '')
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    kind = request.query_params.get('type')
+    kinds = (kind,) if kind in (autocomplete.SONG, autocomplete.TAB) else (autocomplete.SONG, autocomplete.TAB)
+    results = autocomplete.get_index().search(query, limit=limit, kinds=kinds)
+    return Response({"results": results}, status=status.HTTP_200_OK)
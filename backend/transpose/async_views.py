@@ -0,0 +1,21 @@
+"""ASGI-native twin of ``transpose_song`` on the async ORM."""
+from rest_framework import status
+
+from songs.models import Song
+from worship_sys.async_api import async_api_view, json_response
+from .views import NOT_AN_OBJECT, transpose_payload
+
+
+@async_api_view(["POST"])
+async def transpose_song(request, song_id):
+    if not isinstance(request.data, dict):
+        return json_response(NOT_AN_OBJECT, status.HTTP_400_BAD_REQUEST)
+    try:
+        song = await Song.objects.aget(id=song_id)
+    except Song.DoesNotExist:
+        return json_response({"error": f"Song with ID {song_id} not found"}, status.HTTP_404_NOT_FOUND)
+    # transposed charts come from the (in-memory) cache; no further queries
+    data, error = transpose_payload(song, request.data.get("direction"), request.data.get("target_key"))
+    if error:
+        return json_response(error, status.HTTP_400_BAD_REQUEST)
+    return json_response(data)
@@ -0,0 +1,34 @@
+"""
+Cache of transposed lyrics.
+
+A song can only ever produce 12 distinct transpositions, so results are
+stored under ``(song id, updated_at stamp, semitones)``. Any save of the song
+bumps ``updated_at``, which moves later lookups onto fresh keys; stale entries
+are never read again and simply age out.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+from . import engine
+
+KEY_PREFIX = "transpose"
+
+
+def _cache():
+    return caches[getattr(settings, "TRANSPOSE_CACHE_ALIAS", "default")]
+
+
+def cache_key(song, semitones: int) -> str:
+    stamp = song.updated_at.timestamp() if song.updated_at else 0
+    return f"{KEY_PREFIX}:{song.pk}:{stamp}:{semitones % 12}"
+
+
+def transposed_lyrics(song, semitones: int) -> list:
+    """``engine.transpose_lyrics(song.lyrics, semitones)``, memoized per song version."""
+    key = cache_key(song, semitones)
+    cache = _cache()
+    lines = cache.get(key)
+    if lines is None:
+        lines = engine.transpose_lyrics(song.lyrics, semitones)
+        cache.set(key, lines, getattr(settings, "TRANSPOSE_CACHE_TIMEOUT", 60 * 60 * 24))
+    return lines
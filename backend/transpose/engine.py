@@ -0,0 +1,135 @@
+"""
+Table-driven chord transposition.
+
+Each distinct chord symbol is parsed once into a small ``Chord`` record
+(root pitch class, quality, suffix, slash bass) and transposed through a
+precomputed 12x12 name table. Both steps are memoized in bounded LRU caches,
+so a chart only pays for the chords it has not seen before.
+"""
+from functools import lru_cache
+from typing import NamedTuple
+
+# Output spelling matches the sharp-based key lists used by the views.
+NOTE_NAMES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+
+_LETTER_PC = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+_ACCIDENTAL = {"#": 1, "b": -1}
+
+# _TRANSPOSED[pc][semitones] -> note name
+_TRANSPOSED = tuple(
+    tuple(NOTE_NAMES[(pc + s) % 12] for s in range(12)) for pc in range(12)
+)
+
+_NO_CHORD = frozenset({"N.C.", "N.C", "NC"})
+
+CACHE_SIZE = 4096
+
+
+class Chord(NamedTuple):
+    leading: str   # anything before the root, e.g. "(" in "(G)"
+    root: int      # pitch class 0-11
+    quality: str   # "m" for minor chords, "" otherwise
+    suffix: str    # everything after root/quality, minus the slash bass
+    bass: int      # pitch class of the slash bass, -1 when absent
+
+
+def _read_note(s: str, i: int):
+    """Return ``(pitch_class, next_index)`` for a note name at ``s[i]``."""
+    if i >= len(s):
+        return -1, i
+    pc = _LETTER_PC.get(s[i].upper())
+    if pc is None:
+        return -1, i
+    i += 1
+    if i < len(s) and s[i] in _ACCIDENTAL:
+        pc = (pc + _ACCIDENTAL[s[i]]) % 12
+        i += 1
+    return pc, i
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_chord(symbol: str):
+    """Parse *symbol* into a ``Chord``, or ``None`` if it has no root."""
+    if not symbol or symbol.strip().upper() in _NO_CHORD:
+        return None
+    start = 0
+    while start < len(symbol) and symbol[start].upper() not in _LETTER_PC:
+        start += 1
+    root, i = _read_note(symbol, start)
+    if root < 0:
+        return None
+    rest = symbol[i:]
+
+    bass = -1
+    slash = rest.rfind("/")
+    if slash >= 0:
+        pc, end = _read_note(rest, slash + 1)
+        if pc >= 0 and end == len(rest):
+            bass = pc
+            rest = rest[:slash]
+
+    quality = ""
+    if rest.startswith("m") and not rest.startswith("maj"):
+        quality, rest = "m", rest[1:]
+    return Chord(symbol[:start], root, quality, rest, bass)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _transpose(symbol: str, semitones: int) -> str:
+    c = parse_chord(symbol)
+    if c is None:
+        return symbol
+    out = c.leading + _TRANSPOSED[c.root][semitones] + c.quality + c.suffix
+    if c.bass >= 0:
+        out += "/" + _TRANSPOSED[c.bass][semitones]
+    return out
+
+
+def transpose_chord(symbol: str, semitones: int) -> str:
+    """Transpose a single chord symbol by *semitones* (any integer)."""
+    return _transpose(symbol, semitones % 12)
+
+
+def transpose_lyrics(lyrics, semitones: int) -> list:
+    """
+    Return a transposed copy of a ``Song.lyrics`` list
+    (``[{text, chords: [{chord, position}]}]``).
+    """
+    s = semitones % 12
+    return [
+        {
+            "text": line.get("text", ""),
+            "chords": [
+                {
+                    "chord": _transpose(c.get("chord", ""), s),
+                    "position": c.get("position", 0),
+                }
+                for c in line.get("chords", [])
+            ],
+        }
+        for line in lyrics or []
+    ]
+
+
+def key_root(key: str) -> int:
+    """Pitch class of a key name such as ``"Eb"`` or ``"F#m"``; -1 if invalid."""
+    if not key:
+        return -1
+    key = key.strip()
+    pc, i = _read_note(key, 0)
+    if pc < 0 or key[i:] not in ("", "m"):
+        return -1
+    return pc
+
+
+def key_interval(original_key: str, target_key: str):
+    """Semitones (0-11) from *original_key* up to *target_key*, or ``None``."""
+    o, t = key_root(original_key), key_root(target_key)
+    if o < 0 or t < 0:
+        return None
+    return (t - o) % 12
+
+
+def clear_caches() -> None:
+    parse_chord.cache_clear()
+    _transpose.cache_clear()
@@ -0,0 +1,68 @@
+# transpose/management/commands/bench_transpose.py
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from transpose import engine, views
+
+CHORDS = [
+    "C", "G", "Am", "F", "D", "Em", "Bm", "E", "A", "Dm", "Bb", "Eb",
+    "G/B", "C/E", "D/F#", "Am7", "Cmaj7", "Fmaj7", "Gsus4", "Dsus2",
+    "E7", "Abm", "F#m", "C#m7", "Bb/D", "(G)", "Esus", "A2",
+]
+
+
+def legacy_transpose_lyrics(lyrics, semitones):
+    """The per-request loop ``transpose_song`` used before the engine."""
+    lines = []
+    for line in lyrics:
+        new_chords = []
+        for c in line.get("chords", []):
+            new_chords.append({
+                "chord": views.transpose_chord(c.get("chord", ""), semitones),
+                "position": c.get("position", 0)
+            })
+        lines.append({"text": line.get("text", ""), "chords": new_chords})
+    return lines
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the chord transposition engine against the legacy helpers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=200)
+        parser.add_argument('--chords-per-line', type=int, default=4)
+        parser.add_argument('--number', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        lyrics = [
+            {
+                "text": "Amazing grace how sweet the sound",
+                "chords": [
+                    {"chord": rnd.choice(CHORDS), "position": p * 8}
+                    for p in range(options['chords_per_line'])
+                ],
+            }
+            for _ in range(options['lines'])
+        ]
+        number = options['number']
+
+        results = {}
+        for name, fn in (("legacy", legacy_transpose_lyrics),
+                         ("engine", engine.transpose_lyrics)):
+            engine.clear_caches()
+            semitones = iter(range(1, 10 ** 9))
+            # cycle through all 11 non-trivial intervals like real traffic
+            t = timeit.timeit(lambda: fn(lyrics, next(semitones) % 11 + 1), number=number)
+            results[name] = t / number
+            self.stdout.write(
+                f"{name:>7}: {results[name] * 1e6:10.1f} us per "
+                f"{options['lines']}-line chart"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"speed-up: {results['legacy'] / results['engine']:.1f}x"
+        ))
@@ -0,0 +1,115 @@
+"""
+Guitar tab transposition.
+
+``GuitarTab.tab_data`` (``{"lines": [{"strings": [{"string", "notes":
+[{"fret", "position", ...}]}]}]}``) is packed into one ``bytes`` of fret
+numbers in document order. Every candidate arrangement shifts all frets by
+the same amount, so each is scored from a fret histogram rather than by
+walking the notes, and the winner is applied to the whole tab with a single
+``bytes.translate`` through a 256-entry lookup table.
+
+A transposition by ``s`` semitones can be played as a fret shift of
+``s + 12 * octave - capo``; ``plan`` picks the octave and capo that leave
+the fewest notes off the neck, then the one that keeps the fingering
+closest to the original, then the lowest capo. Notes that still fall off
+the neck are folded by octaves back onto it.
+"""
+from collections import Counter
+from typing import NamedTuple
+
+MAX_FRET = 24
+MAX_CAPO = 7
+OCTAVES = (0, -1, 1)
+
+
+class Plan(NamedTuple):
+    shift: int     # semitones the tab sounds higher (s + 12 * octave)
+    octave: int
+    capo: int
+    offset: int    # added to every fret: shift - capo
+    folded: int    # notes moved by an octave to stay on the neck
+
+
+def _notes(tab_data):
+    """Every note dict in document order, skipping malformed entries."""
+    lines = tab_data.get("lines") if isinstance(tab_data, dict) else None
+    for line in lines or ():
+        for string in (line.get("strings") or ()) if isinstance(line, dict) else ():
+            for note in (string.get("notes") or ()) if isinstance(string, dict) else ():
+                if isinstance(note, dict):
+                    yield note
+
+
+def _packable(fret) -> bool:
+    return type(fret) is int and 0 <= fret <= 255
+
+
+def pack(tab_data) -> bytes:
+    """The tab's fret numbers as one byte string (non-numeric frets are left out)."""
+    return bytes(n["fret"] for n in _notes(tab_data) if _packable(n.get("fret")))
+
+
+def _fold(fret: int, max_fret: int) -> int:
+    while fret < 0:
+        fret += 12
+    while fret > max_fret and fret - 12 >= 0:
+        fret -= 12
+    return fret
+
+
+def table(offset: int, max_fret: int = MAX_FRET) -> bytes:
+    """``bytes.translate`` table adding *offset* to a fret, folding off-neck results."""
+    return bytes(min(_fold(f + offset, max_fret), 255) for f in range(256))
+
+
+def plan(frets: bytes, semitones: int, capo=None, max_fret: int = MAX_FRET,
+         max_capo: int = MAX_CAPO) -> Plan:
+    """Choose octave and capo for shifting *frets* up by *semitones* (mod 12)."""
+    s = semitones % 12
+    histogram = sorted(Counter(frets).items())
+    capos = range(max_capo + 1) if capo is None else (capo,)
+    best = None
+    for octave in OCTAVES:
+        shift = s + 12 * octave
+        for c in capos:
+            offset = shift - c
+            off_neck = sum(n for f, n in histogram if not 0 <= f + offset <= max_fret)
+            # fewest folds, then least fingering change, then no octave jump, then lowest capo
+            score = (off_neck, abs(offset), abs(octave), c)
+            if best is None or score < best[0]:
+                best = (score, Plan(shift, octave, c, offset, off_neck))
+    return best[1]
+
+
+def apply(tab_data, frets: bytes, offset: int, max_fret: int = MAX_FRET):
+    """Copy of *tab_data* with the packed *frets* shifted by *offset*."""
+    shifted = iter(frets.translate(table(offset, max_fret)))
+
+    def note(n):
+        return {**n, "fret": next(shifted)} if _packable(n.get("fret")) else dict(n)
+
+    if not isinstance(tab_data, dict) or "lines" not in tab_data:
+        return tab_data
+    return {
+        **tab_data,
+        "lines": [
+            {
+                **line,
+                "strings": [
+                    {**string, "notes": [note(n) if isinstance(n, dict) else n
+                                         for n in (string.get("notes") or ())]}
+                    if isinstance(string, dict) else string
+                    for string in (line.get("strings") or ())
+                ],
+            }
+            if isinstance(line, dict) else line
+            for line in (tab_data.get("lines") or ())
+        ],
+    }
+
+
+def transpose_tab(tab_data, semitones: int, capo=None, max_fret: int = MAX_FRET):
+    """``(transposed tab_data, Plan)`` for *tab_data* moved up *semitones*."""
+    frets = pack(tab_data)
+    chosen = plan(frets, semitones, capo=capo, max_fret=max_fret)
+    return apply(tab_data, frets, chosen.offset, max_fret), chosen
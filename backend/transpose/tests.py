@@ -1,3 +1,190 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache as django_cache
+from django.test import AsyncClient, TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from guitartabs.models import GuitarTab
+from songs.models import Song
+from . import cache, engine, tabs
+
+
+class EngineTests(TestCase):
+    def test_transpose_chord(self):
+        self.assertEqual(engine.transpose_chord("C", 2), "D")
+        self.assertEqual(engine.transpose_chord("Am7", 3), "Cm7")
+        self.assertEqual(engine.transpose_chord("Bb", 1), "B")
+        self.assertEqual(engine.transpose_chord("F#m", -2), "Em")
+        self.assertEqual(engine.transpose_chord("Cmaj7", 12), "Cmaj7")
+        self.assertEqual(engine.transpose_chord("(G)", 2), "(A)")
+
+    def test_slash_bass_is_transposed(self):
+        self.assertEqual(engine.transpose_chord("G/B", 2), "A/C#")
+        self.assertEqual(engine.transpose_chord("C6/9", 2), "D6/9")
+
+    def test_non_chords_are_untouched(self):
+        self.assertEqual(engine.transpose_chord("", 3), "")
+        self.assertEqual(engine.transpose_chord("N.C.", 3), "N.C.")
+        self.assertEqual(engine.transpose_chord("x", 3), "x")
+
+    def test_key_interval(self):
+        self.assertEqual(engine.key_interval("G", "A"), 2)
+        self.assertEqual(engine.key_interval("A", "G"), 10)
+        self.assertEqual(engine.key_interval("Ebm", "Em"), 1)
+        self.assertIsNone(engine.key_interval("G", "H"))
+
+
+class TransposeSongTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        self.song = Song.objects.create(
+            title="Amazing Grace", artist="Trad", key="G",
+            lyrics=[{"text": "Amazing grace", "chords": [{"chord": "G", "position": 0},
+                                                          {"chord": "D/F#", "position": 8}]}],
+        )
+
+    def test_target_key(self):
+        res = self.client.post(f"/api/transpose/{self.song.id}/", {"target_key": "A"}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["transposed_key"], "A")
+        chords = [c["chord"] for c in res.data["transposed_lyrics"][0]["chords"]]
+        self.assertEqual(chords, ["A", "E/G#"])
+
+    def test_direction(self):
+        res = self.client.post(f"/api/transpose/{self.song.id}/", {"direction": "down"}, format="json")
+        self.assertEqual(res.data["transposed_key"], "F#")
+        self.assertEqual(res.data["transposed_lyrics"][0]["chords"][0]["chord"], "F#")
+
+    def test_mode_mismatch(self):
+        res = self.client.post(f"/api/transpose/{self.song.id}/", {"target_key": "Am"}, format="json")
+        self.assertEqual(res.status_code, 400)
+
+    def test_batch_uses_one_query(self):
+        other = Song.objects.create(title="Other", artist="Trad", key="Em", lyrics=[])
+        payload = {"songs": [
+            {"song_id": self.song.id, "target_key": "A"},
+            {"song_id": other.id, "direction": "up"},
+            {"song_id": 999999, "direction": "up"},
+        ]}
+        with self.assertNumQueries(1):
+            res = self.client.post("/api/transpose/batch/", payload, format="json")
+        self.assertEqual(res.status_code, 200)
+        results = res.data["results"]
+        self.assertEqual(results[0]["transposed_key"], "A")
+        self.assertEqual(results[1]["transposed_key"], "Fm")
+        self.assertIn("error", results[2])
+
+    def test_batch_rejects_bad_payload(self):
+        res = self.client.post("/api/transpose/batch/", {"songs": []}, format="json")
+        self.assertEqual(res.status_code, 400)
+        for body in ("[]", "null", '"songs"'):
+            for url in ("/api/transpose/batch/", f"/api/transpose/{self.song.id}/"):
+                res = self.client.post(url, body, content_type="application/json")
+                self.assertEqual(res.status_code, 400)
+
+
+class TransposeCacheTests(TestCase):
+    def setUp(self):
+        django_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        self.song = Song.objects.create(
+            title="Cornerstone", artist="Hillsong", key="C",
+            lyrics=[{"text": "My hope is built", "chords": [{"chord": "C", "position": 0}]}],
+        )
+
+    def test_repeat_requests_hit_the_cache(self):
+        with mock.patch.object(engine, "transpose_lyrics", wraps=engine.transpose_lyrics) as spy:
+            cache.transposed_lyrics(self.song, 2)
+            cache.transposed_lyrics(self.song, 14)
+        self.assertEqual(spy.call_count, 1)
+
+    def test_edit_invalidates(self):
+        url = f"/api/transpose/{self.song.id}/"
+        res = self.client.post(url, {"target_key": "D"}, format="json")
+        self.assertEqual(res.data["transposed_lyrics"][0]["chords"][0]["chord"], "D")
+
+        lyrics = [{"text": "My hope is built", "chords": [{"chord": "F", "position": 0}]}]
+        res = self.client.patch(f"/api/songs/{self.song.id}/", {"lyrics": lyrics}, format="json")
+        self.assertEqual(res.status_code, 200)
+
+        res = self.client.post(url, {"target_key": "D"}, format="json")
+        self.assertEqual(res.data["transposed_lyrics"][0]["chords"][0]["chord"], "G")
+
+
+def _tab_data(*frets):
+    return {"lines": [{"strings": [
+        {"string": 1, "notes": [{"fret": f, "position": i} for i, f in enumerate(frets)]},
+        {"string": 2, "notes": []},
+    ]}]}
+
+
+class TabTransposeTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("leader", password="pw"))
+        self.tab = GuitarTab.objects.create(title="Riff", artist="Trad", key="G",
+                                            tab_data=_tab_data(0, 3, 5, "x"))
+
+    @staticmethod
+    def _frets(tab_data):
+        return [n["fret"] for n in tab_data["lines"][0]["strings"][0]["notes"]]
+
+    def test_capo_keeps_the_fingering(self):
+        data, chosen = tabs.transpose_tab(_tab_data(0, 3, 5), 2)
+        self.assertEqual((chosen.capo, chosen.offset, chosen.folded), (2, 0, 0))
+        self.assertEqual(self._frets(data), [0, 3, 5])
+
+    def test_pinned_capo_shifts_and_folds(self):
+        data, chosen = tabs.transpose_tab(_tab_data(0, 3, 22), -1, capo=0)
+        self.assertEqual(chosen.shift, -1)
+        self.assertEqual(chosen.folded, 1)
+        self.assertEqual(self._frets(data), [11, 2, 21])
+
+        data, chosen = tabs.transpose_tab(_tab_data(20, 22), 4, capo=0)
+        self.assertEqual((chosen.octave, chosen.folded), (-1, 0))
+        self.assertEqual(self._frets(data), [12, 14])
+
+    def test_endpoint(self):
+        res = self.client.post(f"/api/transpose/tab/{self.tab.id}/", {"target_key": "A", "capo": 0},
+                               format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data["transposed_key"], "A")
+        self.assertEqual(self._frets(res.data["transposed_tab_data"]), [2, 5, 7, "x"])
+
+        res = self.client.post(f"/api/transpose/tab/{self.tab.id}/", {"direction": "down"}, format="json")
+        self.assertEqual(res.data["transposed_key"], "F#")
+        self.assertEqual(res.data["folded_notes"], 0)
+
+    def test_bad_requests(self):
+        url = f"/api/transpose/tab/{self.tab.id}/"
+        self.assertEqual(self.client.post(url, {}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(url, {"target_key": "Am"}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(url, {"semitones": 1, "capo": 12}, format="json").status_code, 400)
+        self.assertEqual(self.client.post("/api/transpose/tab/999999/", {"semitones": 1},
+                                          format="json").status_code, 404)
+
+
+class AsyncTransposeTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("leader", password="pw")
+        self.auth = {"AUTHORIZATION": f"Bearer {RefreshToken.for_user(user).access_token}"}
+        self.song = Song.objects.create(title="Amazing Grace", artist="Trad", key="G",
+                                        lyrics=[{"text": "Amazing", "chords": [{"chord": "G", "position": 0}]}])
+
+    async def test_transpose_song(self):
+        client = AsyncClient()
+        url = f"/api/async/transpose/{self.song.id}/"
+        res = await client.post(url, {"target_key": "A"}, content_type="application/json", headers=self.auth)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["transposed_lyrics"][0]["chords"][0]["chord"], "A")
+        res = await client.post(url, {"target_key": "Am"}, content_type="application/json", headers=self.auth)
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual((await client.get(url, headers=self.auth)).status_code, 405)
+        self.assertEqual((await client.post(url, {}, content_type="application/json")).status_code, 401)
+        for body in ("[1]", "null"):
+            res = await client.post(url, body, content_type="application/json", headers=self.auth)
+            self.assertEqual(res.status_code, 400)
@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import transpose_song
+from .views import transpose_song, transpose_batch, transpose_tab
 
 urlpatterns = [
     path('<int:song_id>/', transpose_song, name='transpose_song'),
+    path('batch/', transpose_batch, name='transpose_batch'),
+    path('tab/<int:tab_id>/', transpose_tab, name='transpose_tab'),
 ]
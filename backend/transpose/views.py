@@ -1,6 +1,8 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from guitartabs.models import GuitarTab
 from songs.models import Song
+from . import cache, engine, tabs
 import re
 
 MAJOR_KEYS = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
@@ -83,17 +85,14 @@ def find_next_key(original_key: str, steps: int) -> str:
     i = arr.index(k)
     return arr[(i + steps) % 12]
 
-@api_view(["POST"])
-def transpose_song(request, song_id):
-    try:
-        song = Song.objects.get(id=song_id)
-    except Song.DoesNotExist:
-        return Response({"error": f"Song with ID {song_id} not found"}, status=404)
-    direction = request.data.get("direction")
-    target_key = request.data.get("target_key")
+def transpose_payload(song, direction=None, target_key=None):
+    """
+    Build the ``transpose_song`` response body for *song*.
+    Returns ``(data, None)`` on success or ``(None, error_dict)``.
+    """
     original_key = song.key or ""
     if not original_key:
-        return Response({"error": "Original song key is invalid"}, status=400)
+        return None, {"error": "Original song key is invalid"}
     steps = 0
     if direction == "up":
         steps = 1
@@ -102,62 +101,145 @@ def transpose_song(request, song_id):
     if target_key:
         e = check_mode_constraint(original_key, target_key)
         if e:
-            return Response(e, status=400)
-        lines = []
-        semitones = 0
-        ok = normalize_key(original_key)
-        tk = normalize_key(target_key)
-        if not is_minor_key(ok):
-            o_idx = MAJOR_KEYS.index(ok)
-            t_idx = MAJOR_KEYS.index(tk)
-            semitones = t_idx - o_idx
-        else:
-            o_idx = MINOR_KEYS.index(ok)
-            t_idx = MINOR_KEYS.index(tk)
-            semitones = t_idx - o_idx
-        for line in song.lyrics:
-            new_chords = []
-            for c in line.get("chords", []):
-                new_chords.append({
-                    "chord": transpose_chord(c.get("chord", ""), semitones),
-                    "position": c.get("position", 0)
-                })
-            lines.append({"text": line.get("text", ""), "chords": new_chords})
-        return Response({
-            "title": song.title,
-            "artist": song.artist,
-            "original_key": song.key,
-            "transposed_key": target_key,
-            "transposed_lyrics": lines
-        })
-    if steps != 0:
+            return None, e
+        new_k = target_key
+    elif steps != 0:
         new_k = find_next_key(original_key, steps)
-        lines = []
-        ok = normalize_key(original_key)
-        nk = normalize_key(new_k)
-        if not is_minor_key(ok):
-            s = MAJOR_KEYS.index(nk) - MAJOR_KEYS.index(ok)
-        else:
-            s = MINOR_KEYS.index(nk) - MINOR_KEYS.index(ok)
-        for line in song.lyrics:
-            new_chords = []
-            for c in line.get("chords", []):
-                new_chords.append({
-                    "chord": transpose_chord(c.get("chord", ""), s),
-                    "position": c.get("position", 0)
-                })
-            lines.append({"text": line.get("text", ""), "chords": new_chords})
-        return Response({
+    else:
+        return {
             "title": song.title,
             "artist": song.artist,
             "original_key": song.key,
-            "transposed_key": new_k,
-            "transposed_lyrics": lines
-        })
-    return Response({
+            "transposed_key": song.key,
+            "transposed_lyrics": song.lyrics
+        }, None
+    semitones = engine.key_interval(original_key, new_k)
+    if semitones is None:
+        return None, {"error": "Keys missing or invalid"}
+    return {
         "title": song.title,
         "artist": song.artist,
         "original_key": song.key,
-        "transposed_key": song.key,
-        "transposed_lyrics": song.lyrics
+        "transposed_key": new_k,
+        "transposed_lyrics": cache.transposed_lyrics(song, semitones)
+    }, None
+
+# JSON bodies may be any value; the transpose endpoints all take an object
+NOT_AN_OBJECT = {"error": "Request body must be a JSON object"}
+
+@api_view(["POST"])
+def transpose_song(request, song_id):
+    if not isinstance(request.data, dict):
+        return Response(NOT_AN_OBJECT, status=400)
+    try:
+        song = Song.objects.get(id=song_id)
+    except Song.DoesNotExist:
+        return Response({"error": f"Song with ID {song_id} not found"}, status=404)
+    data, error = transpose_payload(
+        song, request.data.get("direction"), request.data.get("target_key")
+    )
+    if error:
+        return Response(error, status=400)
+    return Response(data)
+
+MAX_BATCH_SIZE = 50
+
+@api_view(["POST"])
+def transpose_batch(request):
+    """
+    Transpose several songs in one round-trip.
+
+    Body: ``{"songs": [{"song_id": 1, "target_key": "D"}, {"song_id": 2, "direction": "up"}]}``
+    Results come back in request order; a bad item carries its own ``error``
+    instead of failing the whole batch.
+    """
+    if not isinstance(request.data, dict):
+        return Response(NOT_AN_OBJECT, status=400)
+    items = request.data.get("songs")
+    if not isinstance(items, list) or not items:
+        return Response({"error": "'songs' must be a non-empty list"}, status=400)
+    if len(items) > MAX_BATCH_SIZE:
+        return Response({"error": f"At most {MAX_BATCH_SIZE} songs per batch"}, status=400)
+
+    ids = []
+    for item in items:
+        try:
+            ids.append(int(item.get("song_id")))
+        except (AttributeError, TypeError, ValueError):
+            return Response({"error": "Each item needs an integer 'song_id'"}, status=400)
+
+    songs = Song.objects.in_bulk(ids)
+    results = []
+    for song_id, item in zip(ids, items):
+        song = songs.get(song_id)
+        if song is None:
+            results.append({"song_id": song_id, "error": f"Song with ID {song_id} not found"})
+            continue
+        data, error = transpose_payload(song, item.get("direction"), item.get("target_key"))
+        results.append({"song_id": song_id, **(error or data)})
+    return Response({"results": results})
+
+
+def _int_or_none(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(value)
+    return int(value)
+
+@api_view(["POST"])
+def transpose_tab(request, tab_id):
+    """
+    Transpose a guitar tab's frets.
+
+    Body: ``{"target_key": "A"}``, ``{"direction": "up"}`` or ``{"semitones": 2}``,
+    plus an optional ``capo`` to pin; otherwise the capo and octave are chosen
+    to keep as many notes on the neck as possible (see ``transpose.tabs``).
+    """
+    if not isinstance(request.data, dict):
+        return Response(NOT_AN_OBJECT, status=400)
+    try:
+        tab = GuitarTab.objects.get(id=tab_id)
+    except GuitarTab.DoesNotExist:
+        return Response({"error": f"Tab with ID {tab_id} not found"}, status=404)
+
+    try:
+        semitones = _int_or_none(request.data.get("semitones"))
+        capo = _int_or_none(request.data.get("capo"))
+    except (TypeError, ValueError):
+        return Response({"error": "'semitones' and 'capo' must be integers"}, status=400)
+    if capo is not None and not 0 <= capo <= tabs.MAX_CAPO:
+        return Response({"error": f"'capo' must be between 0 and {tabs.MAX_CAPO}"}, status=400)
+
+    original_key = tab.key or ""
+    target_key = request.data.get("target_key")
+    direction = request.data.get("direction")
+    new_k = None
+    if semitones is None:
+        if target_key:
+            e = check_mode_constraint(original_key, target_key)
+            if e:
+                return Response(e, status=400)
+            semitones = engine.key_interval(original_key, target_key)
+            if semitones is None:
+                return Response({"error": "Keys missing or invalid"}, status=400)
+            new_k = target_key
+        elif direction in ("up", "down"):
+            semitones = 1 if direction == "up" else -1
+        else:
+            return Response({"error": "Give 'target_key', 'direction' or 'semitones'"}, status=400)
+    if new_k is None and engine.key_root(original_key) >= 0:
+        new_k = find_next_key(original_key, semitones)
+
+    tab_data, chosen = tabs.transpose_tab(tab.tab_data, semitones, capo=capo)
+    return Response({
+        "title": tab.title,
+        "artist": tab.artist,
+        "original_key": tab.key,
+        "transposed_key": new_k,
+        "shift": chosen.shift,
+        "octave": chosen.octave,
+        "capo": chosen.capo,
+        "folded_notes": chosen.folded,
+        "transposed_tab_data": tab_data,
     })
@@ -0,0 +1,90 @@
+"""
+Plumbing for the async (ASGI-native) API views.
+
+DRF's ``@api_view`` cannot wrap a coroutine, so ``async_api_view`` does the
+parts of it those views need -- method check, JWT/session authentication,
+the ``IsAuthenticated`` default, ``request.query_params``/``request.data``
+and DRF-style JSON rendering -- without leaving the event loop except for
+the token's user lookup.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+_renderer = JSONRenderer()
+_jwt = JWTAuthentication()
+_WWW_AUTHENTICATE = _jwt.authenticate_header(None)
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    """The bytes DRF's ``JSONRenderer`` would send for ``Response(data)``."""
+    return HttpResponse(_renderer.render(data), status=status_code, content_type="application/json")
+
+
+def _error(detail, status_code):
+    response = json_response({"detail": detail}, status_code)
+    if status_code == status.HTTP_401_UNAUTHORIZED:
+        response["WWW-Authenticate"] = _WWW_AUTHENTICATE
+    return response
+
+
+def _csrf_failure(request):
+    """DRF's session-auth CSRF rule: unsafe methods need a valid token."""
+    check = CsrfViewMiddleware(lambda req: None)
+    check.process_request(request)
+    reason = check.process_view(request, None, (), {})
+    return reason is not None
+
+
+async def authenticate(request):
+    """The user behind a ``Bearer`` token, else the session user (maybe anonymous)."""
+    result = await sync_to_async(_jwt.authenticate)(request)
+    if result is not None:
+        return result[0], "jwt"
+    return await request.auser(), "session"
+
+
+def _parse_body(request):
+    if request.method in ("GET", "HEAD", "OPTIONS"):
+        return {}
+    if (request.content_type or "").startswith("application/json"):
+        return json.loads(request.body or b"{}")
+    return request.POST
+
+
+def async_api_view(methods, allow_anonymous=False):
+    """``@api_view(methods)`` for ``async def`` views."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = _error(f'Method "{request.method}" not allowed.', status.HTTP_405_METHOD_NOT_ALLOWED)
+                response["Allow"] = ", ".join(methods)
+                return response
+            try:
+                user, scheme = await authenticate(request)
+            except exceptions.AuthenticationFailed as e:
+                return json_response(e.detail if isinstance(e.detail, dict) else {"detail": e.detail},
+                                     status.HTTP_401_UNAUTHORIZED)
+            if scheme == "session" and user.is_authenticated and request.method not in ("GET", "HEAD", "OPTIONS"):
+                if _csrf_failure(request):
+                    return _error("CSRF Failed", status.HTTP_403_FORBIDDEN)
+            request.user = user
+            if not allow_anonymous and not user.is_authenticated:
+                return _error("Authentication credentials were not provided.", status.HTTP_401_UNAUTHORIZED)
+            request.query_params = request.GET
+            try:
+                request.data = _parse_body(request)
+            except ValueError as e:
+                return _error(f"JSON parse error - {e}", status.HTTP_400_BAD_REQUEST)
+            return await view(request, *args, **kwargs)
+        # JWT requests carry no CSRF token; session writes are checked above, as DRF does
+        return csrf_exempt(wrapper)
+    return decorator
@@ -0,0 +1,17 @@
+"""
+ASGI-native versions of the hottest endpoints, mounted under ``api/async/``
+with the same paths, parameters and payloads as their DRF counterparts.
+Under a WSGI server they still work, one event loop per request.
+"""
+from django.urls import path
+
+from guitartabs import async_views as guitartabs
+from songs import async_views as songs
+from transpose import async_views as transpose
+
+urlpatterns = [
+    path('songs/', songs.get_songs, name='async_get_songs'),
+    path('songs/<int:song_id>/', songs.get_song_detail, name='async_get_song_detail'),
+    path('guitartabs/', guitartabs.list_guitartabs, name='async_list_guitartabs'),
+    path('transpose/<int:song_id>/', transpose.transpose_song, name='async_transpose_song'),
+]
@@ -0,0 +1,55 @@
+"""
+Cache settings from the environment.
+
+``CACHE_URL`` picks the default cache:
+
+* ``redis://host:6379/0`` (or ``rediss://``) -- Django's Redis cache
+  (needs ``redis``);
+* ``file:///var/tmp/worship-sys`` -- a directory shared by every worker on
+  the host;
+* ``locmem://`` or unset -- memory private to each process.
+
+The default cache is where workers agree on what changed: the response
+cache's generation counters (``worship_sys.response_cache``), the
+read-your-writes pins (``worship_sys.routers``) and the live chart
+subscriber counts (``songs.live``). A process-local cache only works with
+one worker: a write bumps the counters of the worker that served it, and
+every other worker keeps serving its cached pages until they time out. So
+with ``WEB_CONCURRENCY`` above 1 and no shared cache, the response cache is
+off (``response_cache_timeout``).
+"""
+from urllib.parse import urlsplit
+
+from decouple import config
+
+LOCMEM_LOCATION = "worship-sys"
+PROCESS_LOCAL_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def cache_config(url=None) -> dict:
+    """The ``CACHES["default"]`` entry for *url* (default: ``CACHE_URL``)."""
+    if url is None:
+        url = config("CACHE_URL", default="")
+    parts = urlsplit(url)
+    if parts.scheme in ("redis", "rediss"):
+        return {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": url}
+    if parts.scheme == "file":
+        if not parts.path:
+            raise ValueError(f"CACHE_URL needs a directory: {url!r}")
+        return {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": parts.path}
+    if parts.scheme not in ("", "locmem"):
+        raise ValueError(f"Unsupported CACHE_URL scheme: {parts.scheme!r}")
+    return {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": LOCMEM_LOCATION}
+
+
+def is_shared(cache: dict) -> bool:
+    """Whether every worker process sees the same *cache* entries."""
+    return cache["BACKEND"] not in PROCESS_LOCAL_BACKENDS
+
+
+def response_cache_timeout(cache: dict, workers: int, timeout: int = 300) -> int:
+    """*timeout*, or 0 (response cache off) if *workers* would each keep their own copy."""
+    return timeout if workers <= 1 or is_shared(cache) else 0
@@ -0,0 +1,67 @@
+"""
+Optimistic locking for rows edited through the API.
+
+Models mixing in ``RevisionedMixin`` have a ``revision`` counter that every
+save bumps. A write that must only land on the revision the client saw
+claims it first, inside the transaction that saves::
+
+    with transaction.atomic():
+        claim_revision(song, expected, flow__isnull=True)
+        serializer.save()
+
+``claim_revision`` is one ``UPDATE ... SET revision = n + 1 WHERE id = %s
+AND revision = n`` (plus any extra conditions); a miss raises
+``RevisionConflict``. Saves without a claim make their own with
+``revision = revision + 1`` in SQL, so concurrent blind writes never hand
+out the same revision twice. Either way the claimed row stays locked until
+the transaction ends, so the save that follows (and its signal receivers)
+see the row exactly as it was before this write.
+"""
+from django.db import router, transaction
+from django.db.models import F
+
+
+class RevisionConflict(Exception):
+    """The row changed (or vanished) since the revision the client saw."""
+
+
+def claim_revision(instance, expected: int | None = None, using=None, **conditions) -> None:
+    """
+    Bump *instance*'s stored revision for the save that follows, only if it
+    is still *expected* (and the row matches the extra ``filter()``
+    *conditions*, e.g. a related row's stamp). Without *expected* the bump
+    is unconditional. Belongs in the same ``transaction.atomic()`` as the save.
+    """
+    model = type(instance)
+    using = using or router.db_for_write(model, instance=instance)
+    rows = model._base_manager.using(using).filter(pk=instance.pk)
+    if expected is None:
+        if rows.update(revision=F('revision') + 1):
+            # the bumped value was computed by the database
+            instance.revision = rows.values_list('revision', flat=True).get()
+            instance._revision_claimed = True
+        return
+    if not rows.filter(revision=expected, **conditions).update(revision=expected + 1):
+        raise RevisionConflict(f"{model._meta.label} {instance.pk} is not at revision {expected}")
+    instance.revision = expected + 1
+    instance._revision_claimed = True
+
+
+class RevisionedMixin:
+    _revision_claimed = False
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'revision'}
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        try:
+            with transaction.atomic(using=using):
+                if not self._revision_claimed:
+                    claim_revision(self, using=using)
+                super().save(*args, **kwargs)
+        finally:
+            self._revision_claimed = False
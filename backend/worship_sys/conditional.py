@@ -0,0 +1,81 @@
+"""
+Conditional request helpers for the DRF function views.
+
+Views compute a strong ETag (and optionally a Last-Modified time) from cheap
+row stamps, call ``conditional_response`` before doing any serialization and
+return its 304 if there is one.
+
+Single-row resources use ``version_etag`` instead, whose parts can be read
+back from an ``If-Match`` header, so a write can go straight to a
+conditional ``UPDATE ... WHERE revision = <expected>``.
+"""
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over *parts* (anything with a stable ``str()``)."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def version_etag(kind: str, pk, revision: int, *extra: int) -> str:
+    """Strong ETag ``"kind-pk-revision[-extra...]"`` for ``parse_if_match``."""
+    return '"%s"' % "-".join(str(p) for p in (kind, pk, revision, *extra))
+
+
+def parse_if_match(request, kind: str, pk):
+    """
+    The integer parts (revision first) of the ``If-Match`` tag naming this
+    resource; ``None`` when the header is absent or ``*`` (an unconditional
+    write), and ``()`` when no listed tag could be this resource's.
+    """
+    header = request.META.get("HTTP_IF_MATCH")
+    if not header:
+        return None
+    etags = parse_etags(header)
+    if etags == ["*"]:
+        return None
+    prefix = f"{kind}-{pk}-"
+    for etag in etags:
+        value = etag.strip('"')
+        if value.startswith(prefix):
+            try:
+                return tuple(int(p) for p in value[len(prefix):].split("-"))
+            except ValueError:
+                continue
+    return ()
+
+
+def has_conditions(request) -> bool:
+    meta = request.META
+    return "HTTP_IF_NONE_MATCH" in meta or "HTTP_IF_MODIFIED_SINCE" in meta
+
+
+def _timestamp(dt):
+    return timegm(dt.utctimetuple()) if dt else None
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(_timestamp(last_modified))
+    return response
+
+
+def conditional_response(request, etag, last_modified=None):
+    """
+    Return a 304 (or 412) response when the request's validators match
+    *etag*/*last_modified* for a GET or HEAD, otherwise ``None``.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return None
+    response = get_conditional_response(
+        request, etag=etag, last_modified=_timestamp(last_modified)
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
@@ -0,0 +1,239 @@
+"""
+RFC 6902 JSON Patch for the detail endpoints' PATCH.
+
+A client that changed one line of a long chart sends
+``Content-Type: application/json-patch+json`` and only the operations::
+
+    [{"op": "replace", "path": "/lyrics/12/text", "value": "..."},
+     {"op": "add", "path": "/lyrics/13", "value": {"text": "...", "chords": []}},
+     {"op": "move", "from": "/lyrics/3/chords/0", "path": "/lyrics/3/chords/1"}]
+
+``apply`` copies only the containers along each operation's path, so every
+part of the document an operation did not touch is still the *same object*
+afterwards. ``changed_items`` uses that to hand back just the list items a
+patch created or modified, which is all the caller has to validate.
+"""
+import copy
+
+from rest_framework.parsers import JSONParser
+from rest_framework.settings import api_settings
+
+MEDIA_TYPE = "application/json-patch+json"
+MAX_OPERATIONS = 500
+
+
+class PatchError(ValueError):
+    """The patch is malformed (400)."""
+    status_code = 400
+
+
+class PatchUnprocessable(PatchError):
+    """Well-formed, but cannot be applied to this document (422)."""
+    status_code = 422
+
+
+class PatchTestFailed(PatchError):
+    """A ``test`` operation did not match (409)."""
+    status_code = 409
+
+
+class JSONPatchParser(JSONParser):
+    media_type = MEDIA_TYPE
+
+
+def parser_classes():
+    """The default parsers plus JSON Patch, for ``@parser_classes``."""
+    return [*api_settings.DEFAULT_PARSER_CLASSES, JSONPatchParser]
+
+
+def is_patch(request) -> bool:
+    return (request.content_type or "").split(";")[0].strip() == MEDIA_TYPE
+
+
+def parse_pointer(pointer) -> list:
+    """JSON Pointer (RFC 6901) -> list of unescaped reference tokens."""
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise PatchError(f"Invalid JSON pointer: {pointer!r}")
+    if not pointer:
+        return []
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+def _index(container, token, allow_end=False):
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token[0] == "0"):
+        raise PatchUnprocessable(f"Invalid array index: {token!r}")
+    i = int(token)
+    if i > len(container) or (i == len(container) and not allow_end):
+        raise PatchUnprocessable(f"Array index out of range: {token}")
+    return i
+
+
+def _child(container, token):
+    if isinstance(container, list):
+        return container[_index(container, token)]
+    if isinstance(container, dict):
+        if token not in container:
+            raise PatchUnprocessable(f"No such member: {token!r}")
+        return container[token]
+    raise PatchUnprocessable(f"Cannot descend into a {type(container).__name__}")
+
+
+def _resolve(document, tokens):
+    for token in tokens:
+        document = _child(document, token)
+    return document
+
+
+def _equal(a, b) -> bool:
+    # JSON equality: unlike Python, true != 1 and 1.0 == 1
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_equal(a[k], b[k]) for k in a)
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b
+    return type(a) is type(b) and a == b
+
+
+class _Patcher:
+    """Applies operations to a document, copying containers only on write."""
+
+    def __init__(self, document):
+        self.root = document
+        self._owned = {}   # id -> container this patch created (safe to mutate)
+
+    def _own(self, value):
+        if self._owned.get(id(value)) is value:
+            return value
+        value = list(value) if isinstance(value, list) else dict(value)
+        self._owned[id(value)] = value
+        return value
+
+    def _parent(self, tokens):
+        """Writable container holding ``tokens[-1]``, copying the path to it."""
+        if not isinstance(self.root, (list, dict)):
+            raise PatchUnprocessable("Document root is not a container")
+        self.root = container = self._own(self.root)
+        for token in tokens[:-1]:
+            child = _child(container, token)
+            if not isinstance(child, (list, dict)):
+                raise PatchUnprocessable(f"Cannot descend into a {type(child).__name__}")
+            owned = self._own(child)
+            if owned is not child:
+                key = _index(container, token) if isinstance(container, list) else token
+                container[key] = owned
+            container = owned
+        return container
+
+    def add(self, tokens, value):
+        if not tokens:
+            self.root = value
+            return
+        parent = self._parent(tokens)
+        if isinstance(parent, list):
+            parent.insert(_index(parent, tokens[-1], allow_end=True), value)
+        else:
+            parent[tokens[-1]] = value
+
+    def remove(self, tokens):
+        if not tokens:
+            raise PatchUnprocessable("Cannot remove the document root")
+        parent = self._parent(tokens)
+        if isinstance(parent, list):
+            return parent.pop(_index(parent, tokens[-1]))
+        if tokens[-1] not in parent:
+            raise PatchUnprocessable(f"No such member: {tokens[-1]!r}")
+        return parent.pop(tokens[-1])
+
+    def replace(self, tokens, value):
+        if not tokens:
+            self.root = value
+            return
+        parent = self._parent(tokens)
+        if isinstance(parent, list):
+            parent[_index(parent, tokens[-1])] = value
+        else:
+            if tokens[-1] not in parent:
+                raise PatchUnprocessable(f"No such member: {tokens[-1]!r}")
+            parent[tokens[-1]] = value
+
+    def run(self, operation):
+        if not isinstance(operation, dict):
+            raise PatchError("Each operation must be an object")
+        op = operation.get("op")
+        tokens = parse_pointer(operation.get("path"))
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"'{op}' needs a value")
+        if op == "add":
+            self.add(tokens, operation["value"])
+        elif op == "remove":
+            self.remove(tokens)
+        elif op == "replace":
+            self.replace(tokens, operation["value"])
+        elif op in ("move", "copy"):
+            source = parse_pointer(operation.get("from"))
+            if op == "move":
+                if tokens[:len(source)] == source and tokens != source:
+                    raise PatchUnprocessable("Cannot move a value into itself")
+                self.add(tokens, self.remove(source))
+            else:
+                self.add(tokens, copy.deepcopy(_resolve(self.root, source)))
+        elif op == "test":
+            if not _equal(_resolve(self.root, tokens), operation["value"]):
+                raise PatchTestFailed(f"Test failed at {operation['path']!r}")
+        else:
+            raise PatchError(f"Unknown operation: {op!r}")
+
+
+def apply(document, operations):
+    """
+    Return *document* with *operations* applied; *document* itself is never
+    modified. Raises a ``PatchError`` subclass and applies nothing if any
+    operation fails.
+    """
+    if not isinstance(operations, list):
+        raise PatchError("A JSON Patch must be an array of operations")
+    if len(operations) > MAX_OPERATIONS:
+        raise PatchError(f"At most {MAX_OPERATIONS} operations per patch")
+    patcher = _Patcher(document)
+    for operation in operations:
+        patcher.run(operation)
+    return patcher.root
+
+
+def changed_items(before, after):
+    """``(index, item)`` for items of *after* that are not untouched items of *before*."""
+    untouched = {id(item) for item in before or ()}
+    return [(i, item) for i, item in enumerate(after) if id(item) not in untouched]
+
+
+def _merge(raw, validated):
+    """*raw* with the values the serializer coerced put back, other keys kept."""
+    if isinstance(raw, dict) and isinstance(validated, dict):
+        return {**raw, **{k: _merge(raw.get(k), v) for k, v in validated.items()}}
+    if isinstance(raw, list) and isinstance(validated, list) and len(raw) == len(validated):
+        return [_merge(r, v) for r, v in zip(raw, validated)]
+    return validated
+
+
+def validate_changed(before, after, serializer_class, pointer: str):
+    """
+    Validate only the items of list *after* that a patch created or changed.
+    Returns ``(items, errors)`` with errors keyed by JSON pointer. Changed
+    items carry the serializer's coerced values (``"7"`` -> ``7``), and keep
+    the keys it does not declare, just as a full PUT stores them.
+    """
+    if not isinstance(after, list):
+        return after, {pointer: ["Expected a list."]}
+    items, errors = list(after), {}
+    for i, item in changed_items(before, after):
+        serializer = serializer_class(data=item)
+        if serializer.is_valid():
+            items[i] = _merge(item, serializer.validated_data)
+        else:
+            errors[f"{pointer}/{i}"] = serializer.errors
+    return items, errors
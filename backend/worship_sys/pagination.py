@@ -0,0 +1,95 @@
+"""
+Opt-in keyset ("cursor") pagination shared by the list endpoints.
+
+Passing ``?cursor=`` (empty for the first page) switches a list view from
+OFFSET paging to ``WHERE id > last_id ORDER BY id LIMIT n``, so deep pages
+cost the same as page 1. The total is only counted when ``include_total``
+is truthy.
+"""
+import base64
+import binascii
+import json
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def wants_cursor(request) -> bool:
+    return "cursor" in request.query_params
+
+
+def wants_total(request) -> bool:
+    return request.query_params.get("include_total", "").lower() in ("1", "true", "yes")
+
+
+def page_params(request, default_size: int = 5):
+    """``(page, page_size)`` from the query string; bad values fall back to the defaults."""
+    try:
+        page = int(request.query_params.get("page", 1))
+    except ValueError:
+        page = 1
+    try:
+        page_size = int(request.query_params.get("page_size", default_size))
+    except ValueError:
+        page_size = default_size
+    return page, page_size
+
+
+def encode_cursor(last_id) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    """Return the last seen id for *token*, or ``None`` for the first page."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        last_id = json.loads(raw)["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(last_id, int):
+        raise InvalidCursor("Invalid cursor")
+    return last_id
+
+
+def cursor_queryset(queryset, request, page_size: int):
+    """
+    The window after ``?cursor=``, ordered by id and limited to
+    ``page_size + 1`` rows (the extra row tells us there is a next page).
+    """
+    last_id = decode_cursor(request.query_params.get("cursor", ""))
+    if last_id is not None:
+        queryset = queryset.filter(id__gt=last_id)
+    return queryset.order_by("id")[:max(page_size, 1) + 1]
+
+
+def _next_page(rows, page_size: int):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["id"] if isinstance(last, dict) else last.id)
+    return rows, next_cursor
+
+
+def paginate_by_cursor(queryset, request, page_size: int):
+    """
+    Return ``(rows, next_cursor, total)`` for the page after ``?cursor=``.
+    *queryset* must not be sliced. ``total`` is ``None`` unless the client
+    asked for it.
+    """
+    page_size = max(page_size, 1)
+    rows = list(cursor_queryset(queryset, request, page_size))
+    total = queryset.count() if wants_total(request) else None
+    return (*_next_page(rows, page_size), total)
+
+
+async def apaginate_by_cursor(queryset, request, page_size: int):
+    """``paginate_by_cursor`` on the async ORM."""
+    page_size = max(page_size, 1)
+    rows = [row async for row in cursor_queryset(queryset, request, page_size)]
+    total = await queryset.acount() if wants_total(request) else None
+    return (*_next_page(rows, page_size), total)
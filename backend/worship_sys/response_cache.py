@@ -0,0 +1,200 @@
+"""
+Response cache for the list endpoints.
+
+Everyone opens the same first page, so ``cached_list`` keeps a list view's
+successful GET payload (and its ETag) under
+
+    resp:<view>:<scope>:<generations>:<normalized params>
+
+* ``normalized params`` -- only the query parameters the view reads, in a
+  fixed order, whitespace-collapsed (``folded`` ones case-folded too), with
+  default values dropped, so ``?page=1&search=Grace`` and ``?search=grace``
+  share an entry and cache-busting parameters are ignored;
+* ``scope`` -- ``anon`` or ``auth``, so nothing cached for a signed-in
+  user is ever served to an anonymous one;
+* ``generations`` -- one counter per namespace the view depends on
+  (``depends_on``). Model signals call ``invalidate(namespace)``, which
+  bumps the counter: every key built before then is never read again and
+  ages out. Invalidation is one ``incr`` whatever the number of entries.
+
+``invalidate`` bumps at once (so the writing transaction reads its own
+write) and again at commit (so a concurrent reader that cached the old rows
+in between is passed over too). A missing counter, e.g. one the cache
+evicted, restarts from the current time in nanoseconds, never from a value
+already used.
+
+With read replicas (``worship_sys.routers``) the second bump is not
+enough: a replica may still lag behind the commit, and a page read from it
+would be cached under the new generation. So a bump also marks the
+namespace as recently changed for ``REPLICA_PIN_SECONDS`` (the replication
+lag bound), and while that mark is up a response is only stored if the
+view read nothing from a replica. Users pinned to the primary after a
+write bypass the cache altogether, so they always read their own edit.
+
+Everything goes through the Django cache API (``get_many``/``add``/
+``incr``/``set``), so locmem, file and Redis backends all work; with more
+than one worker the cache must be shared for invalidation to reach them
+all (``worship_sys.caches``). ``RESPONSE_CACHE_TIMEOUT = 0`` turns the
+response cache off. Entries hold the rendered JSON, which the sync view and
+its async twin share; a hit is one ``get`` of a bytes value. Other formats
+(the browsable API) are not cached.
+"""
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+from . import conditional, routers
+
+KEY_PREFIX = "resp"
+GENERATION_KEY = "resp-gen:{}"
+CHANGED_KEY = "resp-changed:{}"
+
+
+def _cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+
+
+def bump(*namespaces) -> None:
+    cache = _cache()
+    for namespace in namespaces:
+        key = GENERATION_KEY.format(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # unknown (or evicted) counter: the next read starts a fresh one
+            pass
+    cache.set_many({CHANGED_KEY.format(ns): True for ns in namespaces}, routers.pin_seconds())
+
+
+def invalidate(*namespaces, using="default") -> None:
+    """Retire every cached response depending on *namespaces*."""
+    bump(*namespaces)
+    transaction.on_commit(lambda: bump(*namespaces), using=using)
+
+
+def _generations(cache, namespaces):
+    """``(generations, changed)``: the key part, and whether a namespace changed lately."""
+    keys = [GENERATION_KEY.format(ns) for ns in namespaces]
+    changed_keys = [CHANGED_KEY.format(ns) for ns in namespaces]
+    found = cache.get_many(keys + changed_keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return ".".join(str(found[key]) for key in keys), any(k in found for k in changed_keys)
+
+
+async def _agenerations(cache, namespaces):
+    keys = [GENERATION_KEY.format(ns) for ns in namespaces]
+    changed_keys = [CHANGED_KEY.format(ns) for ns in namespaces]
+    found = await cache.aget_many(keys + changed_keys)
+    for key in keys:
+        if key not in found:
+            await cache.aadd(key, time.time_ns(), None)
+            found[key] = await cache.aget(key)
+    return ".".join(str(found[key]) for key in keys), any(k in found for k in changed_keys)
+
+
+def _fresh(changed) -> bool:
+    """Whether what the view just read can be cached: replicas may lag a recent change."""
+    return not changed or not routers.read_from_replica()
+
+
+def _bypass(request) -> bool:
+    return not _timeout() or bool(routers.replicas()) and routers.pinned(request.user)
+
+
+async def _abypass(request) -> bool:
+    return not _timeout() or bool(routers.replicas()) and await routers.apinned(request.user)
+
+
+def normalize_params(query, params, folded=(), defaults=None) -> str:
+    """Canonical query string of *params* in *query* (a ``QueryDict``)."""
+    defaults = defaults or {}
+    parts = []
+    for name in params:
+        if name not in query:
+            continue
+        value = " ".join(query.get(name).split())
+        if name in folded:
+            value = value.casefold()
+        if defaults.get(name) != value:
+            parts.append((name, value))
+    return urlencode(parts)
+
+
+def visibility_scope(request) -> str:
+    return "auth" if request.user.is_authenticated else "anon"
+
+
+def _hit(request, entry):
+    etag, content = entry
+    return conditional.conditional_response(request, etag) or conditional.set_validators(
+        HttpResponse(content, content_type="application/json"), etag)
+
+
+def _render(request, response) -> bytes:
+    """Render a DRF ``Response`` now, as ``finalize_response`` would; it is not rendered again."""
+    response.accepted_renderer = request.accepted_renderer
+    response.accepted_media_type = request.accepted_media_type
+    response.renderer_context = {"request": request, "response": response}
+    return response.render().content
+
+
+def cached_list(name, depends_on, params, folded=(), defaults=None):
+    """
+    Cache the 200 responses of list view *name*, which must set an ETag.
+    Goes under ``@api_view`` (or ``@async_api_view``), so ``request.user``
+    and ``request.query_params`` are ready.
+    """
+    def key(request, generations):
+        query = normalize_params(request.query_params, params, folded, defaults)
+        return f"{KEY_PREFIX}:{name}:{visibility_scope(request)}:{generations}:{query}"
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if await _abypass(request):
+                    return await view(request, *args, **kwargs)
+                cache = _cache()
+                generations, changed = await _agenerations(cache, depends_on)
+                entry_key = key(request, generations)
+                entry = await cache.aget(entry_key)
+                if entry is not None:
+                    return _hit(request, entry)
+                response = await view(request, *args, **kwargs)
+                if response.status_code == 200 and response.has_header("ETag") and _fresh(changed):
+                    await cache.aset(entry_key, (response["ETag"], response.content), _timeout())
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.accepted_media_type != "application/json" or _bypass(request):
+                # the browsable API, ?format=..., indented JSON; a user reading their own write
+                return view(request, *args, **kwargs)
+            cache = _cache()
+            generations, changed = _generations(cache, depends_on)
+            entry_key = key(request, generations)
+            entry = cache.get(entry_key)
+            if entry is not None:
+                return _hit(request, entry)
+            response = view(request, *args, **kwargs)
+            if (response.status_code == 200 and response.has_header("ETag")
+                    and isinstance(response, Response) and _fresh(changed)):
+                cache.set(entry_key, (response["ETag"], _render(request, response)), _timeout())
+            return response
+        return wrapper
+    return decorator
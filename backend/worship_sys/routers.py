@@ -0,0 +1,155 @@
+"""
+Read-replica routing.
+
+``ReplicaRouter`` sends the reads of safe (GET/HEAD/OPTIONS) requests to
+one of ``settings.DATABASE_REPLICAS``; everything else -- writes, reads in
+write requests, management commands, shell -- stays on ``default``.
+
+Read-your-writes: after a user's successful write request,
+``ReplicaRoutingMiddleware`` pins that user to the primary for
+``REPLICA_PIN_SECONDS`` (a bound on replication lag), so the list they
+return to shows their edit. The pin lives in the default cache; with more
+than one worker that cache must be shared (e.g. Redis) for the pin to
+follow the user. DRF authenticates inside the view, so the pin is looked up
+lazily, on the first read after the user is known; the authentication
+lookup itself reads from a replica.
+"""
+import contextvars
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject, empty
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PIN_KEY = "db-primary-pin:{}"
+
+_state = contextvars.ContextVar("replica_routing", default=None)
+
+
+class _RequestState:
+    __slots__ = ("request", "primary", "replica_reads")
+
+    def __init__(self, request, primary):
+        self.request = request
+        self.primary = primary   # None until the user (and so the pin) is known
+        self.replica_reads = False
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", ())
+
+
+def pin_key(user_id) -> str:
+    return PIN_KEY.format(user_id)
+
+
+def pin_seconds() -> int:
+    return getattr(settings, "REPLICA_PIN_SECONDS", 10)
+
+
+def pin_to_primary(user_id) -> None:
+    cache.set(pin_key(user_id), True, pin_seconds())
+
+
+def pinned(user) -> bool:
+    return bool(user.is_authenticated and cache.get(pin_key(user.pk)))
+
+
+async def apinned(user) -> bool:
+    return bool(user.is_authenticated and await cache.aget(pin_key(user.pk)))
+
+
+def _authenticated_user(request):
+    """The request's user if already resolved, without triggering a lookup."""
+    user = request.__dict__.get("user")
+    if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+        return None
+    return user
+
+
+def use_primary() -> bool:
+    state = _state.get()
+    if state is None:
+        return True
+    if state.primary is None:
+        user = _authenticated_user(state.request)
+        if user is None:
+            return False
+        state.primary = pinned(user)
+    return state.primary
+
+
+def read_from_replica() -> bool:
+    """Whether the current request has read anything from a replica."""
+    state = _state.get()
+    return state is not None and state.replica_reads
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        choices = replicas()
+        if not choices or use_primary():
+            return None
+        _state.get().replica_reads = True
+        return random.choice(choices)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # a GET that writes reads its own writes for the rest of the request
+            state.primary = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {"default", *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas receive the schema from the primary
+        return False if db in replicas() else None
+
+
+class ReplicaRoutingMiddleware:
+    """Scopes routing to the request; must come after ``AuthenticationMiddleware``."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _start(request):
+        return _state.set(_RequestState(request, None if request.method in SAFE_METHODS else True))
+
+    @staticmethod
+    def _finish(request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            # DRF stores the user it authenticated on the underlying request
+            user = _authenticated_user(request)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(request, response)
+
+    async def __acall__(self, request):
+        token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(request, response)
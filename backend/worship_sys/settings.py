@@ -1,15 +1,21 @@
 from datetime import timedelta
 from pathlib import Path
 import os
-from decouple import config
+from decouple import Csv, config
+
+from .caches import cache_config, response_cache_timeout
+from .db import database_config, replica_configs
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = config('SECRET_KEY')
-DEBUG = True
-ALLOWED_HOSTS = ['192.168.0.107', 'localhost', '127.0.0.1']
+DEBUG = config('DEBUG', default=False, cast=bool)
+ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='192.168.0.107,localhost,127.0.0.1', cast=Csv())
 
 INSTALLED_APPS = [
+    # ASGI server; first so runserver also serves the WebSocket routes
+    'daphne',
+
     # Core Django apps:
     'django.contrib.admin',
     'django.contrib.auth',
@@ -38,6 +44,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'worship_sys.routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -66,14 +73,66 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'worship_sys.wsgi.application'
+ASGI_APPLICATION = 'worship_sys.asgi.application'
 
+# DATABASE_URL selects Postgres (persistent/pooled connections) or a
+# WAL-tuned SQLite file; see worship_sys/db.py.
 DATABASES = {
+    'default': database_config(BASE_DIR / 'db.sqlite3'),
+    **replica_configs(config('DATABASE_REPLICA_URLS', default='', cast=Csv())),
+}
+
+# Reads of GET requests go to a replica (worship_sys/routers.py); a user's
+# own writes pin their reads to the primary for REPLICA_PIN_SECONDS.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['worship_sys.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+
+# CACHE_URL selects a cache shared by the workers (Redis or a directory) or
+# per-process memory; see worship_sys/caches.py. WEB_CONCURRENCY is the
+# number of worker processes serving the site.
+CACHES = {
+    'default': cache_config(),
+}
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+
+# Live chart sync (songs/live.py). The in-memory layer only reaches sockets
+# served by the same process; with several workers set CHANNEL_REDIS_URL
+# (needs channels-redis).
+CHANNEL_REDIS_URL = config('CHANNEL_REDIS_URL', default='')
+CHANNEL_LAYERS = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {'hosts': [CHANNEL_REDIS_URL]},
+    } if CHANNEL_REDIS_URL else {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
     }
 }
 
+# Transposed charts are keyed by song version, so a long timeout is safe.
+TRANSPOSE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Cached song/tab list pages (worship_sys/response_cache.py). A write retires
+# them in every worker sharing the cache; a per-process cache would leave the
+# other workers serving stale pages for the whole timeout, so with several
+# workers and no shared cache the list cache is off (0).
+RESPONSE_CACHE_TIMEOUT = response_cache_timeout(CACHES['default'], WEB_CONCURRENCY, 300)
+
+# 'packed' stores Song.lyrics in the compact binary column (songs.lyrics_codec);
+# run `manage.py pack_lyrics` to convert existing rows.
+SONG_LYRICS_STORAGE = config('SONG_LYRICS_STORAGE', default='json')
+
+# Song versions are stored as deltas against their parent; every chain gets a
+# full copy at least this often, bounding the work to read any version.
+SONG_VERSION_SNAPSHOT_INTERVAL = 8
+
+# Rendered chord sheets (songs.chordsheet), named by content hash. Safe to
+# delete at any time. A TrueType font here (e.g. Noto Sans Khmer) makes PDFs
+# render through Pillow so non-Latin lyrics print; otherwise PDFs use Courier.
+CHORDSHEET_CACHE_DIR = config('CHORDSHEET_CACHE_DIR', default=os.path.join(BASE_DIR, 'chordsheet_cache'))
+CHORDSHEET_CACHE_MAX_FILES = 500
+CHORDSHEET_FONT = config('CHORDSHEET_FONT', default=None)
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',},
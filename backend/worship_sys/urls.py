@@ -10,6 +10,7 @@ urlpatterns = [
     path('api/auth/', include('authentication.urls')),
     path('api/guitartabs/', include('guitartabs.urls')),
     path('api/profiles/', include('profiles.urls')),
+    path('api/async/', include('worship_sys.async_urls')),  # ASGI-native read endpoints
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,112 @@
+"""
+Version lineage for the self-referencing ``original_song``/``original_tab``
+models, fetched in one recursive CTE instead of one query per hop.
+
+The CTE first climbs from the requested row to its root, then walks down
+from the root, so a single round trip returns every ancestor, sibling
+branch and descendant. ``UNION`` (not ``UNION ALL``) in the upward walk
+stops on a corrupt cycle; such a lineage has no root and comes back empty.
+"""
+from django.db import connections, router
+from django.db.models import Exists, OuterRef
+
+TREE_SQL = """
+WITH RECURSIVE
+    up(id, parent_id) AS (
+        SELECT id, {parent} FROM {table} WHERE id = %s
+        UNION
+        SELECT t.id, t.{parent} FROM {table} t JOIN up ON t.id = up.parent_id
+    ),
+    down(id, depth) AS (
+        SELECT id, 0 FROM up WHERE parent_id IS NULL
+        UNION ALL
+        SELECT t.id, down.depth + 1 FROM {table} t JOIN down ON t.{parent} = down.id
+    )
+SELECT {columns}, down.depth AS depth
+FROM down JOIN {table} t ON t.id = down.id
+ORDER BY down.depth, t.version, t.id
+"""
+
+
+def lineage(model, pk, parent_field: str, fields=(), using: str | None = None):
+    """
+    Every row in *pk*'s version tree, root first, as *model* instances with a
+    ``depth`` attribute. Only ``id``, the parent FK, ``version`` and *fields*
+    are loaded. Reads from the routed database unless *using* is given.
+    """
+    using = using or router.db_for_read(model)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    opts = model._meta
+    parent = opts.get_field(parent_field).column
+    columns = dict.fromkeys(["id", parent, "version", *(opts.get_field(f).column for f in fields)])
+    sql = TREE_SQL.format(
+        table=qn(opts.db_table),
+        parent=qn(parent),
+        columns=", ".join(f"t.{qn(c)}" for c in columns),
+    )
+    return list(model._default_manager.db_manager(using).raw(sql, [pk]))
+
+
+def build(nodes, pk, parent_field: str, serialize) -> dict | None:
+    """
+    Tree payload for *pk* from ``lineage()`` rows: the flat ``versions`` list
+    (each with its parent and children ids), the ``ancestors`` of *pk* from
+    the root down, its ``descendants``, and the ``latest`` version (highest
+    version number, newest row on ties). ``None`` if *pk* is not in *nodes*.
+    """
+    attname = f"{parent_field}_id"
+    by_id = {n.id: n for n in nodes}
+    if pk not in by_id:
+        return None
+    children = {n.id: [] for n in nodes}
+    for n in nodes:
+        parent_id = getattr(n, attname)
+        if parent_id in children:
+            children[parent_id].append(n.id)
+
+    ancestors = []
+    parent_id = getattr(by_id[pk], attname)
+    while parent_id in by_id:
+        ancestors.append(parent_id)
+        parent_id = getattr(by_id[parent_id], attname)
+    ancestors.reverse()
+
+    descendants, stack = [], list(children[pk])
+    while stack:
+        node_id = stack.pop()
+        descendants.append(node_id)
+        stack.extend(children[node_id])
+    descendants.sort(key=lambda i: (by_id[i].depth, by_id[i].version, i))
+
+    latest = max(nodes, key=lambda n: (n.version, n.id))
+    return {
+        "id": pk,
+        "root": nodes[0].id,
+        "latest": latest.id,
+        "ancestors": ancestors,
+        "descendants": descendants,
+        "versions": [
+            {
+                **serialize(n),
+                "id": n.id,
+                "parent": getattr(n, attname),
+                "version": n.version,
+                "depth": n.depth,
+                "children": children[n.id],
+                "is_head": not children[n.id],
+            }
+            for n in nodes
+        ],
+    }
+
+
+def latest_only(queryset, parent_field: str):
+    """Restrict *queryset* to heads: versions nothing else was derived from."""
+    model = queryset.model
+    derived = model._default_manager.filter(**{parent_field: OuterRef("pk")})
+    return queryset.filter(~Exists(derived))
+
+
+def wants_latest(request) -> bool:
+    return request.query_params.get("latest", "").lower() in ("1", "true", "yes")
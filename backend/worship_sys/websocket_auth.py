@@ -0,0 +1,33 @@
+"""
+Authentication for WebSocket connections.
+
+Browsers cannot set headers on a WebSocket handshake, so clients pass their
+access token in the query string (``?token=<jwt>``). ``JWTAuthMiddleware``
+puts the token's user in ``scope["user"]``, or ``AnonymousUser`` when the
+token is missing or invalid. Session cookies are deliberately not used:
+any page the user visits could open a cookie-authenticated socket.
+"""
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+_jwt = JWTAuthentication()
+
+
+@database_sync_to_async
+def user_for_token(raw_token):
+    try:
+        return _jwt.get_user(_jwt.get_validated_token(raw_token))
+    except exceptions.AuthenticationFailed:
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    async def __call__(self, scope, receive, send):
+        tokens = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("token")
+        user = await user_for_token(tokens[-1]) if tokens else AnonymousUser()
+        return await super().__call__(dict(scope, user=user), receive, send)